@@ -1,9 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, emails, drafts, dashboard
+from app.api.v1.endpoints import auth, emails, drafts, dashboard, jobs
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(emails.router, prefix="/emails", tags=["emails"])
 api_router.include_router(drafts.router, prefix="/drafts", tags=["drafts"])
-api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"]) 
\ No newline at end of file
+api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"]) 
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
\ No newline at end of file
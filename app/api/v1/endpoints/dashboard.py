@@ -1,101 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from app.core.database import get_async_db
 from app.models import User, Email
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from app.services.stats import get_email_stats, get_timeline_counts
+from app.services.response_cache import cached_json_response, invalidate_user_responses
+from typing import List, Dict, Any, Optional
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 router = APIRouter()
 
 @router.get("/stats")
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    days: int = 7  # Default to last 7 days
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    days: int = 7,  # Default to last 7 days
+    refresh: bool = False
 ):
     """
-    Get email dashboard statistics
+    Get email dashboard statistics.
+    Overview and distributions come from the per-user stats rollup (rebuilt
+    when `refresh` is set); the high-priority and pending-action lists only
+    include emails from the last `days` days.
+    Responses are cached until the user's data changes and carry an ETag.
     """
-    user = db.query(User).first()
+    user = await db.scalar(select(User).limit(1))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No authenticated user found"
         )
     
+    if refresh:
+        invalidate_user_responses(user.id)
+    return await cached_json_response(
+        request,
+        user.id,
+        "dashboard.stats",
+        {"days": days},
+        lambda: _build_dashboard_stats(db, user, days, refresh)
+    )
+
+async def _build_dashboard_stats(db: AsyncSession, user: User, days: int, refresh: bool) -> Dict[str, Any]:
+    """Build the /dashboard/stats payload"""
     # Calculate date range
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # Basic stats
-    total_emails = db.query(Email).filter(Email.user_id == user.id).count()
-    unread_emails = db.query(Email).filter(
-        Email.user_id == user.id,
-        Email.is_read == False
-    ).count()
-    
-    # Category distribution
-    category_stats = db.query(
-        Email.category,
-        func.count(Email.id).label('count')
-    ).filter(
-        Email.user_id == user.id,
-        Email.category.isnot(None)
-    ).group_by(Email.category).all()
-    
-    # Priority distribution
-    priority_stats = db.query(
-        Email.priority_score,
-        func.count(Email.id).label('count')
-    ).filter(
-        Email.user_id == user.id,
-        Email.priority_score.isnot(None)
-    ).group_by(Email.priority_score).all()
-    
-    # Sentiment distribution
-    sentiment_stats = db.query(
-        Email.sentiment,
-        func.count(Email.id).label('count')
-    ).filter(
-        Email.user_id == user.id,
-        Email.sentiment.isnot(None)
-    ).group_by(Email.sentiment).all()
+    # Overview and distributions from the rollup
+    stats = await db.run_sync(get_email_stats, user.id, refresh)
     
     # Recent high-priority emails
-    high_priority_emails = db.query(Email).filter(
+    high_priority_emails = (await db.scalars(select(Email).options(
+        load_only(Email.id, Email.subject, Email.sender, Email.priority_score, Email.category)
+    ).filter(
         Email.user_id == user.id,
-        Email.priority_score >= 4
-    ).order_by(desc(Email.created_at)).limit(5).all()
+        Email.priority_score >= 4,
+        Email.created_at >= start_date
+    ).order_by(desc(Email.created_at)).limit(5))).all()
     
     # Pending actions
-    emails_with_actions = db.query(Email).filter(
+    emails_with_actions = (await db.scalars(select(Email).options(
+        load_only(Email.id, Email.subject, Email.action_items)
+    ).filter(
         Email.user_id == user.id,
         Email.action_items != '[]',
-        Email.action_items.isnot(None)
-    ).order_by(desc(Email.created_at)).limit(5).all()
-    
-    # Count of analyzed emails (emails with category assigned)
-    analyzed_emails_count = db.query(Email).filter(
-        Email.user_id == user.id,
-        Email.category.isnot(None)
-    ).count()
+        Email.action_items.isnot(None),
+        Email.created_at >= start_date
+    ).order_by(desc(Email.created_at)).limit(5))).all()
     
     return {
         "overview": {
-            "total_emails": total_emails,
-            "unread_emails": unread_emails,
-            "analyzed_emails": analyzed_emails_count,
+            "total_emails": stats["total"],
+            "unread_emails": stats["unread"],
+            "analyzed_emails": stats["analyzed"],
             "last_sync": user.last_sync_timestamp
         },
-        "categories": {
-            stat.category: stat.count for stat in category_stats
-        },
-        "priorities": {
-            str(stat.priority_score): stat.count for stat in priority_stats
-        },
-        "sentiments": {
-            stat.sentiment: stat.count for stat in sentiment_stats
-        },
+        "categories": stats["categories"],
+        "priorities": stats["priorities"],
+        "sentiments": stats["sentiments"],
         "high_priority": [{
             "id": email.id,
             "subject": email.subject,
@@ -112,38 +97,63 @@ async def get_dashboard_stats(
 
 @router.get("/timeline")
 async def get_email_timeline(
-    db: Session = Depends(get_db),
-    days: int = 7
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    days: int = 7,
+    tz: str = "UTC",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: str = "day"
 ):
     """
-    Get email timeline statistics
+    Get email timeline statistics.
+    Counts come from the hourly rollup keyed on each message's Gmail date and
+    are grouped by day (or hour, with granularity='hour') in timezone `tz`.
+    The range is the last `days` days unless `start` / `end` dates are given.
+    Responses are cached until the user's data changes and carry an ETag.
     """
-    user = db.query(User).first()
+    user = await db.scalar(select(User).limit(1))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No authenticated user found"
         )
     
-    # Calculate date range
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown timezone: {tz}"
+        )
+    if granularity not in ("day", "hour"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown granularity: {granularity}"
+        )
     
-    # Get daily email counts
-    daily_counts = db.query(
-        func.date(Email.created_at).label('date'),
-        func.count(Email.id).label('count')
-    ).filter(
-        Email.user_id == user.id,
-        Email.created_at >= start_date,
-        Email.created_at <= end_date
-    ).group_by(
-        func.date(Email.created_at)
-    ).all()
+    return await cached_json_response(
+        request,
+        user.id,
+        "dashboard.timeline",
+        {"days": days, "tz": tz, "start": start, "end": end, "granularity": granularity},
+        lambda: _build_email_timeline(db, user, days, zone, start, end, granularity)
+    )
+
+async def _build_email_timeline(
+    db: AsyncSession,
+    user: User,
+    days: int,
+    zone: ZoneInfo,
+    start: Optional[date],
+    end: Optional[date],
+    granularity: str
+) -> Dict[str, Any]:
+    """Build the /dashboard/timeline payload"""
+    # Calculate date range in the requested timezone
+    end_date = datetime.combine(end, time.max, tzinfo=zone) if end else datetime.now(zone)
+    start_date = datetime.combine(start, time.min, tzinfo=zone) if start else end_date - timedelta(days=days)
     
     return {
-        "timeline": [{
-            "date": str(stat.date),
-            "count": stat.count
-        } for stat in daily_counts]
-    } 
\ No newline at end of file
+        "timeline": await db.run_sync(get_timeline_counts, user.id, start_date, end_date, zone, granularity)
+    }
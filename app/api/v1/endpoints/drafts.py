@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.models import Email
-from app.services.llm import generate_email_draft
+from fastapi import APIRouter, HTTPException, status, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.core.database import get_async_db
+from app.models import Email, EmailBody
+from app.services.hydration import ensure_email_bodies
+from app.services.llm import generate_email_draft, build_draft_prompts, stream_email_draft
 from pydantic import BaseModel
 from typing import Optional
+import json
 
 router = APIRouter()
 
@@ -18,6 +22,20 @@ class DraftResponse(BaseModel):
     draft: Optional[str] = None
     error: Optional[str] = None
 
+async def _get_email(db: AsyncSession, email_id: str) -> Optional[Email]:
+    """
+    Load an email with its body by the id sent by the client, None if
+    missing or not numeric
+    """
+    if not email_id.isdigit():
+        return None
+    # Drafts only use the plain text body
+    body_text = selectinload(Email.body).load_only(EmailBody.email_id, EmailBody.text_compressed)
+    email = await db.get(Email, int(email_id), options=[body_text])
+    if email:
+        await ensure_email_bodies(db, [email])
+    return email
+
 @router.get("/test")
 async def test_endpoint():
     """
@@ -28,14 +46,14 @@ async def test_endpoint():
 @router.post("/generate", response_model=DraftResponse)
 async def generate_draft(
     request: DraftRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generate an email draft based on an existing email
     """
     try:
         # Get the original email
-        email = db.query(Email).filter(Email.id == request.email_id).first()
+        email = await _get_email(db, request.email_id)
         
         if not email:
             return DraftResponse(
@@ -65,4 +83,61 @@ async def generate_draft(
         return DraftResponse(
             success=False,
             error=f"Failed to generate draft: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+def _sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@router.post("/generate/stream")
+async def generate_draft_stream(
+    request: DraftRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Generate an email draft and stream it token by token over Server-Sent Events.
+    Each token is sent as `data: {"token": ...}`, followed by a `done` event
+    with the full draft, or an `error` event. Generation stops as soon as the
+    client disconnects.
+    """
+    email = await _get_email(db, request.email_id)
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Email with ID {request.email_id} not found"
+        )
+    
+    # Build prompts now so the stream does not touch the database session
+    system_prompt, user_prompt = build_draft_prompts(
+        email=email,
+        mode=request.mode,
+        instructions=request.instructions
+    )
+    
+    async def event_stream():
+        tokens = stream_email_draft(system_prompt, user_prompt)
+        draft_parts = []
+        try:
+            async for token in tokens:
+                if await http_request.is_disconnected():
+                    # Nobody is reading, stop paying for tokens
+                    return
+                draft_parts.append(token)
+                yield _sse_event({"token": token})
+            yield _sse_event({"draft": "".join(draft_parts).strip()}, event="done")
+        except Exception as e:
+            yield _sse_event({"error": f"Failed to generate draft: {str(e)}"}, event="error")
+        finally:
+            # Closes the upstream streaming response
+            await tokens.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering (nginx)
+        }
+    )
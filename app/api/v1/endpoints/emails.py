@@ -1,49 +1,125 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.models import User, Email
-from app.services.gmail import sync_emails
-from app.services.llm import analyze_email
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload
+from app.core.database import get_async_db
+from app.models import User, Email, EmailBody
+from app.services.jobs import enqueue_sync_job, serialize_job
+from app.services.search import apply_search, unindex_emails
+from app.services.hydration import ensure_email_bodies
+from app.services.stats import email_stats_key, record_email_removed, record_stats_change
+from app.services.response_cache import invalidate_user_responses
+from app.services.rate_limit import get_gmail_quota_stats
+from app.services.pagination import InvalidCursor, apply_keyset, approximate_total, cursor_position, encode_cursor
+from app.core.config import settings
+from app.services.llm import analyze_email, analyze_emails_concurrently, get_analysis_cache_stats, clear_analysis_cache
 from typing import List, Optional
 import json
-from sqlalchemy import or_
 
 router = APIRouter()
 
+def apply_analysis(db: Session, email: Email, analysis: dict) -> None:
+    """
+    Copy LLM analysis results onto an email and update the stats rollup.
+    Takes a sync session; call it through AsyncSession.run_sync.
+    """
+    old_key = email_stats_key(email)
+    email.category = analysis.get("category")
+    email.priority_score = analysis.get("priority_score")
+    email.sentiment = analysis.get("sentiment")
+    email.summary = analysis.get("summary")
+    email.action_items = json.dumps(analysis.get("action_items", []))
+    record_stats_change(db, email.user_id, old_key, email_stats_key(email))
+
+# Columns read by the analyzer, apply_analysis and body hydration
+EMAIL_ANALYSIS_COLUMNS = (
+    Email.id,
+    Email.user_id,
+    Email.gmail_id,
+    Email.subject,
+    Email.sender,
+    Email.snippet,
+    Email.is_read,
+    Email.category,
+    Email.priority_score,
+    Email.sentiment,
+)
+
+# Eager-loads the plain text body only (the HTML body is not needed for analysis)
+LOAD_BODY_TEXT = selectinload(Email.body).load_only(EmailBody.email_id, EmailBody.text_compressed)
+
 @router.post("/sync")
 async def sync_gmail_emails(
-    db: Session = Depends(get_db),
-    limit: Optional[int] = 50
+    db: AsyncSession = Depends(get_async_db),
+    limit: Optional[int] = 50,
+    mode: str = "full"
 ):
     """
-    Sync emails from Gmail to local database
+    Queue a sync of emails from Gmail to local database.
+    Returns the job right away; poll /jobs/{job_id} for progress and result.
+
+    mode: 'full' re-lists the inbox, 'incremental' applies Gmail history
+    changes since the last sync (falling back to a full sync if needed),
+    'backfill' streams the whole inbox page by page and resumes an
+    interrupted backfill from its stored cursor
     """
     # For now, we'll just use the first user (we can add proper auth later)
-    user = db.query(User).first()
+    user = await db.scalar(select(User).limit(1))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No authenticated user found"
         )
     
-    result = sync_emails(db, user, limit)
-    return result
+    try:
+        job = await db.run_sync(enqueue_sync_job, user, mode, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return serialize_job(job)
+
+@router.get("/sync/quota")
+async def gmail_quota_stats():
+    """
+    Get Gmail quota usage and throttling metrics of syncs
+    """
+    return get_gmail_quota_stats()
+
+@router.get("/analyze/cache")
+async def analysis_cache_stats():
+    """
+    Get hit-rate metrics of the LLM analysis cache
+    """
+    return await get_analysis_cache_stats()
+
+@router.delete("/analyze/cache")
+async def clear_analysis_cache_entries():
+    """
+    Clear the LLM analysis cache
+    """
+    await clear_analysis_cache()
+    return {"success": True, "message": "Analysis cache cleared"}
 
 @router.post("/analyze/{email_id}")
 async def analyze_single_email(
     email_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Analyze a single email using the LLM
     """
-    email = db.query(Email).filter(Email.id == email_id).first()
+    email = await db.get(Email, email_id, options=[LOAD_BODY_TEXT])
     if not email:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Email not found"
         )
     
+    # Emails synced with metadata only get their body first
+    await ensure_email_bodies(db, [email])
+    
     # Analyze email content
     analysis = await analyze_email(
         subject=email.subject,
@@ -53,12 +129,9 @@ async def analyze_single_email(
     
     if analysis["success"]:
         # Update email with analysis results
-        email.category = analysis["analysis"].get("category")
-        email.priority_score = analysis["analysis"].get("priority_score")
-        email.sentiment = analysis["analysis"].get("sentiment")
-        email.summary = analysis["analysis"].get("summary")
-        email.action_items = json.dumps(analysis["analysis"].get("action_items", []))
-        db.commit()
+        await db.run_sync(apply_analysis, email, analysis["analysis"])
+        await db.commit()
+        invalidate_user_responses(email.user_id)
         
         return {
             "success": True,
@@ -74,32 +147,35 @@ async def analyze_single_email(
 
 @router.post("/analyze")
 async def analyze_email_batch(
-    db: Session = Depends(get_db),
-    limit: int = 50
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = 50,
+    concurrency: Optional[int] = None,
+    packed: bool = False
 ):
     """
-    Analyze a batch of unanalyzed emails
+    Analyze a batch of unanalyzed emails.
+    Up to `concurrency` LLM requests (default LLM_MAX_CONCURRENCY) run in
+    parallel and each result is committed as soon as it completes.
+    With `packed`, short emails are analyzed LLM_PACK_SIZE per request.
     """
     # Get emails that haven't been categorized yet
-    emails = db.query(Email).filter(
-        Email.category.is_(None)
-    ).limit(limit).all()
+    emails = (await db.scalars(
+        select(Email).options(load_only(*EMAIL_ANALYSIS_COLUMNS), LOAD_BODY_TEXT)
+        .filter(Email.category.is_(None)).limit(limit)
+    )).all()
+    await ensure_email_bodies(db, emails)
     
     results = []
-    for email in emails:
-        analysis = await analyze_email(
-            subject=email.subject,
-            body=email.body_text or email.snippet,
-            sender=email.sender
-        )
-        
+    async for email, analysis in analyze_emails_concurrently(
+        emails,
+        max_concurrency=concurrency or settings.LLM_MAX_CONCURRENCY,
+        pack_size=settings.LLM_PACK_SIZE if packed else 1
+    ):
         if analysis["success"]:
             # Update email with analysis results
-            email.category = analysis["analysis"].get("category")
-            email.priority_score = analysis["analysis"].get("priority_score")
-            email.sentiment = analysis["analysis"].get("sentiment")
-            email.summary = analysis["analysis"].get("summary")
-            email.action_items = json.dumps(analysis["analysis"].get("action_items", []))
+            await db.run_sync(apply_analysis, email, analysis["analysis"])
+            await db.commit()
+            invalidate_user_responses(email.user_id)
             
             results.append({
                 "email_id": email.id,
@@ -113,27 +189,84 @@ async def analyze_email_batch(
                 "error": analysis.get("error", "Analysis failed")
             })
     
-    db.commit()
     return {
         "total_processed": len(emails),
         "results": results
     }
 
+# Columns needed by serialize_email_summary; bodies are only loaded by the detail endpoint
+EMAIL_SUMMARY_COLUMNS = (
+    Email.id,
+    Email.gmail_id,
+    Email.subject,
+    Email.sender,
+    Email.snippet,
+    Email.is_read,
+    Email.is_important,
+    Email.category,
+    Email.priority_score,
+    Email.sentiment,
+    Email.summary,
+    Email.action_items,
+    Email.created_at,
+)
+
+def serialize_email_summary(email: Email) -> dict:
+    """Return the list representation of an email"""
+    return {
+        "id": email.id,
+        "gmail_id": email.gmail_id,
+        "subject": email.subject,
+        "sender": email.sender,
+        "snippet": email.snippet,
+        "is_read": email.is_read,
+        "is_important": email.is_important,
+        "category": email.category,
+        "priority_score": email.priority_score,
+        "sentiment": email.sentiment,
+        "summary": email.summary,
+        "action_items": json.loads(email.action_items) if email.action_items else [],
+        "created_at": email.created_at.isoformat() if email.created_at else None
+    }
+
+def serialize_email_detail(email: Email) -> dict:
+    """Return the full representation of an email, including its bodies"""
+    return {
+        **serialize_email_summary(email),
+        "thread_id": email.thread_id,
+        "recipients": email.recipients,
+        "labels": email.labels,
+        "body_text": email.body_text,
+        "body_html": email.body_html,
+        "received_at": email.received_at.isoformat() if email.received_at else None
+    }
+
 @router.get("/list")
 async def list_emails(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
     limit: int = 10,
     category: Optional[str] = None,
     min_priority: Optional[int] = None,
     search: Optional[str] = None,
     sender: Optional[str] = None,
-    has_action_items: Optional[bool] = None
+    has_action_items: Optional[bool] = None,
+    sort: Optional[str] = None,
+    pagination: str = "offset",
+    cursor: Optional[str] = None,
+    include_total: bool = False
 ):
     """
-    List emails from local database with optional filters and search
+    List emails from local database with optional filters and search.
+    Searches use the full-text index with prefix matching and are ordered
+    by relevance unless sort='date' is given.
+
+    pagination='cursor' (or passing a cursor) switches to keyset pagination
+    on (created_at, id), newest first: pass the returned next_cursor to get
+    the following page. Totals are skipped in that mode unless
+    include_total is set, in which case a briefly cached count is returned.
     """
-    user = db.query(User).first()
+    user = await db.scalar(select(User).limit(1))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -141,21 +274,15 @@ async def list_emails(
         )
     
     # Build query with filters
-    query = db.query(Email).filter(Email.user_id == user.id)
+    query = select(Email).options(load_only(*EMAIL_SUMMARY_COLUMNS)).filter(Email.user_id == user.id)
     
     if category:
         query = query.filter(Email.category == category)
     if min_priority:
         query = query.filter(Email.priority_score >= min_priority)
+    rank_order = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Email.subject.ilike(search_term),
-                Email.body_text.ilike(search_term),
-                Email.snippet.ilike(search_term)
-            )
-        )
+        query, rank_order = apply_search(query, search)
     if sender:
         query = query.filter(Email.sender.ilike(f"%{sender}%"))
     if has_action_items is not None:
@@ -164,63 +291,99 @@ async def list_emails(
         else:
             query = query.filter(or_(Email.action_items == '[]', Email.action_items.is_(None)))
     
+    if pagination == "cursor" or cursor:
+        total = None
+        if include_total:
+            filters = (user.id, category, min_priority, search, sender, has_action_items)
+            total = await approximate_total(db, query, filters)
+        
+        dialect = db.get_bind().dialect.name
+        try:
+            page_query = apply_keyset(query, cursor, dialect)
+        except InvalidCursor as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        # Fetch one extra row to know whether another page exists
+        rows = (await db.execute(page_query.add_columns(cursor_position(dialect)).limit(limit + 1))).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return {
+            "total": total,
+            "emails": [serialize_email_summary(email) for email, _ in rows],
+            "next_cursor": encode_cursor(rows[-1].cursor_created_at, rows[-1][0].id) if has_more else None,
+            "has_more": has_more
+        }
+    
     # Get total count before pagination
-    total = query.count()
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
     
     # Apply sorting and pagination
-    emails = query.order_by(
-        Email.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    if rank_order is not None and sort != "date":
+        query = query.order_by(rank_order, Email.created_at.desc())
+    else:
+        query = query.order_by(Email.created_at.desc())
+    emails = (await db.scalars(query.offset(skip).limit(limit))).all()
     
     return {
         "total": total,
-        "emails": [{
-            "id": email.id,
-            "gmail_id": email.gmail_id,
-            "subject": email.subject,
-            "sender": email.sender,
-            "snippet": email.snippet,
-            "is_read": email.is_read,
-            "is_important": email.is_important,
-            "category": email.category,
-            "priority_score": email.priority_score,
-            "sentiment": email.sentiment,
-            "summary": email.summary,
-            "action_items": json.loads(email.action_items) if email.action_items else [],
-            "created_at": email.created_at.isoformat() if email.created_at else None
-        } for email in emails]
+        "emails": [serialize_email_summary(email) for email in emails]
     }
 
+@router.get("/{email_id}")
+async def get_email_detail(
+    email_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a single email including its text and HTML bodies.
+    Bodies of emails synced with metadata only are fetched from Gmail here.
+    """
+    email = await db.get(Email, email_id, options=[selectinload(Email.body)])
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Email not found"
+        )
+    
+    await ensure_email_bodies(db, [email])
+    return serialize_email_detail(email)
+
 @router.post("/{email_id}/read")
 async def mark_email_as_read(
-    email_id: str,
-    db: Session = Depends(get_db)
+    email_id: int,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Mark an email as read
     """
-    email = db.query(Email).filter(Email.id == email_id).first()
+    email = await db.get(Email, email_id)
     if not email:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Email not found"
         )
     
+    old_key = email_stats_key(email)
     email.is_read = True
-    db.commit()
+    await db.run_sync(record_stats_change, email.user_id, old_key, email_stats_key(email))
+    await db.commit()
+    invalidate_user_responses(email.user_id)
     
     return {"success": True, "message": "Email marked as read"}
 
 @router.post("/{email_id}/toggle-important")
 async def toggle_email_importance(
-    email_id: str,
+    email_id: int,
     is_important: bool,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Toggle the importance of an email
     """
-    email = db.query(Email).filter(Email.id == email_id).first()
+    email = await db.get(Email, email_id)
     if not email:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -228,26 +391,31 @@ async def toggle_email_importance(
         )
     
     email.is_important = is_important
-    db.commit()
+    await db.commit()
+    invalidate_user_responses(email.user_id)
     
     return {"success": True, "message": f"Email importance set to {is_important}"}
 
 @router.delete("/{email_id}")
 async def delete_email(
-    email_id: str,
-    db: Session = Depends(get_db)
+    email_id: int,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete an email
     """
-    email = db.query(Email).filter(Email.id == email_id).first()
+    email = await db.get(Email, email_id, options=[LOAD_BODY_TEXT])
     if not email:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Email not found"
         )
     
-    db.delete(email)
-    db.commit()
+    user_id = email.user_id
+    await db.run_sync(record_email_removed, email)
+    await db.run_sync(unindex_emails, [email])
+    await db.delete(email)
+    await db.commit()
+    invalidate_user_responses(user_id)
     
     return {"success": True, "message": "Email deleted"} 
\ No newline at end of file
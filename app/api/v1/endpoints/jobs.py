@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.models import User, SyncJob
+from app.services.jobs import serialize_job
+
+router = APIRouter()
+
+@router.get("/")
+async def list_jobs(
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = 20
+):
+    """
+    List the most recent sync jobs
+    """
+    user = await db.scalar(select(User).limit(1))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No authenticated user found"
+        )
+    
+    jobs = (await db.scalars(select(SyncJob).filter(
+        SyncJob.user_id == user.id
+    ).order_by(SyncJob.id.desc()).limit(limit))).all()
+    
+    return {"jobs": [serialize_job(job) for job in jobs]}
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get status, progress and result of a sync job
+    """
+    job = await db.get(SyncJob, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return serialize_job(job)
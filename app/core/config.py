@@ -11,10 +11,44 @@ class Settings(BaseSettings):
     # Database settings
     DATABASE_URL: str = os.environ.get("DATABASE_URL", "sqlite:///data/email_planner.db")
     
+    # Connection pool (PostgreSQL); applies to the sync and the async engine separately
+    DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.environ.get("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = int(os.environ.get("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+    
+    # SQLite pragmas applied to every connection
+    SQLITE_JOURNAL_MODE: str = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")  # WAL lets readers run during a sync write
+    SQLITE_SYNCHRONOUS: str = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes
+    SQLITE_BUSY_TIMEOUT: int = int(os.environ.get("SQLITE_BUSY_TIMEOUT", "5000"))  # Milliseconds to wait on a lock
+    
     # DeepSeek API settings
     DEEPSEEK_API_KEY: str = os.environ.get("DEEPSEEK_API_KEY", "")
     DEEPSEEK_API_BASE: str = os.environ.get("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1")
     
+    LLM_MAX_CONCURRENCY: int = int(os.environ.get("LLM_MAX_CONCURRENCY", "5"))  # Parallel analysis requests per batch
+    LLM_REQUEST_TIMEOUT: float = float(os.environ.get("LLM_REQUEST_TIMEOUT", "30"))  # Seconds per LLM request
+    LLM_PACK_SIZE: int = int(os.environ.get("LLM_PACK_SIZE", "8"))  # Emails per packed analysis request
+    LLM_PACK_MAX_BODY: int = int(os.environ.get("LLM_PACK_MAX_BODY", "600"))  # Longer emails are analyzed alone
+    LLM_HTTP2: bool = os.environ.get("LLM_HTTP2", "true").lower() == "true"
+    LLM_POOL_MAX_CONNECTIONS: int = int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", "20"))
+    LLM_POOL_MAX_KEEPALIVE: int = int(os.environ.get("LLM_POOL_MAX_KEEPALIVE", "10"))
+    LLM_POOL_KEEPALIVE_EXPIRY: float = float(os.environ.get("LLM_POOL_KEEPALIVE_EXPIRY", "30"))  # Seconds
+    
+    # LLM analysis cache: "memory", "database", "redis" or "none"
+    LLM_CACHE_BACKEND: str = os.environ.get("LLM_CACHE_BACKEND", "memory")
+    LLM_CACHE_TTL: int = int(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # Seconds
+    LLM_CACHE_MAX_ENTRIES: int = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "10000"))  # Memory backend only
+    LLM_CACHE_REDIS_URL: str = os.environ.get("LLM_CACHE_REDIS_URL", "redis://localhost:6379/1")
+    
+    # Dashboard response cache: "memory", "redis" (needed to see invalidations from Celery workers or python -m app.scheduler) or "none"
+    RESPONSE_CACHE_BACKEND: str = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_TTL: int = int(os.environ.get("RESPONSE_CACHE_TTL", "300"))  # Seconds
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_REDIS_URL: str = os.environ.get("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/2")
+    
     # JWT Settings
     SECRET_KEY: str = os.environ.get("SECRET_KEY", "")
     ALGORITHM: str = "HS256"
@@ -25,6 +59,32 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET: str = os.environ.get("GOOGLE_CLIENT_SECRET", "")
     GOOGLE_REDIRECT_URI: str = os.environ.get("GOOGLE_REDIRECT_URI", "http://localhost:8000/api/v1/auth/callback/google")
     
+    # Gmail sync settings
+    GMAIL_BATCH_SIZE: int = int(os.environ.get("GMAIL_BATCH_SIZE", "100"))  # Max 100 per Gmail batch request
+    GMAIL_LIST_PAGE_SIZE: int = int(os.environ.get("GMAIL_LIST_PAGE_SIZE", "500"))  # Max 500 per messages.list page
+    GMAIL_SYNC_FORMAT: str = os.environ.get("GMAIL_SYNC_FORMAT", "full")  # "metadata" syncs headers only, bodies are fetched when needed
+    SYNC_INSERT_CHUNK_SIZE: int = int(os.environ.get("SYNC_INSERT_CHUNK_SIZE", "500"))  # Rows per bulk insert commit
+    SYNC_TRACK_MEMORY: bool = os.environ.get("SYNC_TRACK_MEMORY", "false").lower() == "true"  # Report peak memory (tracemalloc)
+    EMAIL_BODY_MAX_CHARS: int = int(os.environ.get("EMAIL_BODY_MAX_CHARS", "200000"))  # Longer bodies are truncated when stored
+    
+    # Background job settings (in-process thread pool when no broker is configured)
+    CELERY_BROKER_URL: str = os.environ.get("CELERY_BROKER_URL", "")  # e.g. redis://localhost:6379/0
+    SYNC_WORKER_THREADS: int = int(os.environ.get("SYNC_WORKER_THREADS", "2"))
+    SYNC_LEASE_SECONDS: int = int(os.environ.get("SYNC_LEASE_SECONDS", "300"))  # Per-user sync lease, renewed while the sync runs
+    
+    # Multi-user sync scheduler (python -m app.scheduler, or in the API process when enabled)
+    SYNC_SCHEDULER_ENABLED: bool = os.environ.get("SYNC_SCHEDULER_ENABLED", "false").lower() == "true"
+    SYNC_SCHEDULER_INTERVAL: int = int(os.environ.get("SYNC_SCHEDULER_INTERVAL", "300"))  # Seconds between rounds
+    SYNC_SCHEDULER_WORKERS: int = int(os.environ.get("SYNC_SCHEDULER_WORKERS", "4"))  # Users synced in parallel
+    SYNC_SCHEDULER_SLICE_SIZE: int = int(os.environ.get("SYNC_SCHEDULER_SLICE_SIZE", "500"))  # Max messages per user per round
+
+    # Gmail API quota and retries of throttled calls
+    GMAIL_QUOTA_UNITS_PER_SECOND: float = float(os.environ.get("GMAIL_QUOTA_UNITS_PER_SECOND", "20000"))  # Project quota is 1,200,000 units/minute
+    GMAIL_USER_QUOTA_UNITS_PER_SECOND: float = float(os.environ.get("GMAIL_USER_QUOTA_UNITS_PER_SECOND", "250"))  # Per-user quota is 15,000 units/minute
+    GMAIL_MAX_RETRIES: int = int(os.environ.get("GMAIL_MAX_RETRIES", "6"))  # Retries of a rate limited or failed Gmail call
+    GMAIL_BACKOFF_BASE: float = float(os.environ.get("GMAIL_BACKOFF_BASE", "1"))  # Seconds before the first retry, doubled each attempt
+    GMAIL_BACKOFF_MAX: float = float(os.environ.get("GMAIL_BACKOFF_MAX", "32"))  # Upper bound of a single backoff
+    
     # Frontend URL for CORS and redirects
     FRONTEND_URL: str = os.environ.get("FRONTEND_URL", "http://localhost:5173")
 
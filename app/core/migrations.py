@@ -0,0 +1,28 @@
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+BASELINE_REVISION = "0001_baseline"
+
+def alembic_config() -> Config:
+    """Alembic configuration pointing at app/migrations, independent of the working directory"""
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Upgrade the database to the latest schema revision. Databases created with
+    create_all before migrations existed are stamped at the baseline first.
+    """
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and "users" in tables:
+            print(f"Existing schema without migration history, stamping {BASELINE_REVISION}")
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
@@ -1,14 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.core.database import engine, Base
-from app.models import User, Email, Draft  # Import models to register them
+from app.core.database import engine, async_engine
+from app.core.migrations import run_migrations
+from app.models import User, Email, EmailBody, Draft, SyncJob, AnalysisCacheEntry, EmailStatsBucket, EmailHourlyCount  # Import models to register them
+from app.services.llm import start_analysis_cache, start_http_client, close_http_client
+from app.services.search import setup_search_index
+from app.services.scheduler import start_sync_scheduler, stop_sync_scheduler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared, pooled HTTP client for LLM requests
+    await start_http_client()
+    await start_analysis_cache()
+    if settings.SYNC_SCHEDULER_ENABLED:
+        start_sync_scheduler()
+    yield
+    stop_sync_scheduler()
+    await close_http_client()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Email Planner API",
     description="Backend API for Email Planning and Management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -20,8 +38,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or upgrade database tables (see app/migrations)
+run_migrations(engine)
+
+# Create the full-text search index (FTS5 on SQLite, tsvector on PostgreSQL)
+setup_search_index(engine)
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1") 
\ No newline at end of file
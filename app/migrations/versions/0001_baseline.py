@@ -0,0 +1,82 @@
+"""Baseline schema (users, emails, drafts) as created by create_all
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def _timestamps():
+    return [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    ]
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        *_timestamps(),
+        sa.Column("email", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("is_superuser", sa.Boolean()),
+        sa.Column("google_credentials", sa.JSON()),
+        sa.Column("gmail_sync_enabled", sa.Boolean()),
+        sa.Column("last_sync_timestamp", sa.String(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "emails",
+        *_timestamps(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE")),
+        sa.Column("gmail_id", sa.String()),
+        sa.Column("thread_id", sa.String()),
+        sa.Column("subject", sa.String()),
+        sa.Column("sender", sa.String()),
+        sa.Column("recipients", sa.JSON()),
+        sa.Column("snippet", sa.Text()),
+        sa.Column("body_text", sa.Text(), nullable=True),
+        sa.Column("body_html", sa.Text(), nullable=True),
+        sa.Column("labels", sa.JSON()),
+        sa.Column("is_read", sa.Boolean()),
+        sa.Column("is_important", sa.Boolean()),
+        sa.Column("category", sa.String(), nullable=True),
+        sa.Column("sentiment", sa.String(), nullable=True),
+        sa.Column("priority_score", sa.Integer(), nullable=True),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("action_items", sa.JSON(), nullable=True),
+    )
+    op.create_index("ix_emails_id", "emails", ["id"])
+    op.create_index("ix_emails_gmail_id", "emails", ["gmail_id"])
+    op.create_index("ix_emails_thread_id", "emails", ["thread_id"])
+
+    op.create_table(
+        "drafts",
+        *_timestamps(),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE")),
+        sa.Column("email_id", sa.Integer(), sa.ForeignKey("emails.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("subject", sa.String()),
+        sa.Column("recipients", sa.JSON()),
+        sa.Column("body_text", sa.Text()),
+        sa.Column("body_html", sa.Text(), nullable=True),
+        sa.Column("is_sent", sa.Boolean()),
+        sa.Column("gmail_draft_id", sa.String(), nullable=True),
+        sa.Column("version", sa.Integer()),
+        sa.Column("prompt", sa.Text(), nullable=True),
+        sa.Column("tone", sa.String(), nullable=True),
+        sa.Column("suggestions", sa.JSON(), nullable=True),
+    )
+    op.create_index("ix_drafts_id", "drafts", ["id"])
+
+def downgrade() -> None:
+    op.drop_table("drafts")
+    op.drop_table("emails")
+    op.drop_table("users")
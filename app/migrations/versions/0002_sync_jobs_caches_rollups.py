@@ -0,0 +1,121 @@
+"""Incremental sync state, sync jobs, analysis cache and stats rollups
+
+Revision ID: 0002_sync_jobs_caches_rollups
+Revises: 0001_baseline
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_sync_jobs_caches_rollups"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+def _timestamps():
+    return [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    ]
+
+def _columns(table):
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade() -> None:
+    # Databases created before migrations existed may already have the tables
+    # added by create_all, but never the new columns on existing tables
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    user_columns = _columns("users")
+    with op.batch_alter_table("users") as batch:
+        if "gmail_history_id" not in user_columns:
+            batch.add_column(sa.Column("gmail_history_id", sa.String(), nullable=True))
+        if "gmail_backfill_cursor" not in user_columns:
+            batch.add_column(sa.Column("gmail_backfill_cursor", sa.String(), nullable=True))
+
+    # Keep the oldest copy of messages stored twice before enforcing uniqueness
+    op.execute("""
+        DELETE FROM emails WHERE id NOT IN (
+            SELECT MIN(id) FROM emails GROUP BY user_id, gmail_id
+        )
+    """)
+    email_indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("emails")}
+    with op.batch_alter_table("emails") as batch:
+        if "received_at" not in _columns("emails"):
+            batch.add_column(sa.Column("received_at", sa.DateTime(), nullable=True))
+        if "ix_emails_user_id_gmail_id" not in email_indexes:
+            batch.create_index("ix_emails_user_id_gmail_id", ["user_id", "gmail_id"], unique=True)
+
+    if "sync_jobs" not in existing_tables:
+        op.create_table(
+            "sync_jobs",
+            *_timestamps(),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE")),
+            sa.Column("mode", sa.String()),
+            sa.Column("limit", sa.Integer(), nullable=True),
+            sa.Column("status", sa.String()),
+            sa.Column("processed", sa.Integer()),
+            sa.Column("total", sa.Integer(), nullable=True),
+            sa.Column("result", sa.JSON(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_sync_jobs_id", "sync_jobs", ["id"])
+        op.create_index("ix_sync_jobs_user_id", "sync_jobs", ["user_id"])
+
+    if "analysis_cache" not in existing_tables:
+        op.create_table(
+            "analysis_cache",
+            *_timestamps(),
+            sa.Column("cache_key", sa.String()),
+            sa.Column("prompt_version", sa.String()),
+            sa.Column("analysis", sa.JSON()),
+            sa.Column("expires_at", sa.Float()),
+        )
+        op.create_index("ix_analysis_cache_id", "analysis_cache", ["id"])
+        op.create_index("ix_analysis_cache_cache_key", "analysis_cache", ["cache_key"], unique=True)
+        op.create_index("ix_analysis_cache_prompt_version", "analysis_cache", ["prompt_version"])
+
+    if "email_stats_buckets" not in existing_tables:
+        op.create_table(
+            "email_stats_buckets",
+            *_timestamps(),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("category", sa.String(), nullable=False),
+            sa.Column("priority_score", sa.Integer(), nullable=False),
+            sa.Column("sentiment", sa.String(), nullable=False),
+            sa.Column("is_read", sa.Boolean(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_email_stats_buckets_id", "email_stats_buckets", ["id"])
+        op.create_index(
+            "ix_email_stats_buckets_key",
+            "email_stats_buckets",
+            ["user_id", "category", "priority_score", "sentiment", "is_read"],
+            unique=True
+        )
+
+    if "email_hourly_counts" not in existing_tables:
+        op.create_table(
+            "email_hourly_counts",
+            *_timestamps(),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_email_hourly_counts_id", "email_hourly_counts", ["id"])
+        op.create_index("ix_email_hourly_counts_key", "email_hourly_counts", ["user_id", "bucket_start"], unique=True)
+
+def downgrade() -> None:
+    op.drop_table("email_hourly_counts")
+    op.drop_table("email_stats_buckets")
+    op.drop_table("analysis_cache")
+    op.drop_table("sync_jobs")
+    with op.batch_alter_table("emails") as batch:
+        batch.drop_index("ix_emails_user_id_gmail_id")
+        batch.drop_column("received_at")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("gmail_backfill_cursor")
+        batch.drop_column("gmail_history_id")
@@ -0,0 +1,24 @@
+"""Composite indexes matching the email list and dashboard queries
+
+Revision ID: 0003_email_query_indexes
+Revises: 0002_sync_jobs_caches_rollups
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+revision = "0003_email_query_indexes"
+down_revision = "0002_sync_jobs_caches_rollups"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index("ix_emails_user_id_created_at", "emails", ["user_id", "created_at", "id"])
+    op.create_index("ix_emails_user_id_category_created_at", "emails", ["user_id", "category", "created_at"])
+    op.create_index("ix_emails_user_id_priority_score_created_at", "emails", ["user_id", "priority_score", "created_at"])
+    op.create_index("ix_emails_category", "emails", ["category"])
+
+def downgrade() -> None:
+    op.drop_index("ix_emails_category", table_name="emails")
+    op.drop_index("ix_emails_user_id_priority_score_created_at", table_name="emails")
+    op.drop_index("ix_emails_user_id_category_created_at", table_name="emails")
+    op.drop_index("ix_emails_user_id_created_at", table_name="emails")
@@ -0,0 +1,130 @@
+"""Move message bodies into a compressed email_bodies table
+
+Revision ID: 0004_email_bodies
+Revises: 0003_email_query_indexes
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+import zlib
+
+revision = "0004_email_bodies"
+down_revision = "0003_email_query_indexes"
+branch_labels = None
+depends_on = None
+
+# Rows copied per statement
+CHUNK_SIZE = 500
+COMPRESSION_LEVEL = 6
+
+emails = sa.table(
+    "emails",
+    sa.column("id", sa.Integer()),
+    sa.column("body_text", sa.Text()),
+    sa.column("body_html", sa.Text()),
+)
+email_bodies = sa.table(
+    "email_bodies",
+    sa.column("email_id", sa.Integer()),
+    sa.column("text_compressed", sa.LargeBinary()),
+    sa.column("html_compressed", sa.LargeBinary()),
+)
+
+def _compress(body):
+    return zlib.compress(body.encode("utf-8"), COMPRESSION_LEVEL) if body is not None else None
+
+def _decompress(data):
+    return zlib.decompress(data).decode("utf-8") if data is not None else None
+
+def _drop_search_index(dialect: str) -> None:
+    # The old index reads emails.body_text; app.services.search recreates it on startup
+    if dialect == "sqlite":
+        for trigger in ("emails_fts_insert", "emails_fts_delete", "emails_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS emails_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_emails_search_vector")
+        op.execute("ALTER TABLE emails DROP COLUMN IF EXISTS search_vector")
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    _drop_search_index(dialect)
+    if dialect == "postgresql":
+        # Fill the now plain search_vector column while the bodies are still readable
+        op.execute("ALTER TABLE emails ADD COLUMN search_vector tsvector")
+        op.execute("""
+            UPDATE emails SET search_vector =
+                setweight(to_tsvector('simple', coalesce(subject, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(snippet, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(body_text, '')), 'C')
+        """)
+
+    op.create_table(
+        "email_bodies",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("email_id", sa.Integer(), sa.ForeignKey("emails.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("text_compressed", sa.LargeBinary(), nullable=True),
+        sa.Column("html_compressed", sa.LargeBinary(), nullable=True),
+    )
+    op.create_index("ix_email_bodies_id", "email_bodies", ["id"])
+    op.create_index("ix_email_bodies_email_id", "email_bodies", ["email_id"], unique=True)
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(emails.c.id, emails.c.body_text, emails.c.body_html)
+            .where(emails.c.id > last_id)
+            .order_by(emails.c.id)
+            .limit(CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        body_rows = [
+            {
+                "email_id": row.id,
+                "text_compressed": _compress(row.body_text),
+                "html_compressed": _compress(row.body_html),
+            }
+            for row in rows
+            if row.body_text is not None or row.body_html is not None
+        ]
+        if body_rows:
+            bind.execute(email_bodies.insert(), body_rows)
+        last_id = rows[-1].id
+
+    with op.batch_alter_table("emails") as batch:
+        batch.drop_column("body_html")
+        batch.drop_column("body_text")
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    _drop_search_index(dialect)
+
+    with op.batch_alter_table("emails") as batch:
+        batch.add_column(sa.Column("body_text", sa.Text(), nullable=True))
+        batch.add_column(sa.Column("body_html", sa.Text(), nullable=True))
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(email_bodies.c.email_id, email_bodies.c.text_compressed, email_bodies.c.html_compressed)
+            .where(email_bodies.c.email_id > last_id)
+            .order_by(email_bodies.c.email_id)
+            .limit(CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            bind.execute(
+                emails.update().where(emails.c.id == row.email_id).values(
+                    body_text=_decompress(row.text_compressed),
+                    body_html=_decompress(row.html_compressed)
+                )
+            )
+        last_id = rows[-1].email_id
+
+    op.drop_table("email_bodies")
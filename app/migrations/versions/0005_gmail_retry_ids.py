@@ -0,0 +1,21 @@
+"""Message ids whose fetch failed, retried by the next sync
+
+Revision ID: 0005_gmail_retry_ids
+Revises: 0004_email_bodies
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_gmail_retry_ids"
+down_revision = "0004_email_bodies"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("gmail_retry_ids", sa.JSON(), nullable=True))
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("gmail_retry_ids")
@@ -0,0 +1,23 @@
+"""Per-user sync lease shared by every process that syncs
+
+Revision ID: 0006_sync_lease
+Revises: 0005_gmail_retry_ids
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_sync_lease"
+down_revision = "0005_gmail_retry_ids"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("sync_lease_owner", sa.String(), nullable=True))
+        batch.add_column(sa.Column("sync_lease_until", sa.DateTime(), nullable=True))
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("sync_lease_until")
+        batch.drop_column("sync_lease_owner")
@@ -1,5 +1,9 @@
 from app.models.user import User
 from app.models.email import Email
+from app.models.email_body import EmailBody
 from app.models.draft import Draft
+from app.models.sync_job import SyncJob
+from app.models.analysis_cache import AnalysisCacheEntry
+from app.models.email_stats import EmailStatsBucket, EmailHourlyCount
 
-__all__ = ["User", "Email", "Draft"] 
\ No newline at end of file
+__all__ = ["User", "Email", "EmailBody", "Draft", "SyncJob", "AnalysisCacheEntry", "EmailStatsBucket", "EmailHourlyCount"] 
\ No newline at end of file
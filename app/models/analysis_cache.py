@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, JSON, Float
+from app.models.base import BaseModel
+
+class AnalysisCacheEntry(BaseModel):
+    __tablename__ = "analysis_cache"
+
+    cache_key = Column(String, unique=True, index=True)  # Content hash incl. prompt version
+    prompt_version = Column(String, index=True)  # Version of the analysis prompt that produced it
+    analysis = Column(JSON)  # Cached LLM analysis
+    expires_at = Column(Float)  # Unix timestamp
+
+    def __repr__(self):
+        return f"<AnalysisCacheEntry {self.cache_key}>"
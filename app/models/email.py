@@ -1,21 +1,32 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey, Text, JSON, Integer
+from sqlalchemy import Column, String, Boolean, ForeignKey, Text, JSON, Integer, Index, DateTime
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
 class Email(BaseModel):
     __tablename__ = "emails"
+    __table_args__ = (
+        # A Gmail message is stored at most once per user
+        Index("ix_emails_user_id_gmail_id", "user_id", "gmail_id", unique=True),
+        # Newest-first listing, keyset pagination and date-range filters
+        Index("ix_emails_user_id_created_at", "user_id", "created_at", "id"),
+        # Category filter on the list endpoint
+        Index("ix_emails_user_id_category_created_at", "user_id", "category", "created_at"),
+        # Priority filter on the list endpoint and dashboard high-priority emails
+        Index("ix_emails_user_id_priority_score_created_at", "user_id", "priority_score", "created_at"),
+        # Unanalyzed emails picked up by the batch analyzer
+        Index("ix_emails_category", "category"),
+    )
 
     user_id = Column(ForeignKey("users.id", ondelete="CASCADE"))
     gmail_id = Column(String, index=True)  # Gmail's message ID
     thread_id = Column(String, index=True)  # Gmail's thread ID
+    received_at = Column(DateTime, nullable=True)  # Gmail internalDate (UTC)
     
     subject = Column(String)
     sender = Column(String)
     recipients = Column(JSON)  # List of recipient emails
     
     snippet = Column(Text)  # Email preview
-    body_text = Column(Text, nullable=True)  # Plain text body
-    body_html = Column(Text, nullable=True)  # HTML body
     
     labels = Column(JSON)  # Gmail labels
     is_read = Column(Boolean, default=False)
@@ -31,6 +42,18 @@ class Email(BaseModel):
     # Relationships
     user = relationship("User", back_populates="emails")
     drafts = relationship("Draft", back_populates="email")
+    # Bodies live in email_bodies; eager-load with selectinload(Email.body) under asyncio
+    body = relationship("EmailBody", back_populates="email", uselist=False, cascade="all, delete-orphan")
+
+    @property
+    def body_text(self):
+        """Plain text body, decompressed from email_bodies"""
+        return self.body.body_text if self.body else None
+
+    @property
+    def body_html(self):
+        """HTML body, decompressed from email_bodies"""
+        return self.body.body_html if self.body else None
 
     def __repr__(self):
         return f"<Email {self.subject}>" 
\ No newline at end of file
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, ForeignKey, LargeBinary
+from sqlalchemy.orm import relationship
+from app.models.base import BaseModel
+from typing import Optional
+import zlib
+
+# zlib level for stored bodies (1 fastest .. 9 smallest)
+BODY_COMPRESSION_LEVEL = 6
+
+def compress_body(body: Optional[str]) -> Optional[bytes]:
+    """Compress a message body for storage"""
+    if body is None:
+        return None
+    return zlib.compress(body.encode("utf-8"), BODY_COMPRESSION_LEVEL)
+
+def decompress_body(data: Optional[bytes]) -> Optional[str]:
+    """Inverse of compress_body"""
+    if data is None:
+        return None
+    return zlib.decompress(data).decode("utf-8")
+
+class EmailBody(BaseModel):
+    """Compressed message bodies, kept out of the emails table that lists and stats scan"""
+    __tablename__ = "email_bodies"
+
+    email_id = Column(ForeignKey("emails.id", ondelete="CASCADE"), unique=True, index=True, nullable=False)
+    text_compressed = Column(LargeBinary, nullable=True)  # zlib-compressed plain text body
+    html_compressed = Column(LargeBinary, nullable=True)  # zlib-compressed HTML body
+
+    # Relationships
+    email = relationship("Email", back_populates="body")
+
+    @property
+    def body_text(self) -> Optional[str]:
+        return decompress_body(self.text_compressed)
+
+    @property
+    def body_html(self) -> Optional[str]:
+        return decompress_body(self.html_compressed)
+
+    def __repr__(self):
+        return f"<EmailBody {self.email_id}>"
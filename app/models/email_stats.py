@@ -0,0 +1,44 @@
+from sqlalchemy import Column, String, Boolean, ForeignKey, Integer, Index, DateTime
+from app.models.base import BaseModel
+
+class EmailStatsBucket(BaseModel):
+    """
+    Materialized email counts per user and (category, priority, sentiment,
+    read) combination. Missing analysis values are stored as "" / 0 so the
+    unique index can be used for upserts.
+    """
+    __tablename__ = "email_stats_buckets"
+    __table_args__ = (
+        Index(
+            "ix_email_stats_buckets_key",
+            "user_id", "category", "priority_score", "sentiment", "is_read",
+            unique=True
+        ),
+    )
+
+    user_id = Column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category = Column(String, nullable=False, default="")
+    priority_score = Column(Integer, nullable=False, default=0)
+    sentiment = Column(String, nullable=False, default="")
+    is_read = Column(Boolean, nullable=False, default=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EmailStatsBucket {self.user_id} {self.category} {self.count}>"
+
+class EmailHourlyCount(BaseModel):
+    """
+    Number of emails per user received in each UTC hour (by Gmail
+    internalDate). Daily timelines in any timezone are derived from it.
+    """
+    __tablename__ = "email_hourly_counts"
+    __table_args__ = (
+        Index("ix_email_hourly_counts_key", "user_id", "bucket_start", unique=True),
+    )
+
+    user_id = Column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)  # Start of the UTC hour
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EmailHourlyCount {self.user_id} {self.bucket_start} {self.count}>"
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, ForeignKey, Text, Integer, JSON, DateTime
+from sqlalchemy.orm import relationship
+from app.models.base import BaseModel
+
+class SyncJob(BaseModel):
+    __tablename__ = "sync_jobs"
+
+    user_id = Column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    mode = Column(String)  # "full", "incremental" or "backfill"
+    limit = Column(Integer, nullable=True)  # Message limit passed to the sync run
+    
+    status = Column(String, default="queued")  # queued, running, succeeded, failed
+    processed = Column(Integer, default=0)  # Messages processed so far
+    total = Column(Integer, nullable=True)  # Total messages, when known
+    
+    result = Column(JSON, nullable=True)  # Summary returned by the sync run
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Relationships
+    user = relationship("User", back_populates="sync_jobs")
+
+    def __repr__(self):
+        return f"<SyncJob {self.id} {self.mode} {self.status}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, JSON
+from sqlalchemy import Column, String, Boolean, DateTime, JSON
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -13,10 +13,16 @@ class User(BaseModel):
     google_credentials = Column(JSON)  # Store OAuth credentials
     gmail_sync_enabled = Column(Boolean, default=False)
     last_sync_timestamp = Column(String, nullable=True)  # Store ISO format timestamp
+    gmail_history_id = Column(String, nullable=True)  # Last seen Gmail historyId for incremental sync
+    gmail_backfill_cursor = Column(String, nullable=True)  # messages.list page token of an unfinished backfill
+    gmail_retry_ids = Column(JSON, nullable=True)  # Message ids whose fetch failed, retried by the next sync
+    sync_lease_owner = Column(String, nullable=True)  # Holder of the per-user sync lease (see user_sync_lease)
+    sync_lease_until = Column(DateTime, nullable=True)  # Lease expiry, so a crashed holder does not block syncs forever
     
     # Relationships
     emails = relationship("Email", back_populates="user", cascade="all, delete-orphan")
     drafts = relationship("Draft", back_populates="user", cascade="all, delete-orphan")
+    sync_jobs = relationship("SyncJob", back_populates="user", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<User {self.email}>" 
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""
+Multi-user Gmail sync scheduler
+
+Run with: python -m app.scheduler
+"""
+from app.services.scheduler import SyncScheduler
+
+if __name__ == "__main__":
+    SyncScheduler().run_forever()
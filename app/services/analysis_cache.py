@@ -0,0 +1,289 @@
+from collections import OrderedDict
+from app.core.config import settings
+from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+def _normalize(text: Optional[str]) -> str:
+    """Collapse whitespace and case so trivially different copies share a key"""
+    return " ".join((text or "").split()).lower()
+
+def analysis_cache_key(
+    subject: str,
+    sender: str,
+    body: str,
+    body_limit: int,
+    prompt_version: str
+) -> str:
+    """Content-addressed key for an analysis: normalized email fields plus prompt version"""
+    parts = [
+        prompt_version,
+        _normalize(subject),
+        _normalize(sender),
+        _normalize((body or "")[:body_limit])
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+class AnalysisCache:
+    """Base class for analysis cache backends; tracks hit-rate metrics"""
+
+    name = "base"
+    blocking = False  # Backends doing I/O are run in a worker thread
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, analysis: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def invalidate_other_versions(self, prompt_version: str) -> None:
+        """Drop entries created by other prompt versions (keys already include the version)"""
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.aget_first([key])
+
+    async def aget_first(self, keys: List[str]) -> Optional[Dict[str, Any]]:
+        """Return the analysis of the first key found, counted as a single hit or miss"""
+        analysis = None
+        for key in keys:
+            try:
+                if self.blocking:
+                    analysis = await asyncio.to_thread(self.get, key)
+                else:
+                    analysis = self.get(key)
+            except Exception as e:
+                # A broken cache must never fail an analysis
+                print(f"Analysis cache read failed: {str(e)}")
+            if analysis is not None:
+                break
+        if analysis is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return analysis
+
+    async def aset(self, key: str, analysis: Dict[str, Any]) -> None:
+        try:
+            if self.blocking:
+                await asyncio.to_thread(self.set, key, analysis)
+            else:
+                self.set(key, analysis)
+            self.writes += 1
+        except Exception as e:
+            print(f"Analysis cache write failed: {str(e)}")
+
+    async def aclear(self) -> None:
+        if self.blocking:
+            await asyncio.to_thread(self.clear)
+        else:
+            self.clear()
+
+    async def astats(self) -> Dict[str, Any]:
+        """Hit-rate metrics; counting entries can scan the backend, so it runs in a thread"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "entries": await asyncio.to_thread(self.size) if self.blocking else self.size(),
+            "ttl_seconds": self.ttl
+        }
+
+class MemoryAnalysisCache(AnalysisCache):
+    """In-process LRU cache with per-entry TTL"""
+
+    name = "memory"
+
+    def __init__(self, ttl: int, max_entries: int):
+        super().__init__(ttl)
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, analysis = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return analysis
+
+    def set(self, key: str, analysis: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, analysis)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class DatabaseAnalysisCache(AnalysisCache):
+    """Cache stored in the analysis_cache table of the application database"""
+
+    name = "database"
+    blocking = True
+
+    def __init__(self, ttl: int):
+        super().__init__(ttl)
+        self.prompt_version: Optional[str] = None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        from app.core.database import SessionLocal
+        from app.models import AnalysisCacheEntry
+        db = SessionLocal()
+        try:
+            entry = db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.cache_key == key).first()
+            if entry is None:
+                return None
+            if entry.expires_at < time.time():
+                db.delete(entry)
+                db.commit()
+                return None
+            return entry.analysis
+        finally:
+            db.close()
+
+    def set(self, key: str, analysis: Dict[str, Any]) -> None:
+        from app.core.database import SessionLocal
+        from app.models import AnalysisCacheEntry
+        db = SessionLocal()
+        try:
+            entry = db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.cache_key == key).first()
+            if entry is None:
+                entry = AnalysisCacheEntry(cache_key=key)
+                db.add(entry)
+            entry.prompt_version = self.prompt_version
+            entry.analysis = analysis
+            entry.expires_at = time.time() + self.ttl
+            db.commit()
+        finally:
+            db.close()
+
+    def size(self) -> Optional[int]:
+        from app.core.database import SessionLocal
+        from app.models import AnalysisCacheEntry
+        db = SessionLocal()
+        try:
+            return db.query(AnalysisCacheEntry).count()
+        finally:
+            db.close()
+
+    def clear(self) -> None:
+        from app.core.database import SessionLocal
+        from app.models import AnalysisCacheEntry
+        db = SessionLocal()
+        try:
+            db.query(AnalysisCacheEntry).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def invalidate_other_versions(self, prompt_version: str) -> None:
+        from app.core.database import SessionLocal
+        from app.models import AnalysisCacheEntry
+        self.prompt_version = prompt_version
+        db = SessionLocal()
+        try:
+            db.query(AnalysisCacheEntry).filter(
+                AnalysisCacheEntry.prompt_version != prompt_version
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+class RedisAnalysisCache(AnalysisCache):
+    """Cache shared between processes through Redis, expiring entries with SETEX"""
+
+    name = "redis"
+    blocking = True
+    prefix = "llm-analysis:"
+
+    def __init__(self, ttl: int, url: str):
+        super().__init__(ttl)
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._version_prefix = self.prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._redis.get(self._version_prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, analysis: Dict[str, Any]) -> None:
+        self._redis.setex(self._version_prefix + key, self.ttl, json.dumps(analysis))
+
+    def size(self) -> Optional[int]:
+        return sum(1 for _ in self._redis.scan_iter(match=self._version_prefix + "*"))
+
+    def clear(self) -> None:
+        for redis_key in self._redis.scan_iter(match=self.prefix + "*"):
+            self._redis.delete(redis_key)
+
+    def invalidate_other_versions(self, prompt_version: str) -> None:
+        self._version_prefix = f"{self.prefix}{prompt_version}:"
+        for redis_key in self._redis.scan_iter(match=self.prefix + "*"):
+            if not redis_key.decode().startswith(self._version_prefix):
+                self._redis.delete(redis_key)
+
+_cache: Optional[AnalysisCache] = None
+_cache_lock = threading.Lock()
+
+def get_analysis_cache(prompt_version: str) -> Optional[AnalysisCache]:
+    """
+    Return the configured analysis cache, creating it on first use.
+    Entries written by a different prompt version are dropped at creation.
+    Returns None when LLM_CACHE_BACKEND is "none".
+    """
+    global _cache
+    backend = settings.LLM_CACHE_BACKEND.lower()
+    if backend == "none":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if backend == "database":
+                    cache = DatabaseAnalysisCache(settings.LLM_CACHE_TTL)
+                elif backend == "redis":
+                    cache = RedisAnalysisCache(settings.LLM_CACHE_TTL, settings.LLM_CACHE_REDIS_URL)
+                else:
+                    cache = MemoryAnalysisCache(settings.LLM_CACHE_TTL, settings.LLM_CACHE_MAX_ENTRIES)
+                try:
+                    cache.invalidate_other_versions(prompt_version)
+                except Exception as e:
+                    print(f"Failed to invalidate stale analysis cache entries: {str(e)}")
+                _cache = cache
+    return _cache
+
+async def aget_analysis_cache(prompt_version: str) -> Optional[AnalysisCache]:
+    """
+    get_analysis_cache for async code: creating the cache invalidates other
+    prompt versions (a database delete or Redis scan), so that runs in a thread
+    """
+    if _cache is not None or settings.LLM_CACHE_BACKEND.lower() == "none":
+        return get_analysis_cache(prompt_version)
+    return await asyncio.to_thread(get_analysis_cache, prompt_version)
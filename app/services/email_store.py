@@ -0,0 +1,151 @@
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import Email, EmailBody
+from app.models.email_body import compress_body
+from app.services.search import index_email_text, unindex_emails
+from app.services.stats import record_new_email_rows
+from app.services.response_cache import invalidate_user_responses
+from typing import Dict, Any, List, Optional, Tuple
+import time
+import tracemalloc
+
+def _insert_statement(db: Session):
+    """
+    Build an INSERT for the emails table that skips rows which already exist
+    for the same (user_id, gmail_id) on SQLite and PostgreSQL
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name == "sqlite":
+        stmt = sqlite.insert(Email.__table__).on_conflict_do_nothing()
+    elif dialect.name == "postgresql":
+        stmt = postgresql.insert(Email.__table__).on_conflict_do_nothing()
+    else:
+        return insert(Email.__table__)
+    if dialect.insert_executemany_returning:
+        # Report which rows were actually written (conflicting rows are skipped)
+        stmt = stmt.returning(Email.__table__.c.gmail_id, Email.__table__.c.id)
+    return stmt
+
+# Keys of an email row that are stored compressed in email_bodies
+BODY_FIELDS = ("body_text", "body_html")
+
+def _execute_insert(db: Session, stmt, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Insert email rows and their compressed bodies, index them for search
+    and return the rows that were inserted, each with its new "id"
+    """
+    result = db.execute(stmt, [
+        {key: value for key, value in row.items() if key not in BODY_FIELDS}
+        for row in rows
+    ])
+    if result.returns_rows:
+        email_ids = dict(result.all())
+    else:
+        # No RETURNING support: conflicts raise, so every row was inserted
+        email_ids = dict(db.execute(
+            select(Email.gmail_id, Email.id).where(
+                Email.user_id == rows[0]["user_id"],
+                Email.gmail_id.in_([row["gmail_id"] for row in rows])
+            )
+        ).all())
+    written = [dict(row, id=email_ids[row["gmail_id"]]) for row in rows if row["gmail_id"] in email_ids]
+
+    body_rows = [
+        {
+            "email_id": row["id"],
+            "text_compressed": compress_body(row.get("body_text")),
+            "html_compressed": compress_body(row.get("body_html")),
+        }
+        for row in written
+        if row.get("body_text") is not None or row.get("body_html") is not None
+    ]
+    if body_rows:
+        db.execute(insert(EmailBody.__table__), body_rows)
+    index_email_text(db, [
+        (row["id"], row.get("subject"), row.get("snippet"), row.get("body_text"))
+        for row in written
+    ])
+    return written
+
+def bulk_insert_emails(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    chunk_size: Optional[int] = None,
+    track_memory: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    Insert email rows with Core executemany, committing after every chunk.
+    Bodies in the rows are compressed into email_bodies.
+    A chunk that fails is retried row by row so a single bad row only loses
+    itself. Returns counts plus rows per second and peak memory of the run.
+    """
+    chunk_size = max(1, chunk_size or settings.SYNC_INSERT_CHUNK_SIZE)
+    if track_memory is None:
+        track_memory = settings.SYNC_TRACK_MEMORY
+    started_tracing = track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if track_memory:
+        tracemalloc.reset_peak()
+
+    stmt = _insert_statement(db)
+    inserted = failed = 0
+    start_time = time.perf_counter()
+    try:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                written = _execute_insert(db, stmt, chunk)
+                record_new_email_rows(db, written)
+                db.commit()
+                inserted += len(written)
+            except Exception as e:
+                db.rollback()
+                print(f"Bulk insert of {len(chunk)} emails failed, retrying row by row: {str(e)}")
+                for row in chunk:
+                    try:
+                        written = _execute_insert(db, stmt, [row])
+                        record_new_email_rows(db, written)
+                        db.commit()
+                        inserted += len(written)
+                    except Exception as row_error:
+                        db.rollback()
+                        failed += 1
+                        print(f"Error storing message {row.get('gmail_id')}: {str(row_error)}")
+        elapsed = time.perf_counter() - start_time
+        if inserted:
+            for user_id in {row["user_id"] for row in rows}:
+                invalidate_user_responses(user_id)
+        peak_memory_kb = tracemalloc.get_traced_memory()[1] // 1024 if track_memory else None
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "chunk_size": chunk_size,
+        "seconds": round(elapsed, 4),
+        "rows_per_second": round(inserted / elapsed, 1) if elapsed > 0 else None,
+        "peak_memory_kb": peak_memory_kb
+    }
+
+def store_email_bodies(db: Session, emails: List[Email], bodies: Dict[str, Tuple[str, Optional[str]]]) -> int:
+    """
+    Attach bodies fetched on demand (gmail_id -> (body_text, body_html)) to
+    emails synced with metadata only, and re-index them with their body.
+    Does not commit. Returns the number of emails updated.
+    """
+    hydrated = [email for email in emails if email.body is None and email.gmail_id in bodies]
+    # Indexed without a body at sync time
+    unindex_emails(db, hydrated)
+    for email in hydrated:
+        body_text, body_html = bodies[email.gmail_id]
+        email.body = EmailBody(text_compressed=compress_body(body_text), html_compressed=compress_body(body_html))
+    index_email_text(db, [
+        (email.id, email.subject, email.snippet, bodies[email.gmail_id][0])
+        for email in hydrated
+    ])
+    return len(hydrated)
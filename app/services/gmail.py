@@ -3,8 +3,14 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from sqlalchemy.orm import Session
 from app.models import User, Email
-from typing import Dict, Any
-import base64
+from app.core.config import settings
+from app.services.email_store import bulk_insert_emails
+from app.services.mime import parse_message_body
+from app.services.rate_limit import acquire_gmail_quota, execute_gmail, is_rate_limited, is_retryable, record_gmail_stat, wait_before_retry
+from app.services.search import unindex_emails
+from app.services.stats import email_stats_key, record_email_removed, record_stats_change
+from app.services.response_cache import invalidate_user_responses
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
 import email
 from datetime import datetime
 import json
@@ -25,20 +31,274 @@ def create_gmail_service(credentials_dict: Dict[str, Any]) -> Any:
         # Handle credential creation errors
         raise Exception(f"Failed to create Gmail service: {str(e)}")
 
-def parse_email_body(payload):
-    """Extract email body from Gmail API message payload"""
-    if payload.get('body', {}).get('data'):
-        return base64.urlsafe_b64decode(payload['body']['data']).decode()
-    
-    # Handle multipart messages
-    if payload.get('parts'):
-        for part in payload['parts']:
-            if part['mimeType'] in ['text/plain', 'text/html']:
-                if part['body'].get('data'):
-                    return base64.urlsafe_b64decode(part['body']['data']).decode()
-    return ""
-
-def sync_emails(db: Session, user: User, limit: int = 50) -> Dict[str, Any]:
+# Progress callback used by sync jobs: (messages processed, total if known)
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+# Headers requested when syncing with GMAIL_SYNC_FORMAT=metadata
+METADATA_HEADERS = ['Subject', 'From', 'To', 'Date']
+
+# History record types applied during an incremental sync
+HISTORY_TYPES = ['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved']
+
+def _gmail_error_result(db: Session, user: User, e: HttpError) -> Dict[str, Any]:
+    """Turn a Gmail API error into a sync result, disabling sync on revoked tokens"""
+    if 'invalid_grant' in str(e) or 'Token has been expired or revoked' in str(e):
+        # Clear credentials to force re-authentication
+        user.gmail_sync_enabled = False
+        db.commit()
+        return {
+            "success": False,
+            "error": f"Authentication token expired or revoked. Please re-authenticate: {str(e)}"
+        }
+    return {
+        "success": False,
+        "error": f"Gmail API error: {str(e)}"
+    }
+
+def label_fields(label_ids) -> Dict[str, Any]:
+    """Return the label-derived column values for a list of Gmail label ids"""
+    return {
+        "labels": json.dumps(label_ids),
+        "is_read": 'UNREAD' not in label_ids,
+        "is_important": 'IMPORTANT' in label_ids
+    }
+
+def apply_labels(email_record: Email, label_ids) -> None:
+    """Update the label-derived fields of an email record"""
+    for field, value in label_fields(label_ids).items():
+        setattr(email_record, field, value)
+
+def _internal_date(msg: Dict[str, Any]) -> Optional[datetime]:
+    """Return the message's Gmail internalDate (epoch milliseconds) as naive UTC"""
+    try:
+        return datetime.utcfromtimestamp(int(msg['internalDate']) / 1000)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def build_email_row(user: User, msg: Dict[str, Any], with_body: bool = True) -> Dict[str, Any]:
+    """
+    Build the emails table row for a Gmail API message resource.
+    Without `with_body` (metadata format) the row has no body and the email
+    is hydrated later by fetch_message_bodies.
+    """
+    headers = msg['payload']['headers']
+    subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
+    sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Unknown')
+    to = next((h['value'] for h in headers if h['name'].lower() == 'to'), '')
+
+    row = {
+        "user_id": user.id,
+        "gmail_id": msg['id'],
+        "thread_id": msg['threadId'],
+        "subject": subject,
+        "sender": sender,
+        "recipients": json.dumps([to]),  # Store as JSON array
+        "snippet": msg.get('snippet', ''),
+        "received_at": _internal_date(msg),
+        "created_at": datetime.utcnow(),
+        **label_fields(msg.get('labelIds', []))
+    }
+    if with_body:
+        row["body_text"], row["body_html"] = parse_message_body(msg['payload'])
+    return row
+
+# Keep IN lists well below SQLite's bound-parameter limit
+DEDUP_CHUNK_SIZE = 500
+
+def find_new_message_ids(db: Session, user: User, message_ids: List[str]) -> List[str]:
+    """
+    Return the message ids that are not stored yet for this user, in order.
+    Known ids are loaded with one IN query per chunk instead of one query
+    per message.
+    """
+    known_ids = set()
+    for start in range(0, len(message_ids), DEDUP_CHUNK_SIZE):
+        chunk = message_ids[start:start + DEDUP_CHUNK_SIZE]
+        known_ids.update(
+            gmail_id for (gmail_id,) in db.query(Email.gmail_id).filter(
+                Email.user_id == user.id,
+                Email.gmail_id.in_(chunk)
+            )
+        )
+    seen = set()
+    new_ids = []
+    for message_id in message_ids:
+        if message_id not in known_ids and message_id not in seen:
+            seen.add(message_id)
+            new_ids.append(message_id)
+    return new_ids
+
+def get_current_history_id(service: Any, user_id: int) -> str:
+    """Return the mailbox's current historyId"""
+    profile = execute_gmail(user_id, 'getProfile', service.users().getProfile(userId='me'))
+    return profile['historyId']
+
+def fetch_messages(service: Any, user_id: int, message_ids: Iterable[str], format: str = 'full') -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Fetch messages using Gmail batch HTTP requests (up to GMAIL_BATCH_SIZE
+    per round trip), taking the quota units of every sub-request from the
+    project and the user's limiters first.
+    Sub-requests that are rate limited or hit a transient error are fetched
+    again in a new batch after a backoff, up to GMAIL_MAX_RETRIES times.
+    Returns the fetched messages in request order and the ids that could
+    not be fetched; messages that no longer exist (404) are in neither.
+    """
+    message_ids = list(message_ids)
+    batch_size = max(1, min(settings.GMAIL_BATCH_SIZE, 100))
+    params = {'format': format}
+    if format == 'metadata':
+        params['metadataHeaders'] = METADATA_HEADERS
+    fetched: Dict[str, Dict[str, Any]] = {}
+    failed: Dict[str, Exception] = {}
+    unfetched: List[str] = []
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            failed[request_id] = exception
+        else:
+            fetched[request_id] = response
+
+    pending = message_ids
+    for attempt in range(settings.GMAIL_MAX_RETRIES + 1):
+        failed.clear()
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            batch = service.new_batch_http_request(callback=on_response)
+            for message_id in chunk:
+                batch.add(
+                    service.users().messages().get(userId='me', id=message_id, **params),
+                    request_id=message_id
+                )
+            acquire_gmail_quota(user_id, 'messages.get', len(chunk))
+            try:
+                batch.execute()
+            except HttpError as e:
+                # The whole batch was rejected, retry all of its messages
+                if not is_retryable(e):
+                    raise
+                failed.update((message_id, e) for message_id in chunk if message_id not in fetched)
+
+        pending = []
+        for message_id, error in failed.items():
+            if is_retryable(error):
+                pending.append(message_id)
+            elif isinstance(error, HttpError) and error.resp.status == 404:
+                print(f"Message {message_id} no longer exists, skipping it")
+            else:
+                unfetched.append(message_id)
+                print(f"Error fetching message {message_id}: {str(error)}")
+        if not pending:
+            break
+        if attempt == settings.GMAIL_MAX_RETRIES:
+            record_gmail_stat("gave_up", len(pending))
+            unfetched.extend(pending)
+            print(f"Giving up on {len(pending)} messages after {attempt} retries")
+            break
+        print(f"{len(pending)} message fetches throttled or failed, retrying (attempt {attempt + 1})")
+        wait_before_retry(
+            attempt,
+            failed[pending[0]],
+            throttled=sum(1 for message_id in pending if is_rate_limited(failed[message_id]))
+        )
+
+    # Preserve the requested order
+    return [fetched[message_id] for message_id in message_ids if message_id in fetched], unfetched
+
+def message_size(msg: Dict[str, Any]) -> int:
+    """Approximate bytes transferred for a message resource (its compact JSON)"""
+    return len(json.dumps(msg, separators=(',', ':')))
+
+def sync_format() -> str:
+    """Message format used by syncs: 'full', or 'metadata' for headers only"""
+    return 'metadata' if settings.GMAIL_SYNC_FORMAT.lower() == 'metadata' else 'full'
+
+def fetch_email_rows(service: Any, user: User, message_ids: List[str]) -> Tuple[List[Dict[str, Any]], int, List[str]]:
+    """
+    Fetch messages in the configured sync format and build their rows.
+    Returns the rows, the approximate number of bytes fetched and the ids
+    that could not be fetched.
+    """
+    message_format = sync_format()
+    messages, unfetched = fetch_messages(service, user.id, message_ids, format=message_format)
+    rows = [build_email_row(user, msg, with_body=message_format == 'full') for msg in messages]
+    return rows, sum(message_size(msg) for msg in messages), unfetched
+
+def remember_unfetched(user: User, message_ids: List[str]) -> None:
+    """Add ids that could not be fetched to the user's retry list (saved with the sync position)"""
+    if message_ids:
+        user.gmail_retry_ids = list(dict.fromkeys((user.gmail_retry_ids or []) + message_ids))
+
+def retry_unfetched_messages(db: Session, service: Any, user: User) -> Dict[str, int]:
+    """
+    Fetch and store the messages that earlier syncs could not fetch.
+    Ids that fail again stay on the retry list. Commits.
+    """
+    retry_ids = list(user.gmail_retry_ids or [])
+    if not retry_ids:
+        return {"inserted": 0, "bytes": 0}
+    rows, fetched_bytes, unfetched = fetch_email_rows(service, user, find_new_message_ids(db, user, retry_ids))
+    inserted = bulk_insert_emails(db, rows)["inserted"]
+    user.gmail_retry_ids = unfetched or None
+    db.commit()
+    return {"inserted": inserted, "bytes": fetched_bytes}
+
+def unfetched_result(result: Dict[str, Any], unfetched: List[str], user: User) -> Dict[str, Any]:
+    """Report messages of this run that could not be fetched and the retry list size"""
+    result["failed_messages"] = len(unfetched)
+    result["retry_pending"] = len(user.gmail_retry_ids or [])
+    if unfetched:
+        result["error"] = f"{len(unfetched)} messages could not be fetched and will be retried by the next sync"
+    return result
+
+def fetch_message_bodies(credentials_dict: Dict[str, Any], user_id: int, message_ids: List[str]) -> Dict[str, Tuple[str, Optional[str]]]:
+    """
+    Fetch full messages and return gmail_id -> (body_text, body_html), for
+    emails that were synced with metadata only. Blocking; run it in a thread
+    from async code.
+    """
+    service = create_gmail_service(credentials_dict)
+    messages, _ = fetch_messages(service, user_id, message_ids)
+    print(f"Fetched {len(messages)} email bodies ({sum(message_size(msg) for msg in messages)} bytes)")
+    return {msg['id']: parse_message_body(msg['payload']) for msg in messages}
+
+def iter_inbox_pages(
+    service: Any,
+    user_id: int,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    label_ids: Optional[List[str]] = None
+) -> Iterator[Tuple[List[str], Optional[str]]]:
+    """
+    Follow messages.list page tokens over the inbox (only messages that
+    also carry all of `label_ids`, when given).
+    Yields (message_ids, next_page_token) for each page until the inbox or
+    `limit` is exhausted. Page sizes are trimmed so a limited run always
+    stops on a page boundary and next_page_token can be used to resume.
+    """
+    page_size = max(1, min(settings.GMAIL_LIST_PAGE_SIZE, 500))
+    params = {'labelIds': label_ids} if label_ids else {}
+    listed = 0
+    while limit is None or listed < limit:
+        results = execute_gmail(user_id, 'messages.list', service.users().messages().list(
+            userId='me',
+            maxResults=page_size if limit is None else min(page_size, limit - listed),
+            q='in:inbox',  # Only sync inbox messages for now
+            pageToken=page_token,
+            **params
+        ))
+        message_ids = [message['id'] for message in results.get('messages', [])]
+        listed += len(message_ids)
+        page_token = results.get('nextPageToken')
+        yield message_ids, page_token
+        if not page_token:
+            break
+
+def sync_emails(
+    db: Session,
+    user: User,
+    limit: int = 50,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
     """
     Sync emails from Gmail to local database
     Returns summary of sync operation
@@ -48,89 +308,364 @@ def sync_emails(db: Session, user: User, limit: int = 50) -> Dict[str, Any]:
         
         # Get list of emails
         try:
-            results = service.users().messages().list(
-                userId='me',
-                maxResults=limit,
-                q='in:inbox'  # Only sync inbox messages for now
-            ).execute()
+            # Record the history position before listing so that changes
+            # made during the sync are picked up by the next incremental run
+            history_id = get_current_history_id(service, user.id)
+            messages = [
+                message_id
+                for page_ids, _ in iter_inbox_pages(service, user.id, limit)
+                for message_id in page_ids
+            ]
+            retried = retry_unfetched_messages(db, service, user)
         except HttpError as e:
-            if 'invalid_grant' in str(e) or 'Token has been expired or revoked' in str(e):
-                # Clear credentials to force re-authentication
-                user.gmail_sync_enabled = False
-                db.commit()
-                return {
-                    "success": False,
-                    "error": f"Authentication token expired or revoked. Please re-authenticate: {str(e)}"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Gmail API error: {str(e)}"
-                }
+            return _gmail_error_result(db, user, e)
         
-        messages = results.get('messages', [])
-        sync_count = 0
+        # Skip emails that already exist
+        new_ids = find_new_message_ids(db, user, messages)
         
-        for message in messages:
-            # Check if email already exists
-            existing_email = db.query(Email).filter(
-                Email.user_id == user.id,
-                Email.gmail_id == message['id']
-            ).first()
-            
-            if existing_email:
-                continue
-                
-            # Get full message details
-            try:
-                msg = service.users().messages().get(
-                    userId='me',
-                    id=message['id'],
-                    format='full'
-                ).execute()
-            except HttpError as e:
-                # Log error but continue with other messages
-                print(f"Error fetching message {message['id']}: {str(e)}")
-                continue
-            
-            # Parse headers
-            headers = msg['payload']['headers']
-            subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
-            sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Unknown')
-            to = next((h['value'] for h in headers if h['name'].lower() == 'to'), '')
-            
-            # Create new email record
-            new_email = Email(
-                user_id=user.id,
-                gmail_id=msg['id'],
-                thread_id=msg['threadId'],
-                subject=subject,
-                sender=sender,
-                recipients=json.dumps([to]),  # Store as JSON array
-                snippet=msg.get('snippet', ''),
-                body_text=parse_email_body(msg['payload']),
-                labels=json.dumps(msg.get('labelIds', [])),
-                is_read='UNREAD' not in msg.get('labelIds', []),
-                is_important='IMPORTANT' in msg.get('labelIds', []),
-                created_at=datetime.utcnow().isoformat()  # Add created_at timestamp
-            )
-            
-            db.add(new_email)
-            sync_count += 1
+        # Get message details in batches and store them in bulk
+        rows = []
+        unfetched = []
+        fetched_bytes = retried["bytes"]
+        batch_size = max(1, min(settings.GMAIL_BATCH_SIZE, 100))
+        for start in range(0, len(new_ids), batch_size):
+            chunk = new_ids[start:start + batch_size]
+            chunk_rows, chunk_bytes, chunk_unfetched = fetch_email_rows(service, user, chunk)
+            rows.extend(chunk_rows)
+            unfetched.extend(chunk_unfetched)
+            fetched_bytes += chunk_bytes
+            if progress:
+                progress(start + len(chunk), len(new_ids))
+        insert_stats = bulk_insert_emails(db, rows)
         
-        # Update last sync timestamp
+        # Update last sync timestamp and history position; messages that
+        # could not be fetched are kept for the next sync to retry
         user.last_sync_timestamp = datetime.utcnow().isoformat()
+        user.gmail_history_id = history_id
+        remember_unfetched(user, unfetched)
         db.commit()
         
+        return unfetched_result({
+            "success": True,
+            "mode": "full",
+            "format": sync_format(),
+            "emails_synced": insert_stats["inserted"] + retried["inserted"],
+            "total_messages": len(messages),
+            "bytes_fetched": fetched_bytes,
+            "insert_stats": insert_stats
+        }, unfetched, user)
+        
+    except Exception as e:
+        db.rollback()
         return {
+            "success": False,
+            "error": str(e)
+        }
+
+def backfill_emails(
+    db: Session,
+    user: User,
+    limit: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    start_history_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Stream the whole inbox into the local database page by page.
+    Each page is deduplicated, fetched, inserted and committed together with
+    the page token of the next page, so memory stays bounded by one page and
+    an interrupted backfill resumes from the stored cursor.
+    A fresh backfill records `start_history_id` (default: the current one)
+    as the position incremental sync continues from.
+    """
+    try:
+        service = create_gmail_service(user.google_credentials)
+        synced_count = listed_count = fetched_bytes = 0
+        unfetched = []
+        try:
+            if not user.gmail_backfill_cursor and not user.gmail_history_id:
+                # Fresh backfill: anything changed from here on is left to incremental sync
+                user.gmail_history_id = start_history_id or get_current_history_id(service, user.id)
+
+            retried = retry_unfetched_messages(db, service, user)
+            synced_count += retried["inserted"]
+            fetched_bytes += retried["bytes"]
+
+            pages = iter_inbox_pages(service, user.id, limit, user.gmail_backfill_cursor)
+            for message_ids, next_page_token in pages:
+                listed_count += len(message_ids)
+                new_ids = find_new_message_ids(db, user, message_ids)
+
+                # Rows go through Core inserts, so nothing accumulates in the session
+                rows, page_bytes, page_unfetched = fetch_email_rows(service, user, new_ids)
+                fetched_bytes += page_bytes
+                synced_count += bulk_insert_emails(db, rows)["inserted"]
+
+                # The cursor moves past the page only together with its unfetched ids
+                unfetched.extend(page_unfetched)
+                remember_unfetched(user, page_unfetched)
+                user.gmail_backfill_cursor = next_page_token
+                db.commit()
+                if progress:
+                    progress(listed_count, limit)
+        except HttpError as e:
+            db.rollback()
+            result = _gmail_error_result(db, user, e)
+            result["emails_synced"] = synced_count
+            return result
+
+        user.last_sync_timestamp = datetime.utcnow().isoformat()
+        db.commit()
+
+        return unfetched_result({
             "success": True,
-            "emails_synced": sync_count,
-            "total_messages": len(messages)
+            "mode": "backfill",
+            "format": sync_format(),
+            "emails_synced": synced_count,
+            "total_messages": listed_count,
+            "bytes_fetched": fetched_bytes,
+            "complete": user.gmail_backfill_cursor is None,
+            "cursor": user.gmail_backfill_cursor
+        }, unfetched, user)
+
+    except Exception as e:
+        db.rollback()
+        return {
+            "success": False,
+            "error": str(e)
         }
-        
+
+def _collect_history_changes(records) -> Dict[str, Optional[list]]:
+    """
+    Fold history records into the final state of each touched message.
+    Returns a mapping of gmail_id -> latest label ids (None when deleted).
+    """
+    changes: Dict[str, Optional[list]] = {}
+    for record in records:
+        for item in record.get('messagesAdded', []):
+            msg = item['message']
+            changes[msg['id']] = msg.get('labelIds', [])
+        for key in ('labelsAdded', 'labelsRemoved'):
+            for item in record.get(key, []):
+                msg = item['message']
+                if changes.get(msg['id'], []) is not None:
+                    changes[msg['id']] = msg.get('labelIds', [])
+        for item in record.get('messagesDeleted', []):
+            changes[item['message']['id']] = None
+    return changes
+
+def _remove_email(db: Session, email_record: Email) -> None:
+    record_email_removed(db, email_record)
+    unindex_emails(db, [email_record])
+    db.delete(email_record)
+
+def _relabel_email(db: Session, email_record: Email, label_ids: List[str]) -> bool:
+    """Apply Gmail labels to a stored email; returns whether anything changed"""
+    old_key = email_stats_key(email_record)
+    old_fields = (email_record.labels, email_record.is_read, email_record.is_important)
+    apply_labels(email_record, label_ids)
+    record_stats_change(db, email_record.user_id, old_key, email_stats_key(email_record))
+    return old_fields != (email_record.labels, email_record.is_read, email_record.is_important)
+
+def reconcile_stored_emails(db: Session, service: Any, user: User) -> Dict[str, int]:
+    """
+    Bring the labels of every stored email up to date and delete emails
+    that no longer exist in Gmail, without history.
+    Inbox membership and the UNREAD / IMPORTANT labels come from listing
+    the inbox; emails that left the inbox are checked one by one with a
+    minimal get (404 means deleted). Each chunk is planned and fetched
+    before anything is written, then applied in one short write: the gets
+    can back off for minutes and must not hold the database write lock.
+    """
+    inbox_ids = {message_id for page_ids, _ in iter_inbox_pages(service, user.id) for message_id in page_ids}
+    unread_ids = {message_id for page_ids, _ in iter_inbox_pages(service, user.id, label_ids=['UNREAD']) for message_id in page_ids}
+    important_ids = {message_id for page_ids, _ in iter_inbox_pages(service, user.id, label_ids=['IMPORTANT']) for message_id in page_ids}
+
+    updated = deleted = unchecked = 0
+    last_id = 0
+    while True:
+        chunk = db.query(Email).filter(
+            Email.user_id == user.id,
+            Email.id > last_id
+        ).order_by(Email.id).limit(DEDUP_CHUNK_SIZE).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        new_labels = {}
+        left_inbox = {}
+        for email_record in chunk:
+            if email_record.gmail_id not in inbox_ids:
+                left_inbox[email_record.gmail_id] = email_record.id
+                continue
+            present = {'INBOX': True, 'UNREAD': email_record.gmail_id in unread_ids, 'IMPORTANT': email_record.gmail_id in important_ids}
+            label_ids = [label for label in json.loads(email_record.labels or '[]') if present.get(label, True)]
+            label_ids += [label for label, is_present in present.items() if is_present and label not in label_ids]
+            new_labels[email_record.id] = label_ids
+        # End the read transaction: an old snapshot could not be upgraded to
+        # a write after other sessions commit during the gets
+        db.commit()
+
+        messages, unfetched = fetch_messages(service, user.id, list(left_inbox), format='minimal')
+        for msg in messages:
+            new_labels[left_inbox.pop(msg['id'])] = msg.get('labelIds', [])
+        for gmail_id in unfetched:
+            # State unknown, keep the stored email as it is
+            left_inbox.pop(gmail_id)
+            unchecked += 1
+
+        # Rows deleted by someone else meanwhile are skipped
+        records = {
+            email_record.id: email_record
+            for email_record in db.query(Email).filter(Email.id.in_(list(new_labels) + list(left_inbox.values())))
+        }
+        for email_id, label_ids in new_labels.items():
+            if email_id in records and _relabel_email(db, records[email_id], label_ids):
+                updated += 1
+        for email_id in left_inbox.values():
+            if email_id in records:
+                _remove_email(db, records[email_id])
+                deleted += 1
+        db.commit()
+
+    if updated or deleted:
+        invalidate_user_responses(user.id)
+    return {"updated": updated, "deleted": deleted, "unchecked": unchecked}
+
+def resync_emails(
+    db: Session,
+    user: User,
+    limit: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Full resync for when the stored history position has expired: takes a
+    new history position, reconciles labels and deletions of every stored
+    email, then restarts the backfill from the first inbox page so new
+    messages are stored (resumable, `limit` messages per run).
+    The expired position is cleared before the backfill starts, so a resync
+    that stops early is continued by backfill runs, not incremental ones.
+    """
+    try:
+        service = create_gmail_service(user.google_credentials)
+        try:
+            history_id = get_current_history_id(service, user.id)
+            reconciled = reconcile_stored_emails(db, service, user)
+        except HttpError as e:
+            db.rollback()
+            return _gmail_error_result(db, user, e)
+        user.gmail_history_id = None
+        user.gmail_backfill_cursor = None
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+    # The new position is stored together with the first backfilled page
+    result = backfill_emails(db, user, limit, progress, start_history_id=history_id)
+    result.update({
+        "mode": "resync",
+        "emails_updated": reconciled["updated"],
+        "emails_deleted": reconciled["deleted"],
+        "emails_unchecked": reconciled["unchecked"]
+    })
+    return result
+
+def sync_emails_incremental(
+    db: Session,
+    user: User,
+    limit: int = 50,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Apply only the changes recorded in Gmail history since the last sync.
+    Falls back to a full sync when there is no stored history position and
+    to a resync (resync_emails) when Gmail reports that the stored position
+    has expired.
+    """
+    if not user.gmail_history_id:
+        return sync_emails(db, user, limit, progress)
+
+    try:
+        service = create_gmail_service(user.google_credentials)
+
+        records = []
+        page_token = None
+        try:
+            while True:
+                response = execute_gmail(user.id, 'history.list', service.users().history().list(
+                    userId='me',
+                    startHistoryId=user.gmail_history_id,
+                    historyTypes=HISTORY_TYPES,
+                    pageToken=page_token
+                ))
+                records.extend(response.get('history', []))
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        except HttpError as e:
+            if e.resp.status == 404:
+                # History window expired, a full resync is required
+                print(f"History {user.gmail_history_id} expired for {user.email}, running full resync")
+                return resync_emails(db, user, limit, progress)
+            return _gmail_error_result(db, user, e)
+
+        changes = _collect_history_changes(records)
+        existing = {
+            email_record.gmail_id: email_record
+            for email_record in db.query(Email).filter(
+                Email.user_id == user.id,
+                Email.gmail_id.in_(list(changes))
+            ).all()
+        } if changes else {}
+
+        deleted_count = updated_count = 0
+        new_ids = []
+        for gmail_id, label_ids in changes.items():
+            email_record = existing.get(gmail_id)
+            if label_ids is None:
+                if email_record:
+                    _remove_email(db, email_record)
+                    deleted_count += 1
+            elif email_record:
+                _relabel_email(db, email_record, label_ids)
+                updated_count += 1
+            elif 'INBOX' in label_ids:
+                # New to the inbox (delivered or moved back), fetch it
+                new_ids.append(gmail_id)
+
+        db.commit()
+        retried = retry_unfetched_messages(db, service, user)
+        rows, fetched_bytes, unfetched = fetch_email_rows(service, user, new_ids)
+        fetched_bytes += retried["bytes"]
+        added_count = bulk_insert_emails(db, rows)["inserted"] + retried["inserted"]
+        if progress:
+            progress(len(changes), len(changes))
+
+        # History moves past messages that could not be fetched only once they are on the retry list
+        user.last_sync_timestamp = datetime.utcnow().isoformat()
+        user.gmail_history_id = response.get('historyId', user.gmail_history_id)
+        remember_unfetched(user, unfetched)
+        db.commit()
+        if deleted_count or updated_count:
+            invalidate_user_responses(user.id)
+
+        return unfetched_result({
+            "success": True,
+            "mode": "incremental",
+            "format": sync_format(),
+            "emails_synced": added_count,
+            "bytes_fetched": fetched_bytes,
+            "emails_updated": updated_count,
+            "emails_deleted": deleted_count,
+            "history_records": len(records)
+        }, unfetched, user)
+
     except Exception as e:
         db.rollback()
         return {
             "success": False,
             "error": str(e)
-        } 
\ No newline at end of file
+        }
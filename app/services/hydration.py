@@ -0,0 +1,40 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import User, Email
+from app.services.email_store import store_email_bodies
+from app.services.gmail import fetch_message_bodies
+from typing import Dict, List
+import asyncio
+
+async def ensure_email_bodies(db: AsyncSession, emails: List[Email]) -> int:
+    """
+    Fetch bodies from Gmail for emails that were synced with metadata only
+    (GMAIL_SYNC_FORMAT=metadata) and store them. Emails must be loaded with
+    their body relationship. Returns the number of emails hydrated; failures
+    are logged and leave the email with its snippet only.
+    """
+    by_user: Dict[int, List[Email]] = {}
+    for email in emails:
+        if email.body is None:
+            by_user.setdefault(email.user_id, []).append(email)
+    
+    hydrated = 0
+    for user_id, user_emails in by_user.items():
+        user = await db.get(User, user_id)
+        if not user or not user.google_credentials:
+            continue
+        try:
+            # Gmail calls are blocking, keep them off the event loop
+            bodies = await asyncio.to_thread(
+                fetch_message_bodies,
+                user.google_credentials,
+                user.id,
+                [email.gmail_id for email in user_emails]
+            )
+        except Exception as e:
+            print(f"Error fetching email bodies for user {user_id}: {str(e)}")
+            continue
+        hydrated += await db.run_sync(store_email_bodies, user_emails, bodies)
+    
+    if hydrated:
+        await db.commit()
+    return hydrated
@@ -0,0 +1,196 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import User, SyncJob
+from app.services.gmail import sync_emails, sync_emails_incremental, backfill_emails
+from typing import Callable, Dict, Any, Iterator, Optional
+from datetime import datetime, timedelta
+import os
+import socket
+import threading
+import time
+import uuid
+
+SYNC_MODES = {
+    "full": sync_emails,
+    "incremental": sync_emails_incremental,
+    "backfill": backfill_emails,
+}
+
+# In-process fallback used when no Celery broker is configured
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.SYNC_WORKER_THREADS),
+            thread_name_prefix="sync-job"
+        )
+    return _executor
+
+# One sync at a time per user across the API, Celery workers and the scheduler,
+# enforced with a lease on the users row
+_LEASE_POLL_SECONDS = 1.0
+
+def _claim_sync_lease(session_factory: Callable[[], Session], user_id: int, owner: str) -> bool:
+    """Take or renew the user's sync lease if it is free, expired or already ours"""
+    db = session_factory()
+    try:
+        now = datetime.utcnow()
+        users = User.__table__
+        result = db.execute(
+            update(users)
+            .where(
+                users.c.id == user_id,
+                or_(
+                    users.c.sync_lease_until.is_(None),
+                    users.c.sync_lease_until < now,
+                    users.c.sync_lease_owner == owner
+                )
+            )
+            .values(sync_lease_owner=owner, sync_lease_until=now + timedelta(seconds=settings.SYNC_LEASE_SECONDS))
+        )
+        db.commit()
+        return result.rowcount == 1
+    finally:
+        db.close()
+
+def _release_sync_lease(session_factory: Callable[[], Session], user_id: int, owner: str) -> None:
+    db = session_factory()
+    try:
+        users = User.__table__
+        db.execute(
+            update(users)
+            .where(users.c.id == user_id, users.c.sync_lease_owner == owner)
+            .values(sync_lease_owner=None, sync_lease_until=None)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+@contextmanager
+def user_sync_lease(
+    user_id: int,
+    blocking: bool = True,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Iterator[bool]:
+    """
+    Hold the user's sync lease for the duration of the block and yield
+    whether it was acquired. With `blocking` it waits for the current holder.
+    The lease is renewed in the background and lapses after
+    SYNC_LEASE_SECONDS if its holder dies.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+    acquired = _claim_sync_lease(session_factory, user_id, owner)
+    while not acquired and blocking:
+        time.sleep(_LEASE_POLL_SECONDS)
+        acquired = _claim_sync_lease(session_factory, user_id, owner)
+    if not acquired:
+        yield False
+        return
+
+    stop = threading.Event()
+
+    def renew() -> None:
+        while not stop.wait(settings.SYNC_LEASE_SECONDS / 3):
+            try:
+                if not _claim_sync_lease(session_factory, user_id, owner):
+                    print(f"Sync lease of user {user_id} was lost to another process")
+            except Exception as e:
+                print(f"Error renewing sync lease of user {user_id}: {str(e)}")
+
+    renewer = threading.Thread(target=renew, name=f"sync-lease-{user_id}", daemon=True)
+    renewer.start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        renewer.join()
+        _release_sync_lease(session_factory, user_id, owner)
+
+def enqueue_sync_job(db: Session, user: User, mode: str = "full", limit: Optional[int] = 50) -> SyncJob:
+    """
+    Record a queued sync job and hand it to the worker.
+    Jobs go to Celery when CELERY_BROKER_URL is set, otherwise they run on
+    an in-process thread pool.
+    """
+    if mode not in SYNC_MODES:
+        raise ValueError(f"Unknown sync mode: {mode}")
+
+    job = SyncJob(user_id=user.id, mode=mode, limit=limit, status="queued")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    if settings.CELERY_BROKER_URL:
+        from app.worker import run_sync_job_task
+        run_sync_job_task.delay(job.id)
+    else:
+        _get_executor().submit(run_sync_job, job.id)
+    return job
+
+def run_sync_job(job_id: int) -> None:
+    """Execute a queued sync job, recording progress and the final result on the job row"""
+    db = SessionLocal()
+    try:
+        job = db.get(SyncJob, job_id)
+        if not job or job.status != "queued":
+            return
+        user = db.get(User, job.user_id)
+        if not user:
+            job.status = "failed"
+            job.error = "User not found"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return
+
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        db.commit()
+
+        def report_progress(processed: int, total: Optional[int]) -> None:
+            # Sync commits its own work before reporting, so the same session is safe to use
+            job.processed = processed
+            job.total = total
+            db.commit()
+
+        with user_sync_lease(user.id):
+            result = SYNC_MODES[job.mode](db, user, job.limit, progress=report_progress)
+
+        job.status = "succeeded" if result.get("success") else "failed"
+        job.result = result
+        job.error = result.get("error")
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        job = db.get(SyncJob, job_id)
+        if job:
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
+
+def serialize_job(job: SyncJob) -> Dict[str, Any]:
+    """Return the API representation of a sync job"""
+    return {
+        "job_id": job.id,
+        "mode": job.mode,
+        "limit": job.limit,
+        "status": job.status,
+        "progress": {
+            "processed": job.processed or 0,
+            "total": job.total
+        },
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
@@ -1,25 +1,58 @@
 import httpx
 from app.core.config import settings
-from typing import Dict, Any, List, Optional
+from app.services.analysis_cache import aget_analysis_cache, analysis_cache_key
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Tuple
+import asyncio
+import hashlib
 import json
 
 DEEPSEEK_API_BASE = settings.DEEPSEEK_API_BASE
 DEEPSEEK_API_KEY = settings.DEEPSEEK_API_KEY
 
-async def analyze_email(subject: str, body: str, sender: str) -> Dict[str, Any]:
-    """
-    Analyze email content using DeepSeek LLM to extract:
-    - Category
-    - Priority
-    - Sentiment
-    - Summary
-    - Action Items
-    """
-    prompt = f"""Analyze this email and provide structured information in JSON format. Your response should be ONLY valid JSON, no other text.
+# Application-lifetime client shared by all LLM calls (keep-alive, HTTP/2)
+_http_client: Optional[httpx.AsyncClient] = None
+
+def _create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.LLM_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY
+        ),
+        timeout=settings.LLM_REQUEST_TIMEOUT
+    )
+
+async def start_http_client() -> None:
+    """Create the shared LLM client (called from the FastAPI lifespan)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _create_http_client()
+
+async def close_http_client() -> None:
+    """Close the shared LLM client and its pooled connections"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared LLM client, creating it if used outside the app lifespan"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _create_http_client()
+    return _http_client
+
+# Analysis prompt. Any change to these values changes ANALYSIS_PROMPT_VERSION,
+# which invalidates cached analyses produced by the previous prompt.
+ANALYSIS_MODEL = "deepseek-chat"
+ANALYSIS_BODY_LIMIT = 1000
+ANALYSIS_SYSTEM_PROMPT = "You are an AI assistant that analyzes emails and provides structured information in JSON format. Always respond with valid JSON only, no other text."
+ANALYSIS_PROMPT_TEMPLATE = """Analyze this email and provide structured information in JSON format. Your response should be ONLY valid JSON, no other text.
 
 Email Subject: {subject}
 From: {sender}
-Content: {body[:1000]}
+Content: {body}
 
 Required JSON format:
 {{
@@ -30,88 +63,307 @@ Required JSON format:
     "action_items": ["list", "of", "actions"],
     "tone": "Formal|Casual|Professional|Urgent"
 }}"""
+ANALYSIS_REQUIRED_FIELDS = ['category', 'priority_score', 'sentiment', 'summary', 'action_items', 'tone']
+ANALYSIS_PROMPT_VERSION = hashlib.sha256(
+    f"{ANALYSIS_MODEL}|{ANALYSIS_BODY_LIMIT}|{ANALYSIS_SYSTEM_PROMPT}|{ANALYSIS_PROMPT_TEMPLATE}".encode()
+).hexdigest()[:12]
+
+# Packed analysis prompt: several short emails in one request
+ANALYSIS_PACK_EMAIL_TEMPLATE = """EMAIL {index}
+Subject: {subject}
+From: {sender}
+Content: {body}
+"""
+ANALYSIS_PACK_PROMPT_TEMPLATE = """Analyze each of the following {count} emails and provide structured information in JSON format. Your response should be ONLY a valid JSON array, no other text.
+
+{emails}
+Return a JSON array with exactly {count} objects, one per email, in the same order. Each object must use this format:
+{{
+    "index": "the EMAIL number given above",
+    "category": "Work|Personal|Newsletter|Promotional|Social|Other",
+    "priority_score": "1-5 number",
+    "sentiment": "Positive|Negative|Neutral",
+    "summary": "1-2 sentence summary",
+    "action_items": ["list", "of", "actions"],
+    "tone": "Formal|Casual|Professional|Urgent"
+}}"""
+ANALYSIS_PACK_PROMPT_VERSION = hashlib.sha256(
+    f"{ANALYSIS_MODEL}|{ANALYSIS_SYSTEM_PROMPT}|{ANALYSIS_PACK_EMAIL_TEMPLATE}|{ANALYSIS_PACK_PROMPT_TEMPLATE}".encode()
+).hexdigest()[:12]
+
+async def analyze_email(subject: str, body: str, sender: str) -> Dict[str, Any]:
+    """
+    Analyze email content using DeepSeek LLM to extract:
+    - Category
+    - Priority
+    - Sentiment
+    - Summary
+    - Action Items
+
+    Successful analyses are cached by content hash and prompt version.
+    """
+    cache = await aget_analysis_cache(ANALYSIS_PROMPT_VERSION)
+    cache_key = _single_cache_key(subject, body, sender)
+    if cache is not None:
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            return {
+                "success": True,
+                "analysis": cached,
+                "cached": True
+            }
+    return await _analyze_and_cache(subject, body, sender, cache, cache_key)
+
+def _single_cache_key(subject: str, body: str, sender: str) -> str:
+    return analysis_cache_key(subject, sender, body, ANALYSIS_BODY_LIMIT, ANALYSIS_PROMPT_VERSION)
+
+async def _analyze_and_cache(subject: str, body: str, sender: str, cache, cache_key: str) -> Dict[str, Any]:
+    """Request a single analysis (the cache was already looked up) and cache it on success"""
+    result = await _request_analysis(subject, body, sender)
+    if cache is not None and result["success"]:
+        await cache.aset(cache_key, result["analysis"])
+    return result
+
+async def start_analysis_cache() -> None:
+    """Create the analysis cache at startup so stale prompt versions are dropped before requests arrive"""
+    await aget_analysis_cache(ANALYSIS_PROMPT_VERSION)
+
+async def get_analysis_cache_stats() -> Dict[str, Any]:
+    """Return hit-rate metrics of the analysis cache"""
+    cache = await aget_analysis_cache(ANALYSIS_PROMPT_VERSION)
+    stats = await cache.astats() if cache is not None else {"backend": "none"}
+    stats["prompt_version"] = ANALYSIS_PROMPT_VERSION
+    return stats
+
+async def clear_analysis_cache() -> None:
+    """Drop every cached analysis"""
+    cache = await aget_analysis_cache(ANALYSIS_PROMPT_VERSION)
+    if cache is not None:
+        await cache.aclear()
+
+def _strip_code_fences(content: str) -> str:
+    """Remove markdown code block markers around a JSON response"""
+    if content.startswith('```json'):
+        content = content[7:]
+    if content.startswith('```'):
+        content = content[3:]
+    if content.endswith('```'):
+        content = content[:-3]
+    return content.strip()
+
+async def _post_chat_completion(
+    client: httpx.AsyncClient,
+    messages: List[Dict[str, str]],
+    model: str = ANALYSIS_MODEL,
+    temperature: float = 0.3  # Lower temperature for more consistent results
+) -> str:
+    """
+    Send a chat-completions request and return the reply content with any
+    code fences removed. Raises on a non-200 status.
+    """
+    response = await client.post(
+        f"{DEEPSEEK_API_BASE}/chat/completions",
+        headers={
+            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": model,
+            "messages": messages,
+            "temperature": temperature
+        },
+        timeout=settings.LLM_REQUEST_TIMEOUT
+    )
+    if response.status_code != 200:
+        raise Exception(f"API request failed with status {response.status_code}")
+    result = response.json()
+    return _strip_code_fences(result['choices'][0]['message']['content'].strip())
+
+def _analysis_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+async def _request_analysis(subject: str, body: str, sender: str) -> Dict[str, Any]:
+    """Send a single analysis request to the LLM and validate the response"""
+    prompt = ANALYSIS_PROMPT_TEMPLATE.format(
+        subject=subject,
+        sender=sender,
+        body=body[:ANALYSIS_BODY_LIMIT]
+    )
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{DEEPSEEK_API_BASE}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {
-                            "role": "system", 
-                            "content": "You are an AI assistant that analyzes emails and provides structured information in JSON format. Always respond with valid JSON only, no other text."
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.3  # Lower temperature for more consistent results
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content'].strip()
-                
-                # Try to clean the response if it's not pure JSON
-                try:
-                    # Remove any markdown code block markers if present
-                    if content.startswith('```json'):
-                        content = content[7:]
-                    if content.startswith('```'):
-                        content = content[3:]
-                    if content.endswith('```'):
-                        content = content[:-3]
-                    
-                    # Strip whitespace and try to parse
-                    content = content.strip()
-                    analysis = json.loads(content)
-                    
-                    # Validate required fields
-                    required_fields = ['category', 'priority_score', 'sentiment', 'summary', 'action_items', 'tone']
-                    if all(field in analysis for field in required_fields):
-                        return {
-                            "success": True,
-                            "analysis": analysis
-                        }
-                    else:
-                        return {
-                            "success": False,
-                            "error": "Missing required fields in LLM response"
-                        }
-                        
-                except json.JSONDecodeError as e:
-                    return {
-                        "success": False,
-                        "error": f"Failed to parse LLM response as JSON: {str(e)}\nResponse: {content}"
-                    }
-            else:
-                return {
-                    "success": False,
-                    "error": f"API request failed with status {response.status_code}"
-                }
-                
+        content = await _post_chat_completion(get_http_client(), _analysis_messages(prompt))
+        analysis = json.loads(content)
+    except json.JSONDecodeError as e:
+        return {
+            "success": False,
+            "error": f"Failed to parse LLM response as JSON: {str(e)}\nResponse: {content}"
+        }
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
 
-async def generate_email_draft(email: Any, mode: str, instructions: Optional[str] = None) -> Dict[str, Any]:
+    # Validate required fields
+    if isinstance(analysis, dict) and all(field in analysis for field in ANALYSIS_REQUIRED_FIELDS):
+        return {
+            "success": True,
+            "analysis": analysis
+        }
+    return {
+        "success": False,
+        "error": "Missing required fields in LLM response"
+    }
+
+def is_packable(body: Optional[str]) -> bool:
+    """Whether an email body is short enough to share a packed analysis request"""
+    return len(body or "") <= settings.LLM_PACK_MAX_BODY
+
+async def _request_packed_analysis(items: List[Tuple[str, str, str]]) -> List[Optional[Dict[str, Any]]]:
     """
-    Generate an email draft using DeepSeek LLM
-    
-    Args:
-        email: The original email object
-        mode: 'reply' or 'forward'
-        instructions: Optional instructions for customizing the draft
-    
-    Returns:
-        Dictionary with success status and draft text or error
+    Analyze several (subject, body, sender) emails in one LLM request.
+    Returns one analysis per item, in order; None for items whose element is
+    missing or fails the required-fields check.
+    """
+    emails_text = "\n".join(
+        ANALYSIS_PACK_EMAIL_TEMPLATE.format(index=index, subject=subject, sender=sender, body=body or "")
+        for index, (subject, body, sender) in enumerate(items, start=1)
+    )
+    prompt = ANALYSIS_PACK_PROMPT_TEMPLATE.format(count=len(items), emails=emails_text)
+
+    content = await _post_chat_completion(get_http_client(), _analysis_messages(prompt))
+    elements = json.loads(content)
+    if not isinstance(elements, list):
+        raise ValueError("Packed analysis response is not a JSON array")
+
+    analyses: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    for position, element in enumerate(elements):
+        if not isinstance(element, dict):
+            continue
+        try:
+            index = int(element.get("index", position + 1)) - 1
+        except (TypeError, ValueError):
+            index = position
+        if 0 <= index < len(items) and all(field in element for field in ANALYSIS_REQUIRED_FIELDS):
+            element.pop("index", None)
+            analyses[index] = element
+    return analyses
+
+async def analyze_email_pack(items: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+    """
+    Analyze a pack of (subject, body, sender) emails with a single LLM call.
+    Emails with a cached packed or single analysis are served from the
+    analysis cache (one lookup each); entries the packed response does not
+    cover or that fail validation fall back to one single request each.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    cache = await aget_analysis_cache(ANALYSIS_PROMPT_VERSION)
+    keys = [
+        analysis_cache_key(subject, sender, body, settings.LLM_PACK_MAX_BODY, ANALYSIS_PACK_PROMPT_VERSION)
+        for subject, body, sender in items
+    ]
+    single_keys = [_single_cache_key(subject, body, sender) for subject, body, sender in items]
+    if cache is not None:
+        for position, key in enumerate(keys):
+            cached = await cache.aget_first([key, single_keys[position]])
+            if cached is not None:
+                results[position] = {"success": True, "analysis": cached, "cached": True}
+
+    pending = [position for position, result in enumerate(results) if result is None]
+    if len(pending) > 1:
+        try:
+            analyses = await _request_packed_analysis([items[position] for position in pending])
+        except Exception as e:
+            print(f"Packed analysis of {len(pending)} emails failed, falling back to single requests: {str(e)}")
+            analyses = [None] * len(pending)
+        for position, analysis in zip(pending, analyses):
+            if analysis is not None:
+                results[position] = {"success": True, "analysis": analysis, "packed": True}
+                if cache is not None:
+                    await cache.aset(keys[position], analysis)
+
+    for position, result in enumerate(results):
+        if result is None:
+            subject, body, sender = items[position]
+            # Looked up above already; a second lookup would count another miss
+            results[position] = await _analyze_and_cache(subject, body, sender, cache, single_keys[position])
+    return results
+
+async def analyze_emails_concurrently(
+    emails: Iterable[Any],
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    pack_size: Optional[int] = None
+) -> AsyncIterator[Tuple[Any, Dict[str, Any]]]:
+    """
+    Analyze emails with at most `max_concurrency` requests in flight.
+    Yields (email, analysis result) pairs in completion order so callers can
+    persist each result as soon as it arrives. Each request is bounded by
+    `timeout` seconds; a timeout is reported as a failed analysis.
+    With `pack_size` > 1, short emails are analyzed `pack_size` at a time
+    in one request each (see analyze_email_pack).
+    """
+    max_concurrency = max(1, max_concurrency or settings.LLM_MAX_CONCURRENCY)
+    timeout = timeout or settings.LLM_REQUEST_TIMEOUT
+    pack_size = max(1, pack_size or 1)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    def timed_out() -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": f"Analysis timed out after {timeout} seconds"
+        }
+
+    async def run(email: Any, subject: str, body: str, sender: str) -> List[Tuple[Any, Dict[str, Any]]]:
+        async with semaphore:
+            try:
+                analysis = await asyncio.wait_for(
+                    analyze_email(subject=subject, body=body, sender=sender),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                analysis = timed_out()
+        return [(email, analysis)]
+
+    async def run_pack(pack: List[Tuple[Any, str, str, str]]) -> List[Tuple[Any, Dict[str, Any]]]:
+        async with semaphore:
+            try:
+                # The pack request plus any single-email fallbacks share one deadline per email
+                analyses = await asyncio.wait_for(
+                    analyze_email_pack([(subject, body, sender) for _, subject, body, sender in pack]),
+                    timeout=timeout * len(pack)
+                )
+            except asyncio.TimeoutError:
+                analyses = [timed_out() for _ in pack]
+        return [(entry[0], analysis) for entry, analysis in zip(pack, analyses)]
+
+    # Read the fields up front: callers may commit (and expire the emails) while tasks are pending
+    entries = [(email, email.subject, email.body_text or email.snippet, email.sender) for email in emails]
+    tasks = []
+    if pack_size > 1:
+        short = [entry for entry in entries if is_packable(entry[2])]
+        entries = [entry for entry in entries if not is_packable(entry[2])]
+        tasks.extend(
+            asyncio.create_task(run_pack(short[start:start + pack_size]))
+            for start in range(0, len(short), pack_size)
+        )
+    tasks.extend(asyncio.create_task(run(*entry)) for entry in entries)
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for pair in await next_done:
+                yield pair
+    finally:
+        # Stop outstanding requests if the consumer goes away early
+        for task in tasks:
+            task.cancel()
+
+def build_draft_prompts(email: Any, mode: str, instructions: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Build the (system prompt, user prompt) pair for drafting a reply or
+    forward of `email`
     """
     # Extract email details
     subject = email.subject
@@ -194,42 +446,96 @@ Content: {body[:1500]}
 
 FORWARDING MESSAGE:"""
 
+    return system_prompt, user_prompt
+
+def _draft_request_body(system_prompt: str, user_prompt: str, stream: bool = False) -> Dict[str, Any]:
+    body = {
+        "model": "deepseek-chat",
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": 0.7,  # Higher temperature for more creative responses
+        "max_tokens": 1000
+    }
+    if stream:
+        body["stream"] = True
+    return body
+
+async def generate_email_draft(email: Any, mode: str, instructions: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate an email draft using DeepSeek LLM
+    
+    Args:
+        email: The original email object
+        mode: 'reply' or 'forward'
+        instructions: Optional instructions for customizing the draft
+    
+    Returns:
+        Dictionary with success status and draft text or error
+    """
+    system_prompt, user_prompt = build_draft_prompts(email, mode, instructions)
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{DEEPSEEK_API_BASE}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.7,  # Higher temperature for more creative responses
-                    "max_tokens": 1000
-                },
-                timeout=30.0
-            )
+        client = get_http_client()
+        response = await client.post(
+            f"{DEEPSEEK_API_BASE}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json=_draft_request_body(system_prompt, user_prompt),
+            timeout=settings.LLM_REQUEST_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            draft = result['choices'][0]['message']['content'].strip()
+            
+            return {
+                "success": True,
+                "draft": draft
+            }
+        else:
+            return {
+                "success": False,
+                "error": f"API request failed with status {response.status_code}"
+            }
             
-            if response.status_code == 200:
-                result = response.json()
-                draft = result['choices'][0]['message']['content'].strip()
-                
-                return {
-                    "success": True,
-                    "draft": draft
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"API request failed with status {response.status_code}"
-                }
-                
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
-        } 
\ No newline at end of file
+        } 
+
+async def stream_email_draft(system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+    """
+    Stream a draft from the chat-completions API (`stream: true`), yielding
+    content tokens as they arrive. Closing the generator closes the upstream
+    response, which stops token generation.
+    """
+    client = get_http_client()
+    async with client.stream(
+        "POST",
+        f"{DEEPSEEK_API_BASE}/chat/completions",
+        headers={
+            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        },
+        json=_draft_request_body(system_prompt, user_prompt, stream=True),
+        timeout=settings.LLM_REQUEST_TIMEOUT
+    ) as response:
+        if response.status_code != 200:
+            raise Exception(f"API request failed with status {response.status_code}")
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            choices = chunk.get("choices") or []
+            token = choices[0].get("delta", {}).get("content") if choices else None
+            if token:
+                yield token
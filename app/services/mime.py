@@ -0,0 +1,86 @@
+from email.message import Message
+from app.core.config import settings
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import binascii
+import codecs
+import html
+import re
+
+# Tags whose content is dropped when deriving text from an HTML-only message
+_HTML_SKIP = re.compile(r"<(script|style|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK = re.compile(r"<\s*(br|/p|/div|/tr|/li|/h[1-6])\b[^>]*>", re.IGNORECASE)
+_HTML_TAG = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n\s*\n\s*\n+")
+
+def _header(part: Dict[str, Any], name: str) -> str:
+    name = name.lower()
+    return next((h.get('value', '') for h in part.get('headers', []) if h.get('name', '').lower() == name), '')
+
+def _charset(part: Dict[str, Any]) -> str:
+    """Charset from the part's Content-Type header, utf-8 when missing or unknown"""
+    content_type = _header(part, 'Content-Type')
+    charset = None
+    if content_type:
+        message = Message()
+        message['Content-Type'] = content_type
+        charset = message.get_content_charset()
+    try:
+        return codecs.lookup(charset or 'utf-8').name
+    except LookupError:
+        return 'utf-8'
+
+def _is_attachment(part: Dict[str, Any]) -> bool:
+    body = part.get('body', {})
+    if part.get('filename') or body.get('attachmentId'):
+        return True
+    return _header(part, 'Content-Disposition').lower().startswith('attachment')
+
+def _decode(part: Dict[str, Any], max_chars: int) -> str:
+    """Decode a base64url part body, reading only as much as max_chars can need"""
+    data = part.get('body', {}).get('data', '')
+    # At most 4 bytes per character, 4 base64 characters per 3 bytes
+    max_bytes = max_chars * 4
+    data = data[:(max_bytes + 2) // 3 * 4]
+    try:
+        raw = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+    except (binascii.Error, ValueError):
+        return ""
+    return raw.decode(_charset(part), errors='replace')[:max_chars]
+
+def html_to_text(body_html: str) -> str:
+    """Rough plain text rendering of an HTML body"""
+    text = _HTML_SKIP.sub('', body_html)
+    text = _HTML_BREAK.sub('\n', text)
+    text = html.unescape(_HTML_TAG.sub('', text))
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+def parse_message_body(payload: Dict[str, Any], max_chars: Optional[int] = None) -> Tuple[str, Optional[str]]:
+    """
+    Extract the text and HTML bodies of a Gmail API message payload.
+    Walks nested multipart parts depth-first without recursion and keeps
+    the first text/plain and text/html parts, decoded with their charset.
+    Attachments are skipped undecoded and bodies are capped at max_chars
+    (default EMAIL_BODY_MAX_CHARS). The text body falls back to the HTML
+    rendered as text; the HTML body is None when there is none.
+    """
+    max_chars = max_chars or settings.EMAIL_BODY_MAX_CHARS
+    body_text = body_html = None
+    stack: List[Dict[str, Any]] = [payload]
+    while stack and (body_text is None or body_html is None):
+        part = stack.pop()
+        mime_type = part.get('mimeType', '').lower()
+        if mime_type.startswith('multipart/'):
+            # Reversed so parts are visited in document order
+            stack.extend(reversed(part.get('parts', [])))
+            continue
+        if _is_attachment(part) or not part.get('body', {}).get('data'):
+            continue
+        if mime_type == 'text/plain' and body_text is None:
+            body_text = _decode(part, max_chars)
+        elif mime_type == 'text/html' and body_html is None:
+            body_html = _decode(part, max_chars)
+
+    if body_text is None:
+        body_text = html_to_text(body_html)[:max_chars] if body_html else ""
+    return body_text, body_html
@@ -0,0 +1,91 @@
+from sqlalchemy import Select, String, and_, func, or_, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Email
+from typing import Dict, Hashable, Optional, Tuple, Union
+from datetime import datetime
+import base64
+import json
+import threading
+import time
+
+# Approximate totals for cursor pagination are reused for this many seconds
+APPROXIMATE_TOTAL_TTL = 60
+APPROXIMATE_TOTAL_MAX_ENTRIES = 1000
+
+_total_cache: Dict[Hashable, Tuple[float, int]] = {}
+_total_cache_lock = threading.Lock()
+
+class InvalidCursor(ValueError):
+    pass
+
+def cursor_position(dialect: str):
+    """
+    created_at of each row as cursors hold it, to select next to the emails.
+    SQLite keeps datetimes as text in more than one format (server defaults
+    have no fraction of a second) and orders them as text, so there the
+    cursor carries the stored text itself.
+    """
+    if dialect == "sqlite":
+        return type_coerce(Email.created_at, String).label("cursor_created_at")
+    return Email.created_at.label("cursor_created_at")
+
+def encode_cursor(created_at: Union[datetime, str, None], email_id: int) -> str:
+    """Encode a (created_at, id) position, as selected by cursor_position, as an opaque cursor"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, email_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, email_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if created_at is not None:
+            datetime.fromisoformat(created_at)
+        return created_at, int(email_id)
+    except Exception:
+        raise InvalidCursor("Invalid pagination cursor")
+
+def apply_keyset(query: Select, cursor: Optional[str], dialect: str) -> Select:
+    """
+    Order an Email select newest first by (created_at, id) and, when a cursor
+    is given, continue strictly after that position
+    """
+    if cursor:
+        created_at, email_id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.filter(Email.created_at.is_(None), Email.id < email_id)
+        else:
+            if dialect == "sqlite":
+                # Compared as stored, the way the index orders them
+                column, position = type_coerce(Email.created_at, String), created_at
+            else:
+                column, position = Email.created_at, datetime.fromisoformat(created_at)
+            query = query.filter(or_(
+                column < position,
+                and_(column == position, Email.id < email_id)
+            ))
+    return query.order_by(Email.created_at.desc(), Email.id.desc())
+
+async def approximate_total(db: AsyncSession, query: Select, cache_key: Hashable) -> int:
+    """
+    Count the rows of a filtered select, reusing a recent count for the same
+    filters instead of rescanning on every page
+    """
+    now = time.time()
+    with _total_cache_lock:
+        cached = _total_cache.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    with _total_cache_lock:
+        if len(_total_cache) >= APPROXIMATE_TOTAL_MAX_ENTRIES:
+            # Drop expired entries first, then the oldest ones
+            for key in [key for key, (expires_at, _) in _total_cache.items() if expires_at <= now]:
+                del _total_cache[key]
+            while len(_total_cache) >= APPROXIMATE_TOTAL_MAX_ENTRIES:
+                del _total_cache[next(iter(_total_cache))]
+        _total_cache[cache_key] = (now + APPROXIMATE_TOTAL_TTL, total)
+    return total
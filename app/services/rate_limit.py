@@ -0,0 +1,160 @@
+from googleapiclient.errors import HttpError
+from app.core.config import settings
+from typing import Any, Dict, Optional
+import random
+import threading
+import time
+
+# Gmail API quota units per method (https://developers.google.com/gmail/api/reference/quota)
+GMAIL_QUOTA_UNITS = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "history.list": 2,
+    "getProfile": 1,
+}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second up to
+    `capacity`. A request larger than the capacity waits for a full bucket
+    and leaves it in debt, so it is delayed rather than rejected.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = max(rate, 0.001)
+        self.capacity = capacity or self.rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """Block until `amount` tokens are taken; returns the seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                needed = min(amount, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+_gmail_limiter: Optional[TokenBucket] = None
+_gmail_limiter_lock = threading.Lock()
+
+def get_gmail_rate_limiter() -> TokenBucket:
+    """Process-wide limiter for Gmail quota units (GMAIL_QUOTA_UNITS_PER_SECOND)"""
+    global _gmail_limiter
+    if _gmail_limiter is None:
+        with _gmail_limiter_lock:
+            if _gmail_limiter is None:
+                _gmail_limiter = TokenBucket(settings.GMAIL_QUOTA_UNITS_PER_SECOND)
+    return _gmail_limiter
+
+# Per-user buckets shared by every sync, scheduler slice and body hydration of a mailbox
+_user_limiters: Dict[Any, TokenBucket] = {}
+
+def get_user_rate_limiter(user_id: Any) -> TokenBucket:
+    """Limiter for the per-user quota (GMAIL_USER_QUOTA_UNITS_PER_SECOND) of a user's mailbox"""
+    with _gmail_limiter_lock:
+        limiter = _user_limiters.get(user_id)
+        if limiter is None:
+            limiter = _user_limiters[user_id] = TokenBucket(settings.GMAIL_USER_QUOTA_UNITS_PER_SECOND)
+        return limiter
+
+# Throttle metrics of Gmail calls since the process started
+_gmail_stats = {
+    "requests": 0,
+    "quota_units": 0,
+    "limiter_wait_seconds": 0.0,
+    "throttled": 0,
+    "retries": 0,
+    "backoff_seconds": 0.0,
+    "gave_up": 0,
+}
+_gmail_stats_lock = threading.Lock()
+
+def record_gmail_stat(name: str, amount: float = 1) -> None:
+    with _gmail_stats_lock:
+        _gmail_stats[name] += amount
+
+def get_gmail_quota_stats() -> Dict[str, Any]:
+    """Return Gmail request, quota and throttling metrics"""
+    with _gmail_stats_lock:
+        stats = dict(_gmail_stats)
+    stats["limiter_wait_seconds"] = round(stats["limiter_wait_seconds"], 3)
+    stats["backoff_seconds"] = round(stats["backoff_seconds"], 3)
+    stats["quota_units_per_second"] = settings.GMAIL_QUOTA_UNITS_PER_SECOND
+    stats["user_quota_units_per_second"] = settings.GMAIL_USER_QUOTA_UNITS_PER_SECOND
+    return stats
+
+def acquire_gmail_quota(user_id: Any, method: str, count: int = 1) -> None:
+    """Take the quota units of `count` calls to `method` from the project and the user's limiters"""
+    units = GMAIL_QUOTA_UNITS[method] * count
+    waited = get_gmail_rate_limiter().acquire(units)
+    waited += get_user_rate_limiter(user_id).acquire(units)
+    record_gmail_stat("requests", count)
+    record_gmail_stat("quota_units", units)
+    record_gmail_stat("limiter_wait_seconds", waited)
+
+# Error reasons Gmail returns (with 403 or 429) when a quota is exhausted
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded")
+
+def is_rate_limited(error: Exception) -> bool:
+    """True for 429 responses and 403 rate limit errors"""
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status == 429:
+        return True
+    return error.resp.status == 403 and any(reason in str(error.content) for reason in RATE_LIMIT_REASONS)
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits and transient server errors are retried, anything else is not"""
+    return is_rate_limited(error) or (isinstance(error, HttpError) and error.resp.status in (500, 502, 503, 504))
+
+def backoff_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """
+    Exponential backoff with jitter for the given retry attempt (0-based):
+    half of the capped exponential delay plus a random share of the other
+    half. A Retry-After header, when present, is used as the minimum.
+    """
+    delay = min(settings.GMAIL_BACKOFF_MAX, settings.GMAIL_BACKOFF_BASE * 2 ** attempt)
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    if isinstance(error, HttpError):
+        try:
+            delay = max(delay, float(error.resp.get("retry-after", 0)))
+        except (TypeError, ValueError):
+            pass
+    return delay
+
+def wait_before_retry(attempt: int, error: Optional[Exception] = None, throttled: int = 1) -> None:
+    """Sleep for the backoff of `attempt` and record the retry"""
+    delay = backoff_delay(attempt, error)
+    record_gmail_stat("throttled", throttled)
+    record_gmail_stat("retries")
+    record_gmail_stat("backoff_seconds", delay)
+    time.sleep(delay)
+
+def execute_gmail(user_id: Any, method: str, request: Any) -> Any:
+    """
+    Execute a Gmail API request after taking its quota units, retrying rate
+    limit and transient errors up to GMAIL_MAX_RETRIES times with backoff
+    """
+    for attempt in range(settings.GMAIL_MAX_RETRIES + 1):
+        acquire_gmail_quota(user_id, method)
+        try:
+            return request.execute()
+        except HttpError as e:
+            if not is_retryable(e):
+                raise
+            if attempt == settings.GMAIL_MAX_RETRIES:
+                record_gmail_stat("gave_up")
+                raise
+            print(f"Gmail {method} returned {e.resp.status}, retrying (attempt {attempt + 1})")
+            wait_before_retry(attempt, e, throttled=int(is_rate_limited(e)))
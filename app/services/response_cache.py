@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+from typing import Any, Awaitable, Callable, Dict, Optional
+import hashlib
+import json
+import threading
+import time
+
+class ResponseCache:
+    """
+    Base class for cached API responses. Every user has a data version that
+    is bumped by invalidate_user(); it is part of each cache key, so
+    invalidation never has to enumerate cached entries.
+    """
+
+    name = "base"
+
+    def get_version(self, user_id: Any) -> int:
+        raise NotImplementedError
+
+    def invalidate_user(self, user_id: Any) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, body: bytes) -> None:
+        raise NotImplementedError
+
+class MemoryResponseCache(ResponseCache):
+    """
+    In-process LRU with TTL. Invalidations are only seen by this process:
+    when Celery workers or a standalone scheduler (python -m app.scheduler)
+    write emails, use RESPONSE_CACHE_BACKEND=redis.
+    """
+
+    name = "memory"
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def get_version(self, user_id: Any) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def invalidate_user(self, user_id: Any) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, body = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class RedisResponseCache(ResponseCache):
+    """Redis-backed cache shared by API processes and background workers"""
+
+    name = "redis"
+    prefix = "response-cache:"
+
+    def __init__(self, ttl: int, url: str):
+        import redis
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+
+    def get_version(self, user_id: Any) -> int:
+        return int(self._redis.get(f"{self.prefix}version:{user_id}") or 0)
+
+    def invalidate_user(self, user_id: Any) -> None:
+        self._redis.incr(f"{self.prefix}version:{user_id}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(self.prefix + key)
+
+    def set(self, key: str, body: bytes) -> None:
+        self._redis.setex(self.prefix + key, self.ttl, body)
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the configured response cache, or None when RESPONSE_CACHE_BACKEND is "none" """
+    global _cache
+    backend = settings.RESPONSE_CACHE_BACKEND.lower()
+    if backend == "none":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if backend == "redis":
+                    _cache = RedisResponseCache(settings.RESPONSE_CACHE_TTL, settings.RESPONSE_CACHE_REDIS_URL)
+                else:
+                    _cache = MemoryResponseCache(settings.RESPONSE_CACHE_TTL, settings.RESPONSE_CACHE_MAX_ENTRIES)
+    return _cache
+
+def invalidate_user_responses(user_id: Any) -> None:
+    """
+    Drop cached responses of a user. Call after committing a change that
+    affects dashboard data (sync, analysis, read/important/delete).
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return
+    try:
+        cache.invalidate_user(user_id)
+    except Exception as e:
+        print(f"Failed to invalidate cached responses for user {user_id}: {str(e)}")
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+async def cached_json_response(
+    request: Request,
+    user_id: Any,
+    name: str,
+    params: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]]
+) -> Response:
+    """
+    Serve a JSON response from the cache, awaiting `compute` and storing its
+    result on a miss.
+    The ETag is a hash of the body, so it changes whenever the data does,
+    including after the TTL or a moving date window. A matching
+    If-None-Match is answered with 304 once the body is known (cached or
+    computed), and the body is only sent when it changed.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return Response(content=json.dumps(jsonable_encoder(await compute())), media_type="application/json")
+
+    try:
+        version = cache.get_version(user_id)
+    except Exception as e:
+        print(f"Response cache unavailable: {str(e)}")
+        return Response(content=json.dumps(jsonable_encoder(await compute())), media_type="application/json")
+
+    key_source = json.dumps([name, str(user_id), version, params], sort_keys=True, default=str)
+    key = hashlib.sha256(key_source.encode()).hexdigest()
+
+    try:
+        body = cache.get(key)
+    except Exception as e:
+        print(f"Response cache read failed: {str(e)}")
+        body = None
+    if body is None:
+        body = json.dumps(jsonable_encoder(await compute())).encode()
+        try:
+            cache.set(key, body)
+        except Exception as e:
+            print(f"Response cache write failed: {str(e)}")
+
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
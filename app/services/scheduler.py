@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import User
+from app.services.jobs import SYNC_MODES, user_sync_lease
+from typing import Any, Callable, Dict, List, Optional
+import threading
+
+def next_sync_mode(user: User) -> str:
+    """
+    Backfill until the whole inbox has been stored once (resuming from the
+    stored cursor), incremental history syncs afterwards
+    """
+    if user.gmail_backfill_cursor or not user.gmail_history_id:
+        return "backfill"
+    return "incremental"
+
+class SyncScheduler:
+    """
+    Syncs every user with gmail_sync_enabled on a thread pool.
+
+    Work is done in rounds. Each round gives every user at most one slice of
+    at most `slice_size` messages (a resumable backfill page run, or an
+    incremental sync), least recently synced users first, so one huge
+    mailbox advances a slice per round instead of starving the others.
+    A user never has more than one sync running, also across processes
+    (user_sync_lease). Gmail calls of all slices take their quota units
+    from the shared rate limiter as they are made.
+
+    `session_factory` and `sync_modes` can be replaced to run the scheduler
+    against a test database and a fake Gmail backend.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        slice_size: Optional[int] = None,
+        interval: Optional[float] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        sync_modes: Optional[Dict[str, Callable[..., Dict[str, Any]]]] = None
+    ):
+        self.workers = max(1, workers or settings.SYNC_SCHEDULER_WORKERS)
+        self.slice_size = max(1, slice_size or settings.SYNC_SCHEDULER_SLICE_SIZE)
+        self.interval = settings.SYNC_SCHEDULER_INTERVAL if interval is None else interval
+        self.session_factory = session_factory
+        self.sync_modes = sync_modes or SYNC_MODES
+        self._stop = threading.Event()
+
+    def _enabled_user_ids(self) -> List[int]:
+        db = self.session_factory()
+        try:
+            users = db.query(User.id).filter(
+                User.gmail_sync_enabled.is_(True)
+            ).order_by(User.last_sync_timestamp.asc().nullsfirst(), User.id).all()
+            return [user_id for (user_id,) in users]
+        finally:
+            db.close()
+
+    def sync_user_slice(self, user_id: int) -> Dict[str, Any]:
+        """Run one bounded sync for a user, skipping users whose sync is already running"""
+        with user_sync_lease(user_id, blocking=False, session_factory=self.session_factory) as acquired:
+            if not acquired:
+                return {"user_id": user_id, "success": True, "skipped": "sync already running"}
+            db = self.session_factory()
+            try:
+                user = db.get(User, user_id)
+                if not user or not user.gmail_sync_enabled:
+                    return {"user_id": user_id, "success": True, "skipped": "sync disabled"}
+                mode = next_sync_mode(user)
+                result = self.sync_modes[mode](db, user, self.slice_size)
+                return {"user_id": user_id, "mode": mode, **result}
+            except Exception as e:
+                db.rollback()
+                return {"user_id": user_id, "success": False, "error": str(e)}
+            finally:
+                db.close()
+
+    def run_once(self) -> List[Dict[str, Any]]:
+        """Run one round over all enabled users and return each slice's result"""
+        user_ids = self._enabled_user_ids()
+        if not user_ids:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(user_ids)), thread_name_prefix="sync-scheduler") as pool:
+            results = list(pool.map(self.sync_user_slice, user_ids))
+        failed = sum(1 for result in results if not result.get("success"))
+        print(f"Sync round finished: {len(results)} users, {failed} failed")
+        return results
+
+    def run_forever(self) -> None:
+        """Run rounds until stop() is called. A round that leaves backfills unfinished is followed right away."""
+        while not self._stop.is_set():
+            try:
+                results = self.run_once()
+            except Exception as e:
+                print(f"Sync round failed: {str(e)}")
+                results = []
+            backfilling = any(result.get("mode") == "backfill" and not result.get("complete", True) for result in results)
+            self._stop.wait(0 if backfilling else self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+# Scheduler running inside the API process when SYNC_SCHEDULER_ENABLED is set
+_scheduler: Optional[SyncScheduler] = None
+_scheduler_thread: Optional[threading.Thread] = None
+
+def start_sync_scheduler() -> None:
+    """Start the scheduler on a background thread (called from the FastAPI lifespan)"""
+    global _scheduler, _scheduler_thread
+    if _scheduler_thread is not None and _scheduler_thread.is_alive():
+        return
+    _scheduler = SyncScheduler()
+    _scheduler_thread = threading.Thread(target=_scheduler.run_forever, name="sync-scheduler", daemon=True)
+    _scheduler_thread.start()
+
+def stop_sync_scheduler() -> None:
+    """Ask the scheduler to stop after the current round"""
+    global _scheduler, _scheduler_thread
+    if _scheduler is not None:
+        _scheduler.stop()
+    _scheduler = None
+    _scheduler_thread = None
@@ -0,0 +1,190 @@
+from sqlalchemy import Float, Integer, Select, func, literal_column, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.models import Email, EmailBody
+from app.models.email_body import decompress_body
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+# Set by setup_search_index() once the dialect-specific index exists
+_search_dialect: Optional[str] = None
+
+# Bodies are stored compressed in email_bodies, so the database cannot index
+# them on its own: the index is written by index_email_text() when emails are
+# stored and cleared by unindex_emails() before they are deleted.
+
+# Contentless FTS5 table: only the index is stored, never a copy of the text.
+# Column weights: subject matches rank above snippet, snippet above body
+SQLITE_FTS_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5(
+        subject, snippet, body_text,
+        content='',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+]
+SQLITE_FTS_WEIGHTS = "10.0, 3.0, 1.0"
+SQLITE_FTS_INSERT = """INSERT INTO emails_fts(rowid, subject, snippet, body_text)
+    VALUES (:email_id, :subject, :snippet, :body_text)"""
+# Contentless tables need the indexed values again to delete a row
+SQLITE_FTS_DELETE = """INSERT INTO emails_fts(emails_fts, rowid, subject, snippet, body_text)
+    VALUES ('delete', :email_id, :subject, :snippet, :body_text)"""
+
+POSTGRES_FTS_SETUP = [
+    "ALTER TABLE emails ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_emails_search_vector ON emails USING GIN (search_vector)",
+]
+POSTGRES_SEARCH_VECTOR = """
+    setweight(to_tsvector('simple', :subject), 'A') ||
+    setweight(to_tsvector('simple', :snippet), 'B') ||
+    setweight(to_tsvector('simple', :body_text), 'C')"""
+POSTGRES_FTS_UPDATE = f"UPDATE emails SET search_vector = {POSTGRES_SEARCH_VECTOR} WHERE id = :email_id"
+
+# Emails indexed per statement when rebuilding the SQLite index
+INDEX_REBUILD_CHUNK_SIZE = 500
+
+def _index_params(email_id: int, subject: Optional[str], snippet: Optional[str], body_text: Optional[str]) -> Dict[str, Any]:
+    # Normalized the same way on insert and delete, as FTS5 deletes must match exactly
+    return {"email_id": email_id, "subject": subject or "", "snippet": snippet or "", "body_text": body_text or ""}
+
+def _rebuild_sqlite_index(conn) -> None:
+    """Index every stored email, decompressing bodies in id order"""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(Email.id, Email.subject, Email.snippet, EmailBody.text_compressed)
+            .outerjoin(EmailBody, EmailBody.email_id == Email.id)
+            .where(Email.id > last_id)
+            .order_by(Email.id)
+            .limit(INDEX_REBUILD_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return
+        conn.execute(text(SQLITE_FTS_INSERT), [
+            _index_params(row.id, row.subject, row.snippet, decompress_body(row.text_compressed))
+            for row in rows
+        ])
+        last_id = rows[-1].id
+
+def setup_search_index(engine: Engine) -> bool:
+    """
+    Create the full-text index for the emails table if it is missing.
+    SQLite gets a contentless FTS5 table, PostgreSQL a tsvector column with
+    a GIN index, both filled by index_email_text(). Returns False (and
+    search falls back to ILIKE) when the database does not support it.
+    """
+    global _search_dialect
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                exists = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emails_fts'"
+                )).first()
+                for statement in SQLITE_FTS_SETUP:
+                    conn.execute(text(statement))
+                if not exists:
+                    # Index rows stored before the FTS table existed
+                    _rebuild_sqlite_index(conn)
+            elif dialect == "postgresql":
+                for statement in POSTGRES_FTS_SETUP:
+                    conn.execute(text(statement))
+            else:
+                return False
+    except Exception as e:
+        print(f"Full-text search unavailable, falling back to ILIKE: {str(e)}")
+        return False
+    _search_dialect = dialect
+    return True
+
+def _index_dialect(db: Session) -> Optional[str]:
+    """
+    Dialect of the full-text index, detected once per process when
+    setup_search_index() did not run here (e.g. in a Celery worker)
+    """
+    global _search_dialect
+    if _search_dialect is None:
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            found = db.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emails_fts'"
+            )).first()
+        elif dialect == "postgresql":
+            found = db.execute(text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'emails' AND column_name = 'search_vector'"
+            )).first()
+        else:
+            found = None
+        if found:
+            _search_dialect = dialect
+    return _search_dialect
+
+def index_email_text(db: Session, entries: List[Tuple[int, Optional[str], Optional[str], Optional[str]]]) -> None:
+    """
+    Add newly stored emails to the full-text index.
+    `entries` are (email_id, subject, snippet, body_text) tuples; runs in the
+    caller's transaction.
+    """
+    if not entries:
+        return
+    params = [_index_params(*entry) for entry in entries]
+    dialect = _index_dialect(db)
+    if dialect == "sqlite":
+        db.execute(text(SQLITE_FTS_INSERT), params)
+    elif dialect == "postgresql":
+        db.execute(text(POSTGRES_FTS_UPDATE), params)
+
+def unindex_emails(db: Session, emails: List[Email]) -> None:
+    """
+    Remove emails from the full-text index; call before deleting them.
+    PostgreSQL drops the vector with the row, SQLite needs the indexed text.
+    """
+    if emails and _index_dialect(db) == "sqlite":
+        db.execute(text(SQLITE_FTS_DELETE), [
+            _index_params(email.id, email.subject, email.snippet, email.body_text)
+            for email in emails
+        ])
+
+def _search_terms(search: str) -> List[str]:
+    return re.findall(r"\w+", search.lower())
+
+def _fts5_match(terms: List[str]) -> str:
+    # Quote every term so user input cannot inject FTS5 syntax; '*' makes it a prefix query
+    return " AND ".join(f'"{term}"*' for term in terms)
+
+def _tsquery(terms: List[str]) -> str:
+    return " & ".join(f"{term}:*" for term in terms)
+
+def apply_search(query: Select, search: str) -> Tuple[Select, Optional[Any]]:
+    """
+    Filter an Email select by a search string using the full-text index.
+    Every word must match, as a prefix of a word in the subject, snippet or
+    body. Returns the filtered select and a relevance ordering clause (None
+    when falling back to ILIKE, which has no ranking and cannot see the
+    compressed bodies).
+    """
+    terms = _search_terms(search)
+    if _search_dialect == "sqlite" and terms:
+        # LIMIT -1 keeps SQLite from flattening the subquery: the matches are
+        # computed once and drive the join, instead of one index probe per email
+        matches = text(
+            f"SELECT rowid AS email_id, bm25(emails_fts, {SQLITE_FTS_WEIGHTS}) AS rank "
+            "FROM emails_fts WHERE emails_fts MATCH :match LIMIT -1"
+        ).bindparams(match=_fts5_match(terms)).columns(email_id=Integer, rank=Float).subquery("fts")
+        query = query.join(matches, matches.c.email_id == Email.id)
+        # bm25() is lower for better matches
+        return query, matches.c.rank.asc()
+    if _search_dialect == "postgresql" and terms:
+        search_vector = literal_column("emails.search_vector")
+        ts_query = func.to_tsquery("simple", _tsquery(terms))
+        query = query.filter(search_vector.op("@@")(ts_query))
+        return query, func.ts_rank_cd(search_vector, ts_query).desc()
+
+    search_term = f"%{search}%"
+    query = query.filter(
+        or_(
+            Email.subject.ilike(search_term),
+            Email.snippet.ilike(search_term)
+        )
+    )
+    return query, None
@@ -0,0 +1,260 @@
+from collections import Counter
+from sqlalchemy import delete, false, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import Email, EmailStatsBucket, EmailHourlyCount, User
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timezone, tzinfo
+
+# (category, priority_score, sentiment, is_read) with "" / 0 for missing analysis values
+StatsKey = Tuple[str, int, str, bool]
+
+def _priority(value: Any) -> int:
+    try:
+        return int(value) if value is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+def stats_key(category: Optional[str], priority_score: Any, sentiment: Optional[str], is_read: Any) -> StatsKey:
+    return (category or "", _priority(priority_score), sentiment or "", bool(is_read))
+
+def email_stats_key(email: Email) -> StatsKey:
+    """Return the stats bucket an email currently counts towards"""
+    return stats_key(email.category, email.priority_score, email.sentiment, email.is_read)
+
+def lock_rollups(db: Session, user_id: int, exclusive: bool = False) -> None:
+    """
+    Serialize rollup writers and rebuilds of a user until the transaction
+    ends: writers take a shared lock before checking whether the rollup
+    exists, rebuilds an exclusive one before reading the emails table, so
+    no change is skipped by a writer while a rebuild misses it.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        # A single writer at a time: open the write transaction before reading
+        db.execute(delete(EmailStatsBucket.__table__).where(false()))
+    else:
+        db.execute(select(User.id).where(User.id == user_id).with_for_update(read=not exclusive))
+
+def _add_count(db: Session, table, key: Dict[str, Any], delta: int) -> None:
+    """Add delta to the count of the row with this unique key, creating it for positive deltas"""
+    dialect = db.get_bind().dialect.name
+    if delta > 0 and dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table).values(**key, count=delta)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={"count": table.c.count + stmt.excluded.count}
+        ))
+        return
+    result = db.execute(
+        update(table).where(*(table.c[column] == value for column, value in key.items())).values(count=table.c.count + delta)
+    )
+    if result.rowcount == 0 and delta > 0:
+        db.execute(insert(table).values(**key, count=delta))
+
+def _add_to_bucket(db: Session, user_id: int, key: StatsKey, delta: int) -> None:
+    category, priority_score, sentiment, is_read = key
+    _add_count(db, EmailStatsBucket.__table__, {
+        "user_id": user_id,
+        "category": category,
+        "priority_score": priority_score,
+        "sentiment": sentiment,
+        "is_read": is_read
+    }, delta)
+
+def _has_rollup(db: Session, user_id: int) -> bool:
+    # Until a user's rollup is first built, changes are left to that rebuild
+    return db.query(
+        db.query(EmailStatsBucket).filter(EmailStatsBucket.user_id == user_id).exists()
+    ).scalar()
+
+def record_stats_change(db: Session, user_id: int, old_key: Optional[StatsKey], new_key: Optional[StatsKey]) -> None:
+    """
+    Move one email between stats buckets inside the caller's transaction.
+    Pass old_key=None for a new email and new_key=None for a deleted one.
+    """
+    if old_key == new_key:
+        return
+    lock_rollups(db, user_id)
+    if not _has_rollup(db, user_id):
+        return
+    if old_key is not None:
+        _add_to_bucket(db, user_id, old_key, -1)
+    if new_key is not None:
+        _add_to_bucket(db, user_id, new_key, 1)
+
+def record_new_email_rows(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """Count freshly inserted email rows (as built for bulk inserts) into the rollups"""
+    rows = list(rows)
+    for user_id in {row["user_id"] for row in rows}:
+        lock_rollups(db, user_id)
+    counts = Counter(
+        (row["user_id"], stats_key(row.get("category"), row.get("priority_score"), row.get("sentiment"), row.get("is_read")))
+        for row in rows
+    )
+    ready = {}
+    for (user_id, key), count in counts.items():
+        if user_id not in ready:
+            ready[user_id] = _has_rollup(db, user_id)
+        if ready[user_id]:
+            _add_to_bucket(db, user_id, key, count)
+
+    hours = Counter(
+        (row["user_id"], _hour(email_timestamp(row.get("received_at"), row.get("created_at"))))
+        for row in rows
+    )
+    ready = {}
+    for (user_id, hour), count in hours.items():
+        if hour is None:
+            continue
+        if user_id not in ready:
+            ready[user_id] = _has_timeline(db, user_id)
+        if ready[user_id]:
+            _add_to_hour(db, user_id, hour, count)
+
+def record_email_removed(db: Session, email: Email) -> None:
+    """Remove an email that is about to be deleted from the rollups"""
+    record_stats_change(db, email.user_id, email_stats_key(email), None)
+    hour = _hour(email_timestamp(email.received_at, email.created_at))
+    if hour is not None and _has_timeline(db, email.user_id):
+        _add_to_hour(db, email.user_id, hour, -1)
+
+def rebuild_email_stats(db: Session, user_id: int) -> None:
+    """Recompute a user's rollup from the emails table in a single grouped scan"""
+    lock_rollups(db, user_id, exclusive=True)
+    grouped = db.query(
+        Email.category,
+        Email.priority_score,
+        Email.sentiment,
+        Email.is_read,
+        func.count(Email.id)
+    ).filter(
+        Email.user_id == user_id
+    ).group_by(
+        Email.category, Email.priority_score, Email.sentiment, Email.is_read
+    ).all()
+
+    counts: Counter = Counter()
+    for category, priority_score, sentiment, is_read, count in grouped:
+        counts[stats_key(category, priority_score, sentiment, is_read)] += count
+
+    db.query(EmailStatsBucket).filter(EmailStatsBucket.user_id == user_id).delete(synchronize_session=False)
+    for (category, priority_score, sentiment, is_read), count in counts.items():
+        db.add(EmailStatsBucket(
+            user_id=user_id,
+            category=category,
+            priority_score=priority_score,
+            sentiment=sentiment,
+            is_read=is_read,
+            count=count
+        ))
+    db.flush()
+
+def get_email_stats(db: Session, user_id: int, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Read the overview and distributions for a user from the rollup table.
+    The rollup is rebuilt when it is empty or `refresh` is set.
+    """
+    buckets = [] if refresh else db.query(EmailStatsBucket).filter(EmailStatsBucket.user_id == user_id).all()
+    if not buckets:
+        rebuild_email_stats(db, user_id)
+        db.commit()
+        buckets = db.query(EmailStatsBucket).filter(EmailStatsBucket.user_id == user_id).all()
+
+    stats = {
+        "total": 0,
+        "unread": 0,
+        "analyzed": 0,
+        "categories": Counter(),
+        "priorities": Counter(),
+        "sentiments": Counter()
+    }
+    for bucket in buckets:
+        if bucket.count <= 0:
+            continue
+        stats["total"] += bucket.count
+        if not bucket.is_read:
+            stats["unread"] += bucket.count
+        if bucket.category:
+            stats["analyzed"] += bucket.count
+            stats["categories"][bucket.category] += bucket.count
+        if bucket.priority_score:
+            stats["priorities"][str(bucket.priority_score)] += bucket.count
+        if bucket.sentiment:
+            stats["sentiments"][bucket.sentiment] += bucket.count
+    for distribution in ("categories", "priorities", "sentiments"):
+        stats[distribution] = dict(stats[distribution])
+    return stats
+
+def email_timestamp(received_at: Optional[datetime], created_at: Optional[datetime]) -> Optional[datetime]:
+    """The time an email belongs to on the timeline: Gmail's date, else the insert time"""
+    return received_at or created_at
+
+def _hour(value: Optional[datetime]) -> Optional[datetime]:
+    """Truncate to the start of the hour as naive UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def _has_timeline(db: Session, user_id: int) -> bool:
+    return db.query(
+        db.query(EmailHourlyCount).filter(EmailHourlyCount.user_id == user_id).exists()
+    ).scalar()
+
+def _add_to_hour(db: Session, user_id: int, hour: datetime, delta: int) -> None:
+    _add_count(db, EmailHourlyCount.__table__, {"user_id": user_id, "bucket_start": hour}, delta)
+
+def rebuild_email_timeline(db: Session, user_id: int) -> None:
+    """Recompute a user's hourly counts by streaming email timestamps once"""
+    lock_rollups(db, user_id, exclusive=True)
+    hours: Counter = Counter()
+    timestamps = db.query(Email.received_at, Email.created_at).filter(
+        Email.user_id == user_id
+    ).yield_per(10000)
+    for received_at, created_at in timestamps:
+        hour = _hour(email_timestamp(received_at, created_at))
+        if hour is not None:
+            hours[hour] += 1
+
+    db.query(EmailHourlyCount).filter(EmailHourlyCount.user_id == user_id).delete(synchronize_session=False)
+    db.bulk_insert_mappings(EmailHourlyCount, [
+        {"user_id": user_id, "bucket_start": hour, "count": count}
+        for hour, count in hours.items()
+    ])
+    db.flush()
+
+def get_timeline_counts(
+    db: Session,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    tz: tzinfo = timezone.utc,
+    granularity: str = "day"
+) -> List[Dict[str, Any]]:
+    """
+    Email counts between `start` and `end` (timezone-aware) grouped by day or
+    hour in `tz`, read from the hourly rollup. Days in timezones with
+    fractional-hour offsets are approximated by the UTC hour each bucket
+    starts in.
+    """
+    if not _has_timeline(db, user_id):
+        rebuild_email_timeline(db, user_id)
+        db.commit()
+
+    start_utc = start.astimezone(timezone.utc).replace(tzinfo=None)
+    end_utc = end.astimezone(timezone.utc).replace(tzinfo=None)
+    rows = db.query(EmailHourlyCount.bucket_start, EmailHourlyCount.count).filter(
+        EmailHourlyCount.user_id == user_id,
+        EmailHourlyCount.bucket_start >= _hour(start_utc),
+        EmailHourlyCount.bucket_start <= end_utc,
+        EmailHourlyCount.count > 0
+    ).order_by(EmailHourlyCount.bucket_start).all()
+
+    counts: Dict[str, int] = {}
+    for bucket_start, count in rows:
+        local = bucket_start.replace(tzinfo=timezone.utc).astimezone(tz)
+        label = local.strftime("%Y-%m-%dT%H:00") if granularity == "hour" else local.date().isoformat()
+        counts[label] = counts.get(label, 0) + count
+    key = "hour" if granularity == "hour" else "date"
+    return [{key: label, "count": count} for label, count in counts.items()]
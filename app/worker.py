@@ -0,0 +1,14 @@
+"""
+Celery worker for background jobs
+
+Run with: celery -A app.worker worker --loglevel=info
+"""
+from celery import Celery
+from app.core.config import settings
+from app.services.jobs import run_sync_job
+
+celery_app = Celery("email_planner", broker=settings.CELERY_BROKER_URL)
+
+@celery_app.task(name="email_planner.run_sync_job")
+def run_sync_job_task(job_id: int) -> None:
+    run_sync_job(job_id)
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks
+
+Run from the repository root, e.g.: python -m benchmarks.dedup --help
+They use temporary SQLite databases and local fake servers, never real
+Gmail or LLM endpoints.
+"""
@@ -0,0 +1,126 @@
+"""
+Endpoint throughput and event-loop responsiveness with blocking vs async sessions
+
+Serves the email list endpoint in one event loop, as a single uvicorn
+worker would, and drives it with --clients concurrent clients for
+--seconds. It runs once with a copy of the endpoint that uses the
+synchronous SessionLocal inside `async def` (what every endpoint did) and
+once with the real endpoint on the async session. A probe requests a
+trivial route every 10 ms meanwhile, timed from when each ping is due:
+blocking database calls stall the event loop, so its latency shows how
+long unrelated requests wait. The stub transport runs everything on one
+CPU-bound loop, so raw req/s favours the blocking copy, which skips the
+thread hand-off aiosqlite makes per query.
+
+Run with: python -m benchmarks.api_concurrency [--clients 20 --seconds 5]
+"""
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.api.v1.endpoints import emails as emails_endpoints
+from app.core.database import configure_sqlite, get_async_db
+from app.models import Email, User
+from app.services.email_store import bulk_insert_emails
+from benchmarks.common import email_rows, percentile, temp_database
+import argparse
+import asyncio
+import httpx
+import time
+
+def build_app(session_factory) -> FastAPI:
+    database_url = session_factory.kw["bind"].url
+    async_engine = create_async_engine(database_url.set(drivername="sqlite+aiosqlite"))
+    configure_sqlite(async_engine.sync_engine)
+    async_session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_async_db():
+        async with async_session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(emails_endpoints.router, prefix="/async/emails")
+    app.dependency_overrides[get_async_db] = override_async_db
+    app.state.async_engine = async_engine
+
+    @app.get("/blocking/emails/list")
+    async def list_emails_blocking(skip: int = 0, limit: int = 10):
+        """The list endpoint before the async layer: sync queries inside async def"""
+        # The session is closed here rather than by a Depends(get_db) teardown:
+        # with 20 clients the blocked loop cannot run teardowns and the pool runs dry
+        with session_factory() as db:
+            user = db.query(User).first()
+            query = db.query(Email).filter(Email.user_id == user.id)
+            total = query.count()
+            emails = query.order_by(Email.created_at.desc()).offset(skip).limit(limit).all()
+            return {"total": total, "emails": [emails_endpoints.serialize_email_summary(email) for email in emails]}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+async def run_load(app: FastAPI, path: str, clients: int, seconds: float) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    completed = 0
+    ping_latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def hammer() -> None:
+            nonlocal completed
+            skip = 0
+            while time.perf_counter() < deadline:
+                response = await client.get(path, params={"skip": skip, "limit": 20})
+                response.raise_for_status()
+                completed += 1
+                skip = (skip + 20) % 2000
+                # Under uvicorn each request starts with a socket read that
+                # yields to the loop; ASGITransport never does on its own
+                await asyncio.sleep(0)
+
+        async def probe() -> None:
+            # Timed from when each ping is due, so time spent waiting for a
+            # blocked event loop to schedule it is included
+            due = time.perf_counter()
+            while due < deadline:
+                due += 0.01
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                (await client.get("/ping")).raise_for_status()
+                ping_latencies.append(time.perf_counter() - due)
+                due = max(due, time.perf_counter())
+
+        await asyncio.gather(probe(), *(hammer() for _ in range(clients)))
+    return {
+        "requests_per_second": completed / seconds,
+        "ping_p50_ms": percentile(ping_latencies, 0.5) * 1000,
+        "ping_p99_ms": percentile(ping_latencies, 0.99) * 1000,
+        "ping_max_ms": max(ping_latencies) * 1000,
+        "pings": len(ping_latencies),
+    }
+
+async def benchmark(args, session_factory) -> None:
+    app = build_app(session_factory)
+    print(f"{args.clients} clients for {args.seconds:g} s against GET /emails/list on {args.emails} emails")
+    print(f"{'':<30} {'req/s':>8} {'pings':>6} {'ping p50 ms':>12} {'ping p99 ms':>12} {'ping max ms':>12}")
+    for label, path in (("sync session (before)", "/blocking/emails/list"),
+                        ("async session (after)", "/async/emails/list")):
+        result = await run_load(app, path, args.clients, args.seconds)
+        print(f"{label:<30} {result['requests_per_second']:8.0f} {result['pings']:6d} {result['ping_p50_ms']:12.2f} "
+              f"{result['ping_p99_ms']:12.2f} {result['ping_max_ms']:12.2f}")
+    await app.state.async_engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--emails", type=int, default=20000)
+    args = parser.parse_args()
+
+    with temp_database() as session_factory:
+        db = session_factory()
+        bulk_insert_emails(db, email_rows(args.emails, body_words=20), track_memory=False)
+        db.close()
+        asyncio.run(benchmark(args, session_factory))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Storage size and scan speed with inline bodies vs the compressed email_bodies table
+
+Stores --emails emails with Zipf-distributed text bodies and HTML bodies
+twice: in a database migrated only to 0003, where body_text and body_html
+sit inline in the emails row ahead of the flag and category columns, and
+in one at the latest revision, where bodies are zlib-compressed into
+email_bodies. Reports the pages each layout uses (the full-text index is
+left out of both) and times the list endpoint's page and total, a scan of
+every email row like the unread count and rollup rebuild do, and loading
+--details emails one by one with their text body, which now costs a join
+and decompression. Both layouts are queried with the same Core statements
+and a warm page cache, so the scan times understate what the smaller
+emails table saves when it is not cached.
+
+Run with: python -m benchmarks.body_storage [--emails 20000]
+"""
+from alembic import command
+from sqlalchemy import MetaData, Table, create_engine, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+from app.core.database import configure_sqlite
+from app.core.migrations import alembic_config
+from app.models import Email, EmailBody
+from app.models.email_body import decompress_body
+from app.services.email_store import bulk_insert_emails
+from benchmarks.common import email_rows, measure, report, temp_database
+from benchmarks.search import zipf_text
+import argparse
+import random
+import tempfile
+
+BEFORE_REVISION = "0003_email_query_indexes"
+
+HTML_TEMPLATE = (
+    '<html><head><style>body {{ font-family: Arial, sans-serif; color: #333333; }} '
+    'p {{ margin: 0 0 12px 0; line-height: 1.5; }} .footer {{ font-size: 11px; color: #888888; }}</style></head>'
+    '<body><table width="100%" cellpadding="0" cellspacing="0" border="0"><tr><td align="center">'
+    '<table width="600" cellpadding="16" cellspacing="0" border="0" style="background-color: #ffffff;">'
+    '{paragraphs}'
+    '<tr><td class="footer">You are receiving this email because you signed up. '
+    '<a href="https://example.com/unsubscribe?id={number}">Unsubscribe</a></td></tr>'
+    '</table></td></tr></table></body></html>'
+)
+
+def mailbox_rows(count: int, body_words: int) -> list:
+    rng = random.Random(0)
+    rows = email_rows(count, body_words=0)
+    for row in rows:
+        paragraphs = [zipf_text(rng, body_words // 4) for _ in range(4)]
+        row["body_text"] = "\n\n".join(paragraphs)
+        row["body_html"] = HTML_TEMPLATE.format(
+            paragraphs="".join(f'<tr><td><p style="margin: 0;">{paragraph}</p></td></tr>' for paragraph in paragraphs),
+            number=row["gmail_id"],
+        )
+    return rows
+
+def vacuum(engine) -> None:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+
+def table_sizes(engine) -> dict:
+    """Bytes of pages per table, indexes included, from SQLite's dbstat"""
+    with engine.connect() as conn:
+        pages = conn.execute(text(
+            "SELECT coalesce(m.tbl_name, s.name), sum(s.pgsize) FROM dbstat s "
+            "LEFT JOIN sqlite_master m ON m.name = s.name GROUP BY 1"
+        )).all()
+    return {name: size for name, size in pages if not name.startswith("emails_fts")}
+
+def page_and_total(db, table) -> None:
+    db.execute(
+        select(table.c.id, table.c.subject, table.c.sender, table.c.snippet, table.c.created_at)
+        .where(table.c.user_id == 1).order_by(table.c.created_at.desc()).limit(20)
+    ).all()
+    db.scalar(select(func.count()).select_from(table).where(table.c.user_id == 1))
+
+def scan_rows(db, table) -> None:
+    db.execute(
+        select(table.c.is_read, table.c.category, func.count())
+        .where(table.c.user_id == 1).group_by(table.c.is_read, table.c.category)
+    ).all()
+
+def run(label: str, session_factory, table, load_bodies, ids: list, repeat: int) -> None:
+    db = session_factory()
+    try:
+        report(f"{label}: list page and total", measure(lambda: page_and_total(db, table), repeat))
+        report(f"{label}: scan every email row", measure(lambda: scan_rows(db, table), repeat))
+        report(f"{label}: {len(ids)} emails with body", measure(lambda: load_bodies(db, ids), repeat), items=len(ids))
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=20000)
+    parser.add_argument("--body-words", type=int, default=300)
+    parser.add_argument("--details", type=int, default=1000, help="Emails loaded with their body")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = mailbox_rows(args.emails, args.body_words)
+    ids = random.Random(1).sample(range(1, args.emails + 1), args.details)
+    print(f"{args.emails} emails, ~{args.body_words} words of text plus an HTML version each")
+
+    with tempfile.TemporaryDirectory(prefix="email-planner-bench-") as directory:
+        engine = create_engine(f"sqlite:///{directory}/before.db")
+        configure_sqlite(engine)
+        config = alembic_config()
+        with engine.begin() as conn:
+            config.attributes["connection"] = conn
+            command.upgrade(config, BEFORE_REVISION)
+            users = Table("users", MetaData(), autoload_with=conn)
+            conn.execute(insert(users), [{"email": "bench@example.com", "google_credentials": {}}])
+        emails_before = Table("emails", MetaData(), autoload_with=engine)
+        with engine.begin() as conn:
+            for start in range(0, len(rows), 1000):
+                conn.execute(insert(emails_before), rows[start:start + 1000])
+        vacuum(engine)
+        before_sizes = table_sizes(engine)
+
+        def inline_bodies(db, email_ids):
+            for email_id in email_ids:
+                db.execute(select(emails_before).where(emails_before.c.id == email_id)).one()
+
+        run("inline (before)", sessionmaker(bind=engine), emails_before, inline_bodies, ids, args.repeat)
+        engine.dispose()
+
+    with temp_database() as session_factory:
+        db = session_factory()
+        bulk_insert_emails(db, rows, track_memory=False)
+        db.close()
+        vacuum(session_factory.kw["bind"])
+        after_sizes = table_sizes(session_factory.kw["bind"])
+
+        def compressed_bodies(db, email_ids):
+            emails = Email.__table__
+            query = select(emails, EmailBody.text_compressed).outerjoin(EmailBody, EmailBody.email_id == emails.c.id)
+            for email_id in email_ids:
+                decompress_body(db.execute(query.where(emails.c.id == email_id)).one().text_compressed)
+
+        run("compressed (after)", session_factory, Email.__table__, compressed_bodies, ids, args.repeat)
+
+    print()
+    print(f"{'':<20} {'emails MB':>10} {'bodies MB':>10} {'total MB':>10}")
+    for label, sizes in (("inline (before)", before_sizes), ("compressed (after)", after_sizes)):
+        emails_size = sizes.get("emails", 0)
+        bodies_size = sizes.get("email_bodies", 0)
+        print(f"{label:<20} {emails_size / 1e6:10.1f} {bodies_size / 1e6:10.1f} {sum(sizes.values()) / 1e6:10.1f}")
+
+if __name__ == "__main__":
+    main()
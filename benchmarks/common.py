@@ -0,0 +1,92 @@
+"""Helpers shared by the benchmarks"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.database import configure_sqlite
+from app.core.migrations import run_migrations
+from app.models import User
+from app.services.search import setup_search_index
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import random
+import statistics
+import tempfile
+import time
+
+WORDS = (
+    "budget report meeting invoice project deadline review quarterly team "
+    "update schedule travel contract proposal release customer feedback "
+    "roadmap hiring offer launch migration incident newsletter webinar "
+    "receipt shipping order password security survey agenda notes design"
+).split()
+
+@contextmanager
+def temp_database(engine_options: Optional[Dict[str, Any]] = None) -> Iterator[Callable[[], Session]]:
+    """
+    Yield a session factory for a migrated SQLite database in a temporary
+    directory, with the search index set up and one user (id 1)
+    """
+    with tempfile.TemporaryDirectory(prefix="email-planner-bench-") as directory:
+        engine = create_engine(
+            f"sqlite:///{directory}/bench.db",
+            connect_args={"check_same_thread": False},
+            **(engine_options or {})
+        )
+        configure_sqlite(engine)
+        run_migrations(engine)
+        setup_search_index(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(User.__table__), [{"email": "bench@example.com", "google_credentials": {}}])
+        try:
+            yield sessionmaker(bind=engine)
+        finally:
+            engine.dispose()
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def email_rows(count: int, start: int = 0, user_id: int = 1, body_words: int = 150, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build `count` email rows shaped like the ones sync stores, with random text"""
+    rng = random.Random(seed + start)
+    now = datetime.utcnow()
+    rows = []
+    for number in range(start, start + count):
+        received_at = now - timedelta(minutes=number * 7)
+        rows.append({
+            "user_id": user_id,
+            "gmail_id": f"msg{number:08d}",
+            "thread_id": f"thread{number // 3:08d}",
+            "subject": sentence(rng, 6).capitalize(),
+            "sender": f"sender{number % 500}@example.com",
+            "recipients": '["bench@example.com"]',
+            "snippet": sentence(rng, 20),
+            "body_text": sentence(rng, body_words),
+            "labels": '["INBOX"]',
+            "is_read": number % 3 != 0,
+            "is_important": number % 11 == 0,
+            "received_at": received_at,
+            "created_at": received_at,
+        })
+    return rows
+
+def measure(fn: Callable[[], Any], repeat: int = 1) -> List[float]:
+    """Run `fn` `repeat` times and return the wall-clock seconds of each run"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def report(label: str, timings: List[float], items: Optional[int] = None) -> float:
+    """Print the median (and rate when `items` is given) of a measurement, return the median"""
+    median = statistics.median(timings)
+    line = f"{label:<44} {median * 1000:10.1f} ms"
+    if items:
+        line += f" {items / median:12.0f} /s"
+    print(line)
+    return median
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
@@ -0,0 +1,96 @@
+"""
+Dashboard stats from the rollup tables vs the per-request aggregate queries
+
+Builds a mailbox of --emails analyzed rows (200k by default; the rollups
+are maintained while they are inserted) and times the /dashboard/stats
+payload built the way the endpoint used to build it (three counts and
+three GROUP BYs over emails, plus the two lists) and the way it does now
+(one rollup read plus the two lists).
+
+Run with: python -m benchmarks.dashboard_stats [--emails 200000]
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import desc, func
+from sqlalchemy.orm import load_only
+from app.models import Email
+from app.services.email_store import bulk_insert_emails
+from app.services.stats import get_email_stats
+from benchmarks.common import email_rows, measure, report, temp_database
+import argparse
+import time
+
+CATEGORIES = ("Work", "Personal", "Newsletter", "Finance", "Social", None)
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+
+def aggregate_stats(db, user_id: int, start_date: datetime) -> dict:
+    """The queries get_dashboard_stats ran on every request before the rollups"""
+    emails = db.query(Email).filter(Email.user_id == user_id)
+    categories = db.query(Email.category, func.count(Email.id)).filter(
+        Email.user_id == user_id, Email.category.isnot(None)
+    ).group_by(Email.category).all()
+    priorities = db.query(Email.priority_score, func.count(Email.id)).filter(
+        Email.user_id == user_id, Email.priority_score.isnot(None)
+    ).group_by(Email.priority_score).all()
+    sentiments = db.query(Email.sentiment, func.count(Email.id)).filter(
+        Email.user_id == user_id, Email.sentiment.isnot(None)
+    ).group_by(Email.sentiment).all()
+    return {
+        "total": emails.count(),
+        "unread": emails.filter(Email.is_read == False).count(),
+        "analyzed": emails.filter(Email.category.isnot(None)).count(),
+        "categories": dict(categories),
+        "priorities": {str(priority): count for priority, count in priorities},
+        "sentiments": dict(sentiments),
+        "lists": recent_lists(db, user_id, start_date),
+    }
+
+def rollup_stats(db, user_id: int, start_date: datetime) -> dict:
+    """What _build_dashboard_stats runs now"""
+    return {**get_email_stats(db, user_id), "lists": recent_lists(db, user_id, start_date)}
+
+def recent_lists(db, user_id: int, start_date: datetime) -> tuple:
+    high_priority = db.query(Email).options(
+        load_only(Email.id, Email.subject, Email.sender, Email.priority_score, Email.category)
+    ).filter(
+        Email.user_id == user_id, Email.priority_score >= 4, Email.created_at >= start_date
+    ).order_by(desc(Email.created_at)).limit(5).all()
+    pending_actions = db.query(Email).options(
+        load_only(Email.id, Email.subject, Email.action_items)
+    ).filter(
+        Email.user_id == user_id, Email.action_items != '[]',
+        Email.action_items.isnot(None), Email.created_at >= start_date
+    ).order_by(desc(Email.created_at)).limit(5).all()
+    return [email.id for email in high_priority], [email.id for email in pending_actions]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with temp_database() as session_factory:
+        db = session_factory()
+        start = time.perf_counter()
+        for offset in range(0, args.emails, 10000):
+            rows = email_rows(min(10000, args.emails - offset), start=offset, body_words=0)
+            for row in rows:
+                number = int(row["gmail_id"][3:])
+                category = CATEGORIES[number % len(CATEGORIES)]
+                row.update({
+                    "category": category,
+                    "priority_score": number % 5 + 1 if category else None,
+                    "sentiment": SENTIMENTS[number % len(SENTIMENTS)] if category else None,
+                    "action_items": ('["Reply"]' if number % 4 == 0 else "[]") if category else None,
+                })
+            bulk_insert_emails(db, rows, track_memory=False)
+        print(f"{args.emails} emails stored with rollups in {time.perf_counter() - start:.1f} s")
+
+        start_date = datetime.utcnow() - timedelta(days=7)
+        assert aggregate_stats(db, 1, start_date) == rollup_stats(db, 1, start_date)
+        before = report("aggregate queries over emails (before)", measure(lambda: aggregate_stats(db, 1, start_date), args.repeat))
+        after = report("rollup read (after)", measure(lambda: rollup_stats(db, 1, start_date), args.repeat))
+        print(f"speedup: {before / after:.1f}x")
+        db.close()
+
+if __name__ == "__main__":
+    main()
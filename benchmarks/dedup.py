@@ -0,0 +1,60 @@
+"""
+Dedup of listed Gmail message ids against the stored emails
+
+Compares the per-message existence query sync used to run with the
+set-based find_new_message_ids, and times bulk_insert_emails skipping
+already stored rows through ON CONFLICT DO NOTHING.
+
+Run with: python -m benchmarks.dedup [--messages 10000]
+"""
+from app.models import Email, User
+from app.services.email_store import bulk_insert_emails
+from app.services.gmail import find_new_message_ids
+from benchmarks.common import email_rows, measure, report, temp_database
+import argparse
+import random
+
+def per_message_dedup(db, user, message_ids):
+    """The N+1 check sync ran before: one query per listed message"""
+    new_ids = []
+    for message_id in message_ids:
+        existing_email = db.query(Email).filter(
+            Email.user_id == user.id,
+            Email.gmail_id == message_id
+        ).first()
+        if not existing_email:
+            new_ids.append(message_id)
+    return new_ids
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000, help="Listed message ids")
+    parser.add_argument("--stored", type=float, default=0.5, help="Fraction of them already stored")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = email_rows(args.messages, body_words=20)
+    stored = random.Random(1).sample(rows, int(args.messages * args.stored))
+    message_ids = [row["gmail_id"] for row in rows]
+    print(f"{args.messages} listed messages, {len(stored)} already stored")
+
+    with temp_database() as session_factory:
+        db = session_factory()
+        bulk_insert_emails(db, stored, track_memory=False)
+        user = db.get(User, 1)
+
+        expected = per_message_dedup(db, user, message_ids)
+        assert find_new_message_ids(db, user, message_ids) == expected
+        before = report("per-message query (before)", measure(lambda: per_message_dedup(db, user, message_ids), args.repeat), args.messages)
+        after = report("find_new_message_ids (after)", measure(lambda: find_new_message_ids(db, user, message_ids), args.repeat), args.messages)
+        print(f"speedup: {before / after:.1f}x")
+
+        # Conflicting rows are skipped by the database instead of being checked first
+        result = bulk_insert_emails(db, rows, track_memory=False)
+        print(f"bulk_insert_emails over all {len(rows)} rows: {result['inserted']} inserted, "
+              f"{len(rows) / result['seconds']:.0f} rows/s")
+        assert result["inserted"] == len(expected)
+        db.close()
+
+if __name__ == "__main__":
+    main()
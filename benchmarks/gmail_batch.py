@@ -0,0 +1,147 @@
+"""
+Batched vs one-by-one Gmail message fetches against a local fake Gmail server
+
+The server answers messages.get and the /batch endpoint the same way
+Gmail does (multipart/mixed), sleeping --latency-ms per HTTP round trip
+to stand in for the network. The googleapiclient service is built from
+the bundled Gmail discovery document pointed at the local server.
+
+Run with: python -m benchmarks.gmail_batch [--messages 500 --latency-ms 20]
+"""
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from app.core.config import settings
+from app.services.gmail import fetch_messages
+from benchmarks.common import measure, report
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+import argparse
+import base64
+import httplib2
+import json
+import threading
+import time
+import uuid
+
+def fake_message(message_id: str) -> Dict[str, Any]:
+    body = f"Body of {message_id}. " * 100
+    return {
+        "id": message_id,
+        "threadId": message_id,
+        "labelIds": ["INBOX", "UNREAD"],
+        "snippet": body[:100],
+        "internalDate": "1767225600000",
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": "Subject", "value": f"Subject {message_id}"},
+                {"name": "From", "value": "sender@example.com"},
+                {"name": "To", "value": "me@example.com"},
+            ],
+            "body": {"data": base64.urlsafe_b64encode(body.encode()).decode()},
+        },
+    }
+
+class FakeGmailHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+    latency = 0.0
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _round_trip(self) -> None:
+        FakeGmailHandler.requests += 1
+        time.sleep(self.latency)
+
+    def do_GET(self):
+        self._round_trip()
+        message_id = urlparse(self.path).path.rsplit("/", 1)[-1]
+        self._send(200, "application/json", json.dumps(fake_message(message_id)).encode())
+
+    def do_POST(self):
+        # Batch request: one application/http part per sub-request
+        self._round_trip()
+        content = self.rfile.read(int(self.headers["Content-Length"]))
+        batch = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + content
+        )
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for part in batch.iter_parts():
+            request_line = part.get_payload().split("\n", 1)[0]
+            message_id = urlparse(request_line.split(" ")[1]).path.rsplit("/", 1)[-1]
+            body = json.dumps(fake_message(message_id))
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                "HTTP/1.1 200 OK\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+                f"{body}\r\n"
+            )
+        payload = "".join(parts) + f"--{boundary}--\r\n"
+        self._send(200, f"multipart/mixed; boundary={boundary}", payload.encode())
+
+def local_gmail_service(port: int) -> Any:
+    """Gmail API client talking to the fake server on `port`"""
+    document = json.loads(get_static_doc("gmail", "v1"))
+    document["rootUrl"] = f"http://127.0.0.1:{port}/"
+    return build_from_document(document, http=httplib2.Http())
+
+def fetch_one_by_one(service: Any, message_ids) -> list:
+    """The loop sync used before batching: one blocking messages.get per message"""
+    return [
+        service.users().messages().get(userId="me", id=message_id, format="full").execute()
+        for message_id in message_ids
+    ]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20, help="Simulated latency of each HTTP round trip")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    # Only the fake server's latency should limit the run
+    settings.GMAIL_QUOTA_UNITS_PER_SECOND = 1e9
+    settings.GMAIL_USER_QUOTA_UNITS_PER_SECOND = 1e9
+    FakeGmailHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGmailHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    service = local_gmail_service(server.server_address[1])
+    message_ids = [f"msg{number:08d}" for number in range(args.messages)]
+    print(f"{args.messages} messages, {args.latency_ms:g} ms per round trip, batches of {min(settings.GMAIL_BATCH_SIZE, 100)}")
+
+    try:
+        messages, unfetched = fetch_messages(service, 1, message_ids)
+        assert [message["id"] for message in messages] == message_ids and not unfetched
+        assert fetch_one_by_one(service, message_ids[:3]) == messages[:3]
+
+        results: Dict[str, Optional[float]] = {}
+        for label, fetch in (
+            ("one messages.get per message (before)", lambda: fetch_one_by_one(service, message_ids)),
+            ("fetch_messages batches (after)", lambda: fetch_messages(service, 1, message_ids)),
+        ):
+            FakeGmailHandler.requests = 0
+            results[label] = report(label, measure(fetch, args.repeat), args.messages)
+            print(f"{'':<44} {FakeGmailHandler.requests // args.repeat:10d} round trips")
+        before, after = results.values()
+        print(f"speedup: {before / after:.1f}x")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Sequential vs concurrent batch analysis against a local chat-completions stub
+
+Analyzes --emails emails the way POST /emails/analyze used to (one
+analyze_email after another) and through analyze_emails_concurrently,
+with at most --concurrency requests in flight, with and without packing
+short emails --pack-size to a request. The stub answers every completion
+after --latency-ms, whatever the pack size, so the packed run is an upper
+bound. The analysis cache is disabled so every email costs a request.
+
+Run with: python -m benchmarks.llm_batch [--emails 50 --latency-ms 300]
+"""
+from types import SimpleNamespace
+from app.core.config import settings
+from app.services import llm
+from benchmarks.common import WORDS
+from benchmarks.llm_server import FakeLLMHandler, fake_llm_server
+import argparse
+import asyncio
+import time
+
+def fake_emails(count: int) -> list:
+    return [
+        SimpleNamespace(
+            id=number,
+            subject=f"{WORDS[number % len(WORDS)].capitalize()} {number}",
+            sender=f"sender{number}@example.com",
+            body_text=" ".join(WORDS[(number + offset) % len(WORDS)] for offset in range(40)),
+            snippet="",
+        )
+        for number in range(count)
+    ]
+
+async def analyze_sequentially(emails) -> int:
+    analyzed = 0
+    for email in emails:
+        result = await llm.analyze_email(subject=email.subject, body=email.body_text, sender=email.sender)
+        analyzed += result["success"]
+    return analyzed
+
+async def analyze_concurrently(emails, concurrency: int, pack_size: int) -> int:
+    analyzed = 0
+    async for _, result in llm.analyze_emails_concurrently(emails, max_concurrency=concurrency, pack_size=pack_size):
+        analyzed += result["success"]
+    return analyzed
+
+async def benchmark(args) -> None:
+    settings.LLM_CACHE_BACKEND = "none"
+    emails = fake_emails(args.emails)
+    with fake_llm_server(latency=args.latency_ms / 1000) as base_url:
+        llm.DEEPSEEK_API_BASE = base_url
+        llm.DEEPSEEK_API_KEY = "benchmark"
+        print(f"{args.emails} emails, {args.latency_ms:g} ms per completion")
+        print(f"{'':<40} {'seconds':>8} {'emails/s':>9} {'requests':>9}")
+        runs = (
+            ("one after another (before)", lambda: analyze_sequentially(emails)),
+            (f"concurrent, {args.concurrency} in flight (after)", lambda: analyze_concurrently(emails, args.concurrency, 1)),
+            (f"concurrent, packs of {args.pack_size}", lambda: analyze_concurrently(emails, args.concurrency, args.pack_size)),
+        )
+        for label, run in runs:
+            await llm.start_http_client()
+            FakeLLMHandler.requests = 0
+            start = time.perf_counter()
+            analyzed = await run()
+            elapsed = time.perf_counter() - start
+            await llm.close_http_client()
+            assert analyzed == len(emails), f"{label}: only {analyzed} of {len(emails)} analyzed"
+            print(f"{label:<40} {elapsed:8.2f} {len(emails) / elapsed:9.1f} {FakeLLMHandler.requests:9d}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=settings.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--pack-size", type=int, default=settings.LLM_PACK_SIZE)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Time the stub takes per completion")
+    asyncio.run(benchmark(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
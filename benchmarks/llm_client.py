@@ -0,0 +1,77 @@
+"""
+Shared pooled LLM client vs a new httpx.AsyncClient per call
+
+Sends chat-completion requests to the local fake API over HTTPS, one at a
+time and --concurrency at a time, once with a client created and closed
+for every call (what analyze_email and generate_email_draft did) and once
+with the application-lifetime client from app.services.llm. Each new
+connection pays a real local TLS handshake plus --handshake-ms standing
+in for the network round trips. The fake server speaks HTTP/1.1 only, so
+this measures keep-alive and pooling, not HTTP/2 multiplexing.
+
+Run with: python -m benchmarks.llm_client [--requests 200 --handshake-ms 30]
+"""
+from app.core.config import settings
+from app.services import llm
+from benchmarks.common import percentile
+from benchmarks.llm_server import FakeLLMHandler, fake_llm_server
+from typing import Awaitable, Callable, List
+import argparse
+import asyncio
+import httpx
+import time
+
+REQUEST = {
+    "model": llm.ANALYSIS_MODEL,
+    "messages": [{"role": "user", "content": "Analyze this email"}],
+}
+
+async def post_with_new_client(base_url: str) -> None:
+    async with httpx.AsyncClient(timeout=settings.LLM_REQUEST_TIMEOUT) as client:
+        response = await client.post(f"{base_url}/chat/completions", json=REQUEST)
+        response.raise_for_status()
+
+async def post_with_shared_client(base_url: str) -> None:
+    response = await llm.get_http_client().post(f"{base_url}/chat/completions", json=REQUEST)
+    response.raise_for_status()
+
+async def run(post: Callable[[str], Awaitable[None]], base_url: str, requests: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await post(base_url)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+async def benchmark(args) -> None:
+    with fake_llm_server(latency=args.latency_ms / 1000, handshake=args.handshake_ms / 1000) as base_url:
+        print(f"{args.requests} requests, {args.latency_ms:g} ms per completion, "
+              f"{args.handshake_ms:g} ms extra per new connection")
+        print(f"{'':<32} {'in flight':>9} {'total s':>8} {'p50 ms':>8} {'p99 ms':>8} {'connections':>12}")
+        for concurrency in (1, args.concurrency):
+            for label, post in (("new client per call (before)", post_with_new_client),
+                                ("shared pooled client (after)", post_with_shared_client)):
+                await llm.start_http_client()
+                FakeLLMHandler.connections = 0
+                start = time.perf_counter()
+                latencies = await run(post, base_url, args.requests, concurrency)
+                total = time.perf_counter() - start
+                await llm.close_http_client()
+                print(f"{label:<32} {concurrency:9d} {total:8.2f} {percentile(latencies, 0.5) * 1000:8.1f} "
+                      f"{percentile(latencies, 0.99) * 1000:8.1f} {FakeLLMHandler.connections:12d}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=settings.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--latency-ms", type=float, default=5, help="Time the fake API takes per completion")
+    parser.add_argument("--handshake-ms", type=float, default=30, help="Extra delay per new connection")
+    asyncio.run(benchmark(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
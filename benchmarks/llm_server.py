@@ -0,0 +1,113 @@
+"""Local stand-in for the chat-completions API, used by the LLM benchmarks"""
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+import json
+import os
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+ANALYSIS = {
+    "category": "Work",
+    "priority_score": 3,
+    "sentiment": "Neutral",
+    "summary": "Benchmark email.",
+    "action_items": [],
+    "tone": "Professional",
+}
+PACK_COUNT = re.compile(r"Return a JSON array with exactly (\d+) objects")
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /chat/completions after `latency` seconds. Every new
+    connection first waits `handshake` seconds, standing in for the TCP and
+    TLS round trips to a remote API.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+    handshake = 0.0
+    connections = 0
+    requests = 0
+    _counter_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        with self._counter_lock:
+            FakeLLMHandler.connections += 1
+        time.sleep(self.handshake)
+        super().setup()
+
+    def do_POST(self):
+        with self._counter_lock:
+            FakeLLMHandler.requests += 1
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = request["messages"][-1]["content"]
+        time.sleep(self.latency)
+        pack = PACK_COUNT.search(prompt)
+        if pack:
+            content = [dict(ANALYSIS, index=index) for index in range(1, int(pack.group(1)) + 1)]
+        else:
+            content = ANALYSIS
+        body = json.dumps({"choices": [{"message": {"role": "assistant", "content": json.dumps(content)}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    ssl_context = None
+
+    def get_request(self):
+        sock, address = super().get_request()
+        if self.ssl_context is not None:
+            # The handshake runs on the handler thread, not the accept loop
+            sock = self.ssl_context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+        return sock, address
+
+def _self_signed_context(directory: str) -> ssl.SSLContext:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-keyout", key, "-out", cert, "-subj", "/CN=127.0.0.1",
+        "-addext", "subjectAltName=IP:127.0.0.1",
+    ], check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+@contextmanager
+def fake_llm_server(latency: float = 0.0, handshake: float = 0.0, tls: bool = True) -> Iterator[str]:
+    """
+    Run the fake API on a local port and yield its base URL. With `tls` it
+    serves HTTPS with a throwaway self-signed certificate (needs the openssl
+    command), trusted by httpx through SSL_CERT_FILE while the block runs.
+    """
+    FakeLLMHandler.latency = latency
+    FakeLLMHandler.handshake = handshake
+    FakeLLMHandler.connections = FakeLLMHandler.requests = 0
+    with tempfile.TemporaryDirectory(prefix="email-planner-llm-") as directory:
+        server = FakeLLMServer(("127.0.0.1", 0), FakeLLMHandler)
+        server.request_queue_size = 128
+        previous_cert_file = os.environ.get("SSL_CERT_FILE")
+        if tls:
+            server.ssl_context = _self_signed_context(directory)
+            os.environ["SSL_CERT_FILE"] = os.path.join(directory, "cert.pem")
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            yield f"{'https' if tls else 'http'}://127.0.0.1:{server.server_address[1]}/v1"
+        finally:
+            server.shutdown()
+            server.server_close()
+            if previous_cert_file is None:
+                os.environ.pop("SSL_CERT_FILE", None)
+            else:
+                os.environ["SSL_CERT_FILE"] = previous_cert_file
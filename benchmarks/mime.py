@@ -0,0 +1,182 @@
+"""
+MIME body parsing over a corpus of Gmail API message payloads
+
+Runs parse_message_body over a fixture corpus and, for comparison, the
+parse_email_body it replaced (top-level parts only, UTF-8 only, no cap).
+The built-in corpus covers plain and alternative messages, alternatives
+nested in related and mixed parts with inline images and attachments,
+non-UTF-8 charsets, HTML-only newsletters, a multi-megabyte attachment
+sent inline and an oversized text body. --corpus adds a directory of
+saved messages.get(format='full') responses (*.json, whole message or
+payload). Reports messages/s, payload MB/s and the peak memory of one
+pass per kind, and how many messages the old parser got wrong: raised,
+or found no text where the new parser did.
+
+Run with: python -m benchmarks.mime [--repeat 5 --corpus DIR]
+"""
+from app.services.mime import parse_message_body
+from benchmarks.common import WORDS
+from pathlib import Path
+from typing import Any, Dict, List
+import argparse
+import base64
+import json
+import random
+import time
+import tracemalloc
+
+def old_parse_email_body(payload):
+    """The parser sync used before: top-level parts only, bare UTF-8 decode"""
+    if payload.get('body', {}).get('data'):
+        return base64.urlsafe_b64decode(payload['body']['data']).decode()
+
+    if payload.get('parts'):
+        for part in payload['parts']:
+            if part['mimeType'] in ['text/plain', 'text/html']:
+                if part['body'].get('data'):
+                    return base64.urlsafe_b64decode(part['body']['data']).decode()
+    return ""
+
+def encode(data: bytes) -> str:
+    # Gmail pads its base64url bodies
+    return base64.urlsafe_b64encode(data).decode()
+
+def part(mime_type: str, text: str, charset: str = "utf-8", filename: str = "", disposition: str = "") -> Dict[str, Any]:
+    data = text.encode(charset)
+    headers = [{"name": "Content-Type", "value": f"{mime_type}; charset={charset}"}]
+    if disposition:
+        headers.append({"name": "Content-Disposition", "value": disposition})
+    return {"mimeType": mime_type, "filename": filename, "headers": headers, "body": {"size": len(data), "data": encode(data)}}
+
+def binary_part(mime_type: str, size: int, rng: random.Random, filename: str, disposition: str) -> Dict[str, Any]:
+    data = rng.randbytes(size)
+    return {
+        "mimeType": mime_type,
+        "filename": filename,
+        "headers": [{"name": "Content-Type", "value": mime_type}, {"name": "Content-Disposition", "value": disposition}],
+        "body": {"size": size, "data": encode(data)},
+    }
+
+def multipart(mime_type: str, *parts) -> Dict[str, Any]:
+    return {"mimeType": mime_type, "filename": "", "headers": [], "body": {"size": 0}, "parts": list(parts)}
+
+def text_body(rng: random.Random, words: int) -> str:
+    return "\n\n".join(" ".join(rng.choices(WORDS, k=words // 5)).capitalize() + "." for _ in range(5))
+
+def html_body(text: str) -> str:
+    paragraphs = "".join(f'<tr><td style="padding: 8px; font-family: Arial;"><p>{paragraph}</p></td></tr>' for paragraph in text.split("\n\n"))
+    return (
+        '<html><head><style>p { margin: 0; } .footer { color: #888888; }</style></head><body>'
+        f'<table width="600" cellpadding="0" cellspacing="0">{paragraphs}</table>'
+        '<p class="footer">Unsubscribe &amp; preferences</p></body></html>'
+    )
+
+def build_corpus(variants: int, large_variants: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Payload fixtures by kind; the multi-megabyte kinds get fewer variants"""
+    rng = random.Random(0)
+    corpus = {kind: [] for kind in ("plain", "alternative", "nested", "charsets", "html_only", "large_attachment", "oversized_body")}
+    for _ in range(variants):
+        text = text_body(rng, 300)
+        corpus["plain"].append(part("text/plain", text))
+        corpus["alternative"].append(multipart("multipart/alternative", part("text/plain", text), part("text/html", html_body(text))))
+        corpus["nested"].append(multipart(
+            "multipart/mixed",
+            multipart(
+                "multipart/related",
+                multipart("multipart/alternative", part("text/plain", text), part("text/html", html_body(text))),
+                binary_part("image/png", 40000, rng, "logo.png", "inline; filename=logo.png"),
+            ),
+            binary_part("application/pdf", 200000, rng, "report.pdf", "attachment; filename=report.pdf"),
+        ))
+        corpus["charsets"].append(multipart(
+            "multipart/alternative",
+            part("text/plain", "Grüße aus Köln, à bientôt. " * 40, charset="iso-8859-1"),
+            part("text/html", "<p>Привет, как дела?</p>" * 40, charset="koi8-r"),
+        ))
+        corpus["html_only"].append(part("text/html", html_body(text_body(rng, 3000))))
+    for _ in range(large_variants):
+        text = text_body(rng, 300)
+        corpus["large_attachment"].append(multipart(
+            "multipart/mixed",
+            multipart("multipart/alternative", part("text/plain", text), part("text/html", html_body(text))),
+            part("text/csv", "date,amount,description\n" * 200000, filename="export.csv", disposition="attachment; filename=export.csv"),
+        ))
+        corpus["oversized_body"].append(part("text/plain", text_body(rng, 400000)))
+    return corpus
+
+def load_corpus(directory: str) -> List[Dict[str, Any]]:
+    payloads = []
+    for path in sorted(Path(directory).glob("*.json")):
+        message = json.loads(path.read_text())
+        payloads.append(message.get("payload", message))
+    return payloads
+
+def payload_bytes(payload: Dict[str, Any]) -> int:
+    total, stack = 0, [payload]
+    while stack:
+        node = stack.pop()
+        total += len(node.get("body", {}).get("data", ""))
+        stack.extend(node.get("parts", []))
+    return total
+
+def run_parser(parse, payloads) -> int:
+    """Parse every payload, return how many raised"""
+    errors = 0
+    for payload in payloads:
+        try:
+            parse(payload)
+        except Exception:
+            errors += 1
+    return errors
+
+def peak_memory_kb(parse, payloads) -> int:
+    tracemalloc.start()
+    try:
+        run_parser(parse, payloads)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+def old_parser_wrong(payloads) -> int:
+    wrong = 0
+    for payload in payloads:
+        try:
+            old_text = old_parse_email_body(payload)
+        except Exception:
+            wrong += 1
+            continue
+        if not old_text and parse_message_body(payload)[0]:
+            wrong += 1
+    return wrong
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", type=int, default=50, help="Messages per kind")
+    parser.add_argument("--large-variants", type=int, default=3, help="Messages per multi-megabyte kind")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the corpus per timing")
+    parser.add_argument("--corpus", help="Directory of saved Gmail API messages (*.json)")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.variants, args.large_variants)
+    if args.corpus:
+        corpus["saved"] = load_corpus(args.corpus)
+
+    print(f"{'':<18} {'msgs':>5} {'avg KB':>8} {'new msg/s':>10} {'new MB/s':>9} {'new peak KB':>12} "
+          f"{'old msg/s':>10} {'old peak KB':>12} {'old wrong':>10}")
+    for kind, payloads in corpus.items():
+        if not payloads:
+            continue
+        size = sum(payload_bytes(payload) for payload in payloads)
+        rates = {}
+        for label, parse in (("new", parse_message_body), ("old", old_parse_email_body)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                run_parser(parse, payloads)
+            elapsed = time.perf_counter() - start
+            rates[label] = (len(payloads) * args.repeat / elapsed, size * args.repeat / elapsed / 1e6)
+        print(f"{kind:<18} {len(payloads):5d} {size / len(payloads) / 1024:8.1f} {rates['new'][0]:10.0f} {rates['new'][1]:9.0f} "
+              f"{peak_memory_kb(parse_message_body, payloads):12d} {rates['old'][0]:10.0f} "
+              f"{peak_memory_kb(old_parse_email_body, payloads):12d} {old_parser_wrong(payloads):10d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Email search with the full-text index vs ILIKE scans
+
+Builds a mailbox of --emails rows (100k by default) with Zipf-distributed
+words and runs the list endpoint's search query, first page plus total,
+through apply_search (FTS5, ranked, prefix matching) and through the
+ILIKE filter it replaced. Searches range from words in nearly every email,
+where ranking all matches dominates, to rare words and unique tokens.
+The ILIKE baseline only covers subject and snippet: bodies are stored
+compressed now, so the old body_text scan made searches even slower than
+shown here.
+
+Run with: python -m benchmarks.search [--emails 100000]
+"""
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import load_only
+from app.api.v1.endpoints.emails import EMAIL_SUMMARY_COLUMNS
+from app.models import Email
+from app.services.email_store import bulk_insert_emails
+from app.services.search import apply_search
+from benchmarks.common import WORDS, email_rows, measure, report, temp_database
+import argparse
+import itertools
+import random
+import time
+
+# Word frequencies follow Zipf's law like natural text: the first words are
+# in almost every email, "term01xx" in a few percent, the tail in almost none
+VOCABULARY = list(WORDS) + [f"term{number:04d}" for number in range(5000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+SEARCHES = ("budget", "term0100", "term0100 term0150", "term01", "escalation", "ticket0004217")
+
+def zipf_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=words))
+
+def base_query():
+    return select(Email).options(load_only(*EMAIL_SUMMARY_COLUMNS)).filter(Email.user_id == 1)
+
+def ilike_search(db, search: str):
+    """The filter list_emails used before the index: a scan of every row"""
+    search_term = f"%{search}%"
+    query = base_query().filter(or_(Email.subject.ilike(search_term), Email.snippet.ilike(search_term)))
+    page = db.scalars(query.order_by(Email.created_at.desc()).limit(10)).all()
+    total = db.scalar(select(func.count()).select_from(query.subquery()))
+    return page, total
+
+def fts_search(db, search: str):
+    query, rank_order = apply_search(base_query(), search)
+    page = db.scalars(query.order_by(rank_order, Email.created_at.desc()).limit(10)).all()
+    total = db.scalar(select(func.count()).select_from(query.subquery()))
+    return page, total
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with temp_database() as session_factory:
+        db = session_factory()
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for offset in range(0, args.emails, 10000):
+            rows = email_rows(min(10000, args.emails - offset), start=offset, body_words=0)
+            for row in rows:
+                number = int(row["gmail_id"][3:])
+                row["subject"] = zipf_text(rng, 6)
+                row["snippet"] = zipf_text(rng, 20)
+                row["body_text"] = zipf_text(rng, 60)
+                # A rare word and a unique token, so not every search matches everything
+                if number % 1000 == 0:
+                    row["subject"] += " escalation"
+                row["snippet"] += f" ticket{number:07d}"
+            bulk_insert_emails(db, rows, track_memory=False)
+        print(f"{args.emails} emails stored and indexed in {time.perf_counter() - start:.1f} s")
+
+        for search in SEARCHES:
+            _, ilike_total = ilike_search(db, search)
+            _, fts_total = fts_search(db, search)
+            print(f"\nsearch {search!r}: {ilike_total} substring matches, {fts_total} full-text matches")
+            before = report("  ILIKE scan (before)", measure(lambda: ilike_search(db, search), args.repeat))
+            after = report("  full-text index (after)", measure(lambda: fts_search(db, search), args.repeat))
+            print(f"  speedup: {before / after:.1f}x")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Mixed read/write load on SQLite with the old and the configured pragmas
+
+A writer stores sync-sized chunks of emails with bulk_insert_emails while
+reader threads run the list endpoint's reads (newest page and total). Runs
+once with SQLite's defaults (rollback journal, synchronous=FULL, no mmap)
+and once with the SQLITE_* settings (WAL, synchronous=NORMAL, mmap), and
+reports read latency percentiles, reads/s, rows written/s and lock errors.
+
+Run with: python -m benchmarks.sqlite_load [--seconds 10 --readers 4]
+"""
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.models import Email
+from app.services.email_store import bulk_insert_emails
+from benchmarks.common import email_rows, percentile, temp_database
+from typing import Any, Dict
+import argparse
+import threading
+import time
+
+PROFILES = {
+    "defaults (before)": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_MMAP_SIZE": 0},
+    "configured (after)": {
+        "SQLITE_JOURNAL_MODE": settings.SQLITE_JOURNAL_MODE,
+        "SQLITE_SYNCHRONOUS": settings.SQLITE_SYNCHRONOUS,
+        "SQLITE_MMAP_SIZE": settings.SQLITE_MMAP_SIZE,
+    },
+}
+
+def run_load(session_factory, seconds: float, readers: int, chunk_size: int) -> Dict[str, Any]:
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    written = [0]
+    # Built up front so the writer thread spends its time in the database
+    pending_rows = email_rows(int(seconds * 5000), start=1000000, body_words=40)
+
+    def write() -> None:
+        db = session_factory()
+        try:
+            for start in range(0, len(pending_rows), chunk_size):
+                if stop.is_set():
+                    break
+                chunk = pending_rows[start:start + chunk_size]
+                written[0] += bulk_insert_emails(db, chunk, chunk_size=chunk_size, track_memory=False)["inserted"]
+        finally:
+            db.close()
+
+    def read() -> None:
+        db = session_factory()
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    db.scalars(select(Email.id).where(Email.user_id == 1).order_by(Email.created_at.desc()).limit(20)).all()
+                    db.scalar(select(func.count()).select_from(Email).where(Email.user_id == 1))
+                    db.rollback()
+                except Exception as e:
+                    db.rollback()
+                    errors.append(e)
+                    continue
+                latencies.append(time.perf_counter() - start)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        "reads_per_second": len(latencies) / seconds,
+        "p50_ms": percentile(latencies, 0.5) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "max_ms": max(latencies) * 1000 if latencies else None,
+        "rows_per_second": written[0] / seconds,
+        "errors": len(errors),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--emails", type=int, default=20000, help="Emails stored before the load starts")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Rows per writer commit (incremental syncs commit small chunks)")
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers and 1 writer for {args.seconds:g} s on {args.emails} emails")
+    print(f"{'':<20} {'reads/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'rows/s':>8} {'errors':>7}")
+    for label, pragmas in PROFILES.items():
+        for name, value in pragmas.items():
+            setattr(settings, name, value)
+        with temp_database() as session_factory:
+            db = session_factory()
+            bulk_insert_emails(db, email_rows(args.emails, body_words=40), track_memory=False)
+            db.close()
+            result = run_load(session_factory, args.seconds, args.readers, args.chunk_size)
+        print(f"{label:<20} {result['reads_per_second']:9.0f} {result['p50_ms']:8.2f} {result['p99_ms']:8.2f} "
+              f"{result['max_ms']:8.1f} {result['rows_per_second']:8.0f} {result['errors']:7d}")
+
+if __name__ == "__main__":
+    main()
@@ -40,7 +40,7 @@ import SummarizeIcon from '@mui/icons-material/Summarize';
 import CategoryIcon from '@mui/icons-material/Category';
 import PriorityHighIcon from '@mui/icons-material/PriorityHigh';
 import MoodIcon from '@mui/icons-material/Mood';
-import { Email } from '../services/api';
+import { Email, getEmail } from '../services/api';
 import EmailDraftGenerator from './EmailDraftGenerator';
 
 interface EmailDetailProps {
@@ -74,8 +74,25 @@ const EmailDetail: React.FC<EmailDetailProps> = ({
     }
   }, [email?.id, email?.is_read, onMarkAsRead]);
 
+  // List responses carry no bodies, load them when the email is opened
+  const [details, setDetails] = React.useState<Email | null>(null);
+  React.useEffect(() => {
+    if (!email || !open) return;
+    let cancelled = false;
+    setDetails(null);
+    getEmail(email.id).then((detail) => {
+      if (!cancelled) setDetails(detail);
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [email?.id, open]);
+
   if (!email) return null;
 
+  const bodyHtml = details?.body_html || email.body_html;
+  const bodyText = details?.body_text || email.body_text;
+
   const getCategoryColor = (category: string) => {
     switch (category) {
       case 'Work':
@@ -461,10 +478,10 @@ const EmailDetail: React.FC<EmailDetailProps> = ({
                   '& a': { color: 'primary.main' }
                 }}
               >
-                {email.body_html ? (
-                  <div dangerouslySetInnerHTML={{ __html: email.body_html }} />
+                {bodyHtml ? (
+                  <div dangerouslySetInnerHTML={{ __html: bodyHtml }} />
                 ) : (
-                  email.body_text ? email.body_text.split('\n').map((line, i) => (
+                  bodyText ? bodyText.split('\n').map((line, i) => (
                     <React.Fragment key={i}>
                       {line}
                       <br />
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Dialog,
   DialogTitle,
@@ -17,7 +17,7 @@ import CloseIcon from '@mui/icons-material/Close';
 import AutoAwesomeIcon from '@mui/icons-material/AutoAwesome';
 import RefreshIcon from '@mui/icons-material/Refresh';
 import { Email } from '../services/api';
-import { generateEmailDraft } from '../services/api';
+import { streamEmailDraft } from '../services/api';
 
 interface EmailDraftGeneratorProps {
   open: boolean;
@@ -36,6 +36,20 @@ const EmailDraftGenerator: React.FC<EmailDraftGeneratorProps> = ({
   const [generatedDraft, setGeneratedDraft] = useState('');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // Aborting the request stops the generation on the server
+  const abortRef = useRef<AbortController | null>(null);
+
+  const cancelGeneration = () => {
+    if (!abortRef.current) return;
+    abortRef.current.abort();
+    abortRef.current = null;
+    setLoading(false);
+  };
+
+  const handleClose = () => {
+    cancelGeneration();
+    onClose();
+  };
 
   const handlePromptChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     setPrompt(e.target.value);
@@ -44,16 +58,25 @@ const EmailDraftGenerator: React.FC<EmailDraftGeneratorProps> = ({
   const generateDraft = async () => {
     if (!originalEmail) return;
     
+    cancelGeneration();
+    const controller = new AbortController();
+    abortRef.current = controller;
     setLoading(true);
     setError(null);
+    setGeneratedDraft('');
     
     try {
-      // Call the backend API to generate a draft
-      const response = await generateEmailDraft({
-        email_id: String(originalEmail.id),
-        mode: mode,
-        instructions: prompt || undefined
-      });
+      // Stream the draft from the backend, showing tokens as they arrive
+      const response = await streamEmailDraft(
+        {
+          email_id: String(originalEmail.id),
+          mode: mode,
+          instructions: prompt || undefined
+        },
+        (token) => setGeneratedDraft((draft) => draft + token),
+        controller.signal
+      );
+      if (controller.signal.aborted) return;
       
       if (response.success && response.draft) {
         setGeneratedDraft(response.draft);
@@ -63,12 +86,16 @@ const EmailDraftGenerator: React.FC<EmailDraftGeneratorProps> = ({
         generateFallbackDraft();
       }
     } catch (err) {
+      if (controller.signal.aborted) return;
       console.error('Error generating draft:', err);
       setError('Failed to generate draft. Using fallback method.');
       // Fallback to client-side generation
       generateFallbackDraft();
     } finally {
-      setLoading(false);
+      if (abortRef.current === controller) {
+        abortRef.current = null;
+        setLoading(false);
+      }
     }
   };
 
@@ -158,10 +185,12 @@ const EmailDraftGenerator: React.FC<EmailDraftGeneratorProps> = ({
       setError(null);
       generateDraft();
     }
+    // Closing the dialog or unmounting cancels a draft still being generated
+    return cancelGeneration;
   }, [open, originalEmail, mode]);
 
   return (
-    <Dialog open={open} onClose={onClose} maxWidth="md" fullWidth>
+    <Dialog open={open} onClose={handleClose} maxWidth="md" fullWidth>
       <DialogTitle>
         <Box display="flex" justifyContent="space-between" alignItems="center">
           <Box display="flex" alignItems="center">
@@ -170,7 +199,7 @@ const EmailDraftGenerator: React.FC<EmailDraftGeneratorProps> = ({
               {mode === 'reply' ? 'Reply with AI' : 'Forward with AI'}
             </Typography>
           </Box>
-          <IconButton onClick={onClose} size="small">
+          <IconButton onClick={handleClose} size="small">
             <CloseIcon />
           </IconButton>
         </Box>
@@ -221,7 +250,7 @@ const EmailDraftGenerator: React.FC<EmailDraftGeneratorProps> = ({
               </Alert>
             )}
 
-            {loading ? (
+            {loading && !generatedDraft ? (
               <Box display="flex" justifyContent="center" my={4}>
                 <CircularProgress />
               </Box>
@@ -232,6 +261,7 @@ const EmailDraftGenerator: React.FC<EmailDraftGeneratorProps> = ({
                 rows={12}
                 value={generatedDraft}
                 onChange={(e) => setGeneratedDraft(e.target.value)}
+                InputProps={{ readOnly: loading }}
                 variant="outlined"
                 sx={{ mb: 2 }}
               />
@@ -240,7 +270,7 @@ const EmailDraftGenerator: React.FC<EmailDraftGeneratorProps> = ({
         )}
       </DialogContent>
       <DialogActions>
-        <Button onClick={onClose}>Cancel</Button>
+        <Button onClick={handleClose}>Cancel</Button>
         <Button 
           variant="contained" 
           color="primary"
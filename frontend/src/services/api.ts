@@ -112,7 +112,17 @@ export const getEmailTimeline = async (days: number = 7): Promise<TimelineData>
     return response.data;
 };
 
-export async function syncEmails(limit: number = 50): Promise<any> {
+export async function getSyncJob(jobId: number): Promise<any> {
+    const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`, {
+        credentials: 'include',
+    });
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return await response.json();
+}
+
+export async function syncEmails(limit: number = 50, pollIntervalMs: number = 1000): Promise<any> {
     try {
         const response = await fetch(`${API_BASE_URL}/emails/sync?limit=${limit}`, {
             method: 'POST',
@@ -121,7 +131,13 @@ export async function syncEmails(limit: number = 50): Promise<any> {
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        return await response.json();
+        // Sync runs as a background job; poll until it finishes
+        let job = await response.json();
+        while (job.status === 'queued' || job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, pollIntervalMs));
+            job = await getSyncJob(job.job_id);
+        }
+        return job.result ?? { success: false, error: job.error };
     } catch (error) {
         console.error('Error syncing emails:', error);
         throw error;
@@ -204,6 +220,78 @@ export async function generateEmailDraft(request: DraftRequest): Promise<DraftRe
     }
 }
 
+export async function streamEmailDraft(
+    request: DraftRequest,
+    onToken: (token: string) => void,
+    signal?: AbortSignal
+): Promise<DraftResponse> {
+    try {
+        const response = await fetch(`${API_BASE_URL}/drafts/generate/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+            },
+            credentials: 'include',
+            body: JSON.stringify(request),
+            signal,
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        // Parse Server-Sent Events; aborting `signal` cancels generation on the server
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop() ?? '';
+            for (const rawEvent of events) {
+                let event = 'message';
+                let data = '';
+                for (const line of rawEvent.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                if (!data) continue;
+                const payload = JSON.parse(data);
+                if (event === 'done') return { success: true, draft: payload.draft };
+                if (event === 'error') return { success: false, error: payload.error };
+                onToken(payload.token);
+            }
+        }
+        return { success: false, error: 'Stream ended unexpectedly' };
+    } catch (error) {
+        console.error('Error streaming email draft:', error);
+        return {
+            success: false,
+            error: error instanceof Error ? error.message : 'Unknown error occurred'
+        };
+    }
+}
+
+export async function getEmail(emailId: string): Promise<Email | null> {
+    try {
+        const response = await fetch(`${API_BASE_URL}/emails/${emailId}`, {
+            credentials: 'include',
+        });
+        
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching email:', error);
+        return null;
+    }
+}
+
 export async function markEmailAsRead(emailId: string): Promise<{ success: boolean; message?: string; error?: string }> {
     try {
         const response = await fetch(`${API_BASE_URL}/emails/${emailId}/read`, {
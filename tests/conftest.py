@@ -0,0 +1,243 @@
+"""Shared fixtures: a migrated SQLite database and in-memory fakes of the Gmail and LLM APIs"""
+import asyncio
+import base64
+import json
+import re
+
+import httplib2
+import httpx
+import pytest
+from googleapiclient.errors import HttpError
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import configure_sqlite
+from app.core.migrations import run_migrations
+from app.models import User
+from app.services import analysis_cache, gmail as gmail_service, llm, rate_limit
+from app.services.search import setup_search_index
+
+def http_error(status, reason):
+    content = json.dumps({"error": {"code": status, "errors": [{"reason": reason}]}}).encode()
+    return HttpError(httplib2.Response({"status": status}), content)
+
+class FakeRequest:
+    def __init__(self, run):
+        self._run = run
+
+    def execute(self):
+        return self._run()
+
+class FakeBatch:
+    def __init__(self, gmail, callback):
+        self.gmail = gmail
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request, request_id))
+
+    def execute(self):
+        self.gmail.batches += 1
+        for request, request_id in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as e:
+                self.callback(request_id, None, e)
+
+class FakeGmail:
+    """
+    Mailbox held in memory behind the subset of the Gmail API the sync uses:
+    getProfile, messages.list/get, history.list and batch requests.
+    `throttle[id]` makes the next N gets of a message fail with a 429.
+    """
+
+    def __init__(self):
+        self.mailbox = {}
+        self.history_id = 100
+        self.records = []
+        self.history_expired = False
+        self.throttle = {}
+        self.batches = 0
+        self.gets = 0
+
+    def add_message(self, message_id, labels=("INBOX", "UNREAD"), record=True):
+        self.history_id += 1
+        self.mailbox[message_id] = {"id": message_id, "labelIds": list(labels)}
+        if record:
+            self.records.append({"id": str(self.history_id), "messagesAdded": [{"message": dict(self.mailbox[message_id])}]})
+
+    def set_labels(self, message_id, labels, record=True):
+        self.history_id += 1
+        self.mailbox[message_id]["labelIds"] = list(labels)
+        if record:
+            self.records.append({"id": str(self.history_id), "labelsAdded": [{"message": dict(self.mailbox[message_id])}]})
+
+    def delete_message(self, message_id, record=True):
+        self.history_id += 1
+        del self.mailbox[message_id]
+        if record:
+            self.records.append({"id": str(self.history_id), "messagesDeleted": [{"message": {"id": message_id}}]})
+
+    # Resource navigation
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return FakeHistory(self)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def getProfile(self, userId):
+        return FakeRequest(lambda: {"historyId": str(self.history_id)})
+
+    def list(self, userId, maxResults=100, q=None, pageToken=None, labelIds=None):
+        def run():
+            required = set(labelIds or [])
+            if q == "in:inbox":
+                required.add("INBOX")
+            ids = [message_id for message_id, message in sorted(self.mailbox.items(), reverse=True)
+                   if required <= set(message["labelIds"])]
+            start = int(pageToken or 0)
+            page = ids[start:start + maxResults]
+            response = {"messages": [{"id": message_id, "threadId": message_id} for message_id in page]}
+            if start + maxResults < len(ids):
+                response["nextPageToken"] = str(start + maxResults)
+            return response
+        return FakeRequest(run)
+
+    def get(self, userId, id, format="full", metadataHeaders=None):
+        def run():
+            self.gets += 1
+            if self.throttle.get(id):
+                self.throttle[id] -= 1
+                raise http_error(429, "rateLimitExceeded")
+            if id not in self.mailbox:
+                raise http_error(404, "notFound")
+            message = self.mailbox[id]
+            resource = {
+                "id": id,
+                "threadId": id,
+                "labelIds": list(message["labelIds"]),
+                "snippet": f"snippet {id}",
+                "internalDate": "1767225600000",
+            }
+            if format != "minimal":
+                resource["payload"] = {
+                    "mimeType": "text/plain",
+                    "headers": [
+                        {"name": "Subject", "value": f"Subject {id}"},
+                        {"name": "From", "value": "sender@example.com"},
+                        {"name": "To", "value": "me@example.com"},
+                    ],
+                    "body": {"data": base64.urlsafe_b64encode(f"Body {id}".encode()).decode()},
+                }
+            return resource
+        return FakeRequest(run)
+
+class FakeHistory:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def list(self, userId, startHistoryId, historyTypes=None, pageToken=None):
+        def run():
+            if self.gmail.history_expired:
+                raise http_error(404, "notFound")
+            records = [record for record in self.gmail.records if int(record["id"]) > int(startHistoryId)]
+            return {"history": records, "historyId": str(self.gmail.history_id)}
+        return FakeRequest(run)
+
+class FakeLLM:
+    """
+    Chat-completions API served through httpx.MockTransport. Single analysis
+    prompts get one analysis, packed prompts an array with one element per
+    EMAIL block; each summary names the subject it was given.
+    `packed_content(subjects)` overrides the packed reply content and
+    `delay` (seconds, or a function of the prompt) slows replies down.
+    Records every prompt and the peak number of requests in flight.
+    """
+
+    def __init__(self):
+        self.prompts = []
+        self.delay = 0.0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.packed_content = None
+
+    @staticmethod
+    def analysis(subject):
+        return {
+            "category": "Work",
+            "priority_score": 3,
+            "sentiment": "Neutral",
+            "summary": f"About {subject}",
+            "action_items": [],
+            "tone": "Professional",
+        }
+
+    @property
+    def packed_prompts(self):
+        return [prompt for prompt in self.prompts if "Return a JSON array" in prompt]
+
+    @property
+    def single_prompts(self):
+        return [prompt for prompt in self.prompts if "Return a JSON array" not in prompt]
+
+    async def handle(self, request):
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay(prompt) if callable(self.delay) else self.delay)
+        finally:
+            self.in_flight -= 1
+        if "Return a JSON array" in prompt:
+            subjects = re.findall(r"^EMAIL \d+\nSubject: (.*)$", prompt, re.MULTILINE)
+            if self.packed_content:
+                content = self.packed_content(subjects)
+            else:
+                content = json.dumps([dict(self.analysis(subject), index=index) for index, subject in enumerate(subjects, start=1)])
+        else:
+            content = json.dumps(self.analysis(re.search(r"^Email Subject: (.*)$", prompt, re.MULTILINE).group(1)))
+        return httpx.Response(200, json={"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    configure_sqlite(engine)
+    run_migrations(engine)
+    setup_search_index(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{
+            "email": "me@example.com",
+            "google_credentials": {},
+            "gmail_sync_enabled": True,
+        }])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def gmail(monkeypatch):
+    fake = FakeGmail()
+    monkeypatch.setattr(gmail_service, "create_gmail_service", lambda credentials: fake)
+    monkeypatch.setattr(settings, "GMAIL_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "GMAIL_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(settings, "GMAIL_SYNC_FORMAT", "full")
+    monkeypatch.setattr(settings, "GMAIL_USER_QUOTA_UNITS_PER_SECOND", 1000000)
+    monkeypatch.setattr(rate_limit, "_user_limiters", {})
+    return fake
+
+@pytest.fixture
+def llm_api(monkeypatch):
+    """Route the shared LLM client to a FakeLLM, with the analysis cache off"""
+    fake = FakeLLM()
+    monkeypatch.setattr(llm, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(fake.handle)))
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", "none")
+    monkeypatch.setattr(analysis_cache, "_cache", None)
+    return fake
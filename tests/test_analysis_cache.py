@@ -0,0 +1,93 @@
+"""Analysis cache keys, backends, hit-rate metrics and prompt-version invalidation"""
+import asyncio
+import json
+
+from app.core import database
+from app.core.config import settings
+from app.services import analysis_cache, llm
+from app.services.analysis_cache import (
+    DatabaseAnalysisCache, MemoryAnalysisCache, analysis_cache_key, get_analysis_cache,
+)
+from app.services.llm import analyze_email, analyze_email_pack
+
+ANALYSIS = {"category": "Work", "summary": "cached"}
+
+def test_cache_key_normalizes_whitespace_and_case_within_the_body_limit():
+    key = analysis_cache_key("Quarterly  Report", "Boss@Example.com", "Numbers\n\nare in" + "x" * 50, 20, "v1")
+    assert key == analysis_cache_key(" quarterly report", "boss@example.com ", "numbers  are in" + "x" * 60, 20, "v1")
+    assert key != analysis_cache_key("Quarterly Report", "boss@example.com", "Numbers are out", 20, "v1")
+    assert key != analysis_cache_key("Quarterly Report", "boss@example.com", "Numbers are in" + "x" * 50, 20, "v2")
+
+def test_memory_backend_counts_hits_and_misses_and_evicts():
+    cache = MemoryAnalysisCache(ttl=60, max_entries=2)
+
+    async def run():
+        await cache.aset("a", ANALYSIS)
+        await cache.aset("b", ANALYSIS)
+        assert await cache.aget("a") == ANALYSIS
+        # "b" is now the least recently used entry
+        await cache.aset("c", ANALYSIS)
+        assert await cache.aget("b") is None
+        assert await cache.aget_first(["missing", "c"]) == ANALYSIS
+        return await cache.astats()
+
+    stats = asyncio.run(run())
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["entries"]) == (2, 1, 3, 2)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+def test_memory_backend_expires_entries():
+    cache = MemoryAnalysisCache(ttl=-1, max_entries=10)
+    cache.set("a", ANALYSIS)
+    assert cache.get("a") is None and cache.size() == 0
+
+def test_database_backend_drops_other_prompt_versions(session_factory, monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", "database")
+    monkeypatch.setattr(analysis_cache, "_cache", None)
+    cache = get_analysis_cache("v1")
+    assert isinstance(cache, DatabaseAnalysisCache)
+    cache.set("old", ANALYSIS)
+    assert cache.get("old") == ANALYSIS
+
+    # A restart with a new prompt version
+    monkeypatch.setattr(analysis_cache, "_cache", None)
+    cache = get_analysis_cache("v2")
+    assert cache.get("old") is None and cache.size() == 0
+    cache.set("new", ANALYSIS)
+    assert cache.get("new") == ANALYSIS and cache.size() == 1
+
+def test_prompt_version_bump_misses_cached_analyses(llm_api, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", "memory")
+
+    async def analyze():
+        return await analyze_email(subject="Budget", body="Numbers are in", sender="boss@example.com")
+
+    assert not asyncio.run(analyze()).get("cached")
+    assert asyncio.run(analyze())["cached"]
+    monkeypatch.setattr(llm, "ANALYSIS_PROMPT_VERSION", "bumped")
+    assert not asyncio.run(analyze()).get("cached")
+
+    stats = asyncio.run(llm.get_analysis_cache_stats())
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert len(llm_api.prompts) == 2
+
+def test_pack_fallback_counts_one_lookup_per_email(llm_api, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", "memory")
+    # The last email has no element in the packed reply and is analyzed alone
+    llm_api.packed_content = lambda subjects: json.dumps([
+        dict(llm_api.analysis(subject), index=index) for index, subject in enumerate(subjects[:-1], start=1)
+    ])
+    items = [(f"Subject {number}", "Short body", "sender@example.com") for number in range(3)]
+
+    first = asyncio.run(analyze_email_pack(items))
+    stats = asyncio.run(llm.get_analysis_cache_stats())
+    assert all(result["success"] for result in first)
+    assert (stats["hits"], stats["misses"]) == (0, 3)
+    assert len(llm_api.packed_prompts) == 1 and len(llm_api.single_prompts) == 1
+
+    # Packed and single analyses are both served from the cache
+    second = asyncio.run(analyze_email_pack(items))
+    stats = asyncio.run(llm.get_analysis_cache_stats())
+    assert all(result["cached"] for result in second)
+    assert (stats["hits"], stats["misses"]) == (3, 3)
+    assert len(llm_api.prompts) == 2
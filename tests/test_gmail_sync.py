@@ -0,0 +1,143 @@
+"""Gmail syncs against the fake Gmail API"""
+import json
+
+from sqlalchemy import text, update
+
+from app.models import Email, User
+from app.services.gmail import backfill_emails, fetch_messages, reconcile_stored_emails, sync_emails, sync_emails_incremental
+from app.services.rate_limit import get_gmail_quota_stats
+
+def stored_ids(db):
+    return {gmail_id for (gmail_id,) in db.query(Email.gmail_id)}
+
+def test_throttled_messages_are_fetched_after_backoff(gmail):
+    for number in range(5):
+        gmail.add_message(f"m{number:04d}")
+    gmail.add_message("m0005")
+    gmail.delete_message("m0005")
+    gmail.throttle = {"m0001": 1, "m0003": 2}
+    throttled = get_gmail_quota_stats()["throttled"]
+
+    messages, unfetched = fetch_messages(gmail, 1, ["m0000", "m0001", "m0002", "m0003", "m0004", "m0005"])
+
+    assert [message["id"] for message in messages] == ["m0000", "m0001", "m0002", "m0003", "m0004"]
+    # Deleted messages are not failures
+    assert unfetched == []
+    assert get_gmail_quota_stats()["throttled"] - throttled == 3
+
+def test_incremental_sync_keeps_messages_throttled_past_the_retry_limit(gmail, session_factory):
+    db = session_factory()
+    user = db.get(User, 1)
+    user.gmail_history_id = "100"
+    db.commit()
+    for number in range(4):
+        gmail.add_message(f"m{number:04d}")
+    gmail.throttle = {"m0002": 10}
+
+    result = sync_emails_incremental(db, user)
+    assert result["success"] and result["failed_messages"] == 1 and result["retry_pending"] == 1
+    assert "error" in result
+    assert stored_ids(db) == {"m0000", "m0001", "m0003"}
+    assert user.gmail_history_id == str(gmail.history_id)
+
+    gmail.throttle = {}
+    result = sync_emails_incremental(db, user)
+    assert result["emails_synced"] == 1 and result["retry_pending"] == 0
+    assert stored_ids(db) == {"m0000", "m0001", "m0002", "m0003"}
+    assert db.get(User, 1).gmail_retry_ids is None
+    db.close()
+
+def test_backfill_cursor_moves_with_unfetched_ids(gmail, session_factory, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "GMAIL_LIST_PAGE_SIZE", 2)
+    db = session_factory()
+    user = db.get(User, 1)
+    for number in range(5):
+        gmail.add_message(f"m{number:04d}")
+    gmail.throttle = {"m0003": 10}
+
+    result = backfill_emails(db, user, limit=4)
+    assert result["failed_messages"] == 1 and result["cursor"] == "4"
+    assert user.gmail_retry_ids == ["m0003"]
+
+    gmail.throttle = {}
+    result = backfill_emails(db, user)
+    assert result["complete"] and result["retry_pending"] == 0
+    assert stored_ids(db) == {f"m{number:04d}" for number in range(5)}
+    db.close()
+
+def test_full_sync_retries_unfetched_messages(gmail, session_factory):
+    db = session_factory()
+    user = db.get(User, 1)
+    for number in range(3):
+        gmail.add_message(f"m{number:04d}")
+    gmail.throttle = {"m0000": 10}
+
+    assert sync_emails(db, user, limit=3)["failed_messages"] == 1
+    gmail.throttle = {}
+    gmail.add_message("m0003")
+    # m0000 is outside the newest 2 messages but still comes back from the retry list
+    assert sync_emails(db, user, limit=2)["emails_synced"] == 2
+    assert stored_ids(db) == {"m0000", "m0001", "m0002", "m0003"}
+    db.close()
+
+def test_expired_history_resyncs_labels_deletions_and_new_messages(gmail, session_factory):
+    db = session_factory()
+    user = db.get(User, 1)
+    for number in range(5):
+        gmail.add_message(f"m{number:04d}", labels=["INBOX", "UNREAD", "CATEGORY_UPDATES"])
+    assert backfill_emails(db, user)["emails_synced"] == 5
+
+    # Changes made while the history window expires
+    gmail.delete_message("m0001", record=False)
+    gmail.set_labels("m0002", ["INBOX", "CATEGORY_UPDATES", "IMPORTANT"], record=False)
+    gmail.set_labels("m0003", ["UNREAD", "CATEGORY_UPDATES"], record=False)
+    gmail.add_message("m0005", record=False)
+    gmail.history_expired = True
+
+    result = sync_emails_incremental(db, user, limit=50)
+    assert result["success"] and result["mode"] == "resync"
+    assert result["emails_deleted"] == 1 and result["emails_updated"] == 2 and result["emails_synced"] == 1
+    assert stored_ids(db) == {"m0000", "m0002", "m0003", "m0004", "m0005"}
+    emails = {email.gmail_id: email for email in db.query(Email)}
+    assert emails["m0002"].is_read and emails["m0002"].is_important
+    assert json.loads(emails["m0002"].labels) == ["INBOX", "CATEGORY_UPDATES", "IMPORTANT"]
+    assert "INBOX" not in json.loads(emails["m0003"].labels)
+    assert not emails["m0000"].is_read
+    assert user.gmail_history_id == str(gmail.history_id)
+    db.close()
+
+def test_reconcile_does_not_hold_the_write_lock_during_gets(gmail, session_factory):
+    db = session_factory()
+    user = db.get(User, 1)
+    for number in range(4):
+        gmail.add_message(f"m{number:04d}")
+    assert backfill_emails(db, user)["emails_synced"] == 4
+    # Read in the inbox (moves a stats bucket), archived and deleted meanwhile
+    gmail.set_labels("m0000", ["INBOX"], record=False)
+    gmail.set_labels("m0001", ["UNREAD"], record=False)
+    gmail.delete_message("m0002", record=False)
+
+    concurrent_writes = []
+    get = gmail.get
+
+    def get_during_concurrent_write(userId, id, format="full", metadataHeaders=None):
+        other = session_factory()
+        try:
+            other.execute(text("PRAGMA busy_timeout = 200"))
+            other.execute(update(User).where(User.id == 1).values(last_sync_timestamp=id))
+            other.commit()
+            concurrent_writes.append(id)
+        finally:
+            other.close()
+        return get(userId, id, format=format, metadataHeaders=metadataHeaders)
+
+    gmail.get = get_during_concurrent_write
+    result = reconcile_stored_emails(db, gmail, user)
+
+    assert sorted(concurrent_writes) == ["m0001", "m0002"]
+    assert result == {"updated": 2, "deleted": 1, "unchecked": 0}
+    emails = {email.gmail_id: email for email in db.query(Email)}
+    assert set(emails) == {"m0000", "m0001", "m0003"}
+    assert emails["m0000"].is_read and "INBOX" not in json.loads(emails["m0001"].labels)
+    db.close()
@@ -0,0 +1,104 @@
+"""Packed and concurrent email analysis against the fake chat-completions API"""
+import asyncio
+import json
+import re
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.emails import analyze_email_batch
+from app.core.config import settings
+from app.models import Email
+from app.services.email_store import bulk_insert_emails
+from app.services.llm import analyze_email_pack
+
+def items(count):
+    return [(f"Subject {number}", f"Body {number}", f"sender{number}@example.com") for number in range(count)]
+
+def summaries(results):
+    return [result["analysis"]["summary"] for result in results]
+
+def test_pack_maps_elements_to_emails_by_index(llm_api):
+    # Elements come back out of order; their index says which email they belong to
+    llm_api.packed_content = lambda subjects: json.dumps([
+        dict(llm_api.analysis(subject), index=index)
+        for index, subject in reversed(list(enumerate(subjects, start=1)))
+    ])
+
+    results = asyncio.run(analyze_email_pack(items(3)))
+
+    assert summaries(results) == ["About Subject 0", "About Subject 1", "About Subject 2"]
+    assert all(result["packed"] for result in results)
+    assert "index" not in results[0]["analysis"]
+    assert len(llm_api.packed_prompts) == 1 and not llm_api.single_prompts
+
+def test_missing_and_invalid_elements_fall_back_to_single_requests(llm_api):
+    def packed_content(subjects):
+        invalid = dict(llm_api.analysis(subjects[1]), index=2)
+        del invalid["summary"]
+        # No element for EMAIL 3, and EMAIL 2 lacks a required field
+        return json.dumps([dict(llm_api.analysis(subjects[0]), index=1), invalid, "not an object"])
+
+    llm_api.packed_content = packed_content
+    results = asyncio.run(analyze_email_pack(items(3)))
+
+    assert summaries(results) == ["About Subject 0", "About Subject 1", "About Subject 2"]
+    assert [bool(result.get("packed")) for result in results] == [True, False, False]
+    assert len(llm_api.packed_prompts) == 1
+    assert sorted(prompt.splitlines()[2] for prompt in llm_api.single_prompts) == [
+        "Email Subject: Subject 1", "Email Subject: Subject 2"
+    ]
+
+def test_unparseable_pack_falls_back_to_single_requests(llm_api):
+    llm_api.packed_content = lambda subjects: "Sorry, here are the analyses: [..."
+
+    results = asyncio.run(analyze_email_pack(items(3)))
+
+    assert all(result["success"] and not result.get("packed") for result in results)
+    assert summaries(results) == ["About Subject 0", "About Subject 1", "About Subject 2"]
+    assert len(llm_api.single_prompts) == 3
+
+@pytest.mark.parametrize("concurrency, packed", [(3, False), (2, True)], ids=["single", "packed"])
+def test_batch_bounds_requests_in_flight_and_writes_each_result_to_its_email(
+    llm_api, session_factory, monkeypatch, concurrency, packed
+):
+    monkeypatch.setattr(settings, "LLM_PACK_SIZE", 2)
+    db = session_factory()
+    bulk_insert_emails(db, [
+        {
+            "user_id": 1,
+            "gmail_id": f"m{number:04d}",
+            "thread_id": f"m{number:04d}",
+            "subject": f"Subject {number}",
+            "sender": "sender@example.com",
+            "recipients": "[]",
+            "snippet": "",
+            "body_text": f"Body {number}",
+            "labels": "[]",
+            "is_read": False,
+            "is_important": False,
+        }
+        for number in range(12)
+    ], track_memory=False)
+    db.close()
+    # Later emails answer sooner, so results complete out of order
+    llm_api.delay = lambda prompt: 0.002 * (12 - max(int(n) for n in re.findall(r"Subject: Subject (\d+)", prompt)))
+
+    async def run_batch():
+        engine = create_async_engine(session_factory.kw["bind"].url.set(drivername="sqlite+aiosqlite"))
+        async with async_sessionmaker(engine, expire_on_commit=False)() as adb:
+            result = await analyze_email_batch(db=adb, limit=50, concurrency=concurrency, packed=packed)
+        await engine.dispose()
+        return result
+
+    result = asyncio.run(run_batch())
+
+    assert result["total_processed"] == 12 and all(entry["success"] for entry in result["results"])
+    assert llm_api.peak_in_flight == concurrency
+    assert len(llm_api.packed_prompts) == (6 if packed else 0)
+    db = session_factory()
+    emails = db.query(Email).all()
+    assert len(emails) == 12
+    for email in emails:
+        assert email.category == "Work" and email.summary == f"About {email.subject}"
+    db.close()
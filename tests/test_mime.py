@@ -0,0 +1,75 @@
+"""parse_message_body on Gmail API message payload fixtures"""
+import base64
+
+from app.core.config import settings
+from app.services import mime
+from app.services.mime import parse_message_body
+
+def encode(text, charset="utf-8"):
+    return base64.urlsafe_b64encode(text.encode(charset)).decode().rstrip("=")
+
+def part(mime_type, text, charset="utf-8", **extra):
+    return {
+        "mimeType": mime_type,
+        "headers": [{"name": "Content-Type", "value": f"{mime_type}; charset={charset}"}],
+        "body": {"data": encode(text, charset)},
+        **extra,
+    }
+
+def multipart(mime_type, *parts):
+    return {"mimeType": mime_type, "headers": [], "body": {"size": 0}, "parts": list(parts)}
+
+def test_alternative_nested_in_mixed():
+    payload = multipart(
+        "multipart/mixed",
+        multipart(
+            "multipart/alternative",
+            part("text/plain", "Plain body"),
+            part("text/html", "<p>HTML body</p>"),
+        ),
+        part("application/pdf", "%PDF", filename="report.pdf"),
+    )
+    assert parse_message_body(payload) == ("Plain body", "<p>HTML body</p>")
+
+def test_non_utf8_charset():
+    payload = multipart(
+        "multipart/alternative",
+        part("text/plain", "Grüße aus Köln", charset="iso-8859-1"),
+        part("text/html", "<p>Привет</p>", charset="koi8-r"),
+    )
+    assert parse_message_body(payload) == ("Grüße aus Köln", "<p>Привет</p>")
+
+def test_html_only_falls_back_to_rendered_text():
+    payload = part("text/html", "<html><head><style>p {}</style></head><body><p>Hello</p><p>World &amp; co</p></body></html>")
+    body_text, body_html = parse_message_body(payload)
+    assert body_html.startswith("<html>")
+    assert body_text == "Hello\nWorld & co"
+
+def test_attachment_is_not_decoded(monkeypatch):
+    decoded = []
+    original_decode = mime._decode
+
+    def spy(message_part, max_chars):
+        decoded.append(message_part)
+        return original_decode(message_part, max_chars)
+
+    monkeypatch.setattr(mime, "_decode", spy)
+    attachment = part("text/plain", "attachment contents", filename="notes.txt")
+    disposition = part("text/plain", "inline attachment")
+    disposition["headers"].append({"name": "Content-Disposition", "value": "attachment; filename=x.txt"})
+    payload = multipart("multipart/mixed", attachment, disposition, part("text/plain", "Real body"))
+
+    assert parse_message_body(payload) == ("Real body", None)
+    assert attachment not in decoded and disposition not in decoded
+
+def test_bodies_are_capped(monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_BODY_MAX_CHARS", 100)
+    payload = multipart(
+        "multipart/alternative",
+        part("text/plain", "é" * 1000),
+        part("text/html", "<p>" + "x" * 1000 + "</p>"),
+    )
+    body_text, body_html = parse_message_body(payload)
+    assert body_text == "é" * 100
+    assert body_html == "<p>" + "x" * 97
+    assert parse_message_body(payload, max_chars=10)[0] == "é" * 10
@@ -0,0 +1,69 @@
+"""Keyset pagination of the email list over the timestamps SQLite actually stores"""
+from datetime import timedelta
+import asyncio
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.emails import list_emails
+from app.models import Email
+
+def email_row(gmail_id, **values):
+    return {
+        "user_id": 1,
+        "gmail_id": gmail_id,
+        "thread_id": gmail_id,
+        "subject": f"Subject {gmail_id}",
+        "sender": "sender@example.com",
+        "recipients": "[]",
+        "snippet": "",
+        "labels": "[]",
+        "is_read": False,
+        "is_important": False,
+        **values,
+    }
+
+def list_page(db, cursor):
+    return list_emails(
+        db=db, skip=0, limit=2, category=None, min_priority=None, search=None, sender=None,
+        has_action_items=None, sort=None, pagination="cursor", cursor=cursor, include_total=False
+    )
+
+def test_cursor_pages_mix_server_default_and_explicit_timestamps(session_factory):
+    db = session_factory()
+    # Stored by the server default as "YYYY-MM-DD HH:MM:SS", like rows from before sync set created_at
+    db.execute(insert(Email.__table__), [email_row(f"default{number}") for number in range(3)])
+    db.commit()
+    stored = db.scalar(select(Email.created_at).where(Email.gmail_id == "default0"))
+    # Stored by SQLAlchemy with microseconds, one of them at the very same second
+    db.execute(insert(Email.__table__), [
+        email_row("explicit_same_second", created_at=stored),
+        email_row("explicit_later", created_at=stored + timedelta(microseconds=500000)),
+        email_row("explicit_earlier_a", created_at=stored - timedelta(seconds=1)),
+        email_row("explicit_earlier_b", created_at=stored - timedelta(seconds=1)),
+    ])
+    db.commit()
+    formats = {len(value) for (value,) in db.execute(text("SELECT created_at FROM emails"))}
+    assert formats == {19, 26}
+    expected = [gmail_id for (gmail_id,) in db.execute(
+        select(Email.gmail_id).order_by(Email.created_at.desc(), Email.id.desc())
+    )]
+    db.close()
+
+    async def page_through():
+        engine = create_async_engine(session_factory.kw["bind"].url.set(drivername="sqlite+aiosqlite"))
+        pages, cursors, cursor = [], [], None
+        async with async_sessionmaker(engine, expire_on_commit=False)() as adb:
+            while len(pages) < 10:
+                page = await list_page(adb, cursor)
+                pages.append([email["gmail_id"] for email in page["emails"]])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+                cursors.append(cursor)
+        await engine.dispose()
+        return pages, cursors
+
+    pages, cursors = asyncio.run(page_through())
+    assert [gmail_id for page in pages for gmail_id in page] == expected
+    assert len(set(cursors)) == len(cursors) == len(pages) - 1
@@ -0,0 +1,129 @@
+"""
+Query plan regression tests: the email list, dashboard and analyze queries
+must be answered from the composite indexes, never by scanning emails
+(nor by matching the full-text index once per email).
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import asyncio
+import re
+
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.migrations import run_migrations
+from app.models import Email, User
+from app.services.search import setup_search_index
+from app.api.v1.endpoints.dashboard import _build_dashboard_stats
+from app.api.v1.endpoints.emails import analyze_email_batch, list_emails
+from app.services.pagination import encode_cursor
+
+FULL_SCAN = re.compile(r"\bSCAN emails\b(?!_)")
+# The full-text index probed once per email row (rowid '=' constraint) instead of once per query
+PER_ROW_MATCH = re.compile(r"\bemails_fts VIRTUAL TABLE INDEX \d+:=")
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "plans.db"
+    engine = create_engine(f"sqlite:///{path}")
+    run_migrations(engine)
+    setup_search_index(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{"email": "plans@example.com", "google_credentials": {}}])
+        conn.execute(insert(Email.__table__), [
+            {
+                "user_id": 1,
+                "gmail_id": f"g{i}",
+                "thread_id": "t",
+                "subject": f"Report {i}",
+                "sender": "a@example.com",
+                "recipients": "[]",
+                "snippet": "budget",
+                "labels": "[]",
+                "is_read": False,
+                "is_important": False,
+                "category": "work",
+                "priority_score": i % 5 + 1,
+                "action_items": "[]",
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(20)
+        ])
+    engine.dispose()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield async_engine
+    asyncio.run(async_engine.dispose())
+
+@contextmanager
+def query_plans(async_engine):
+    """Record the EXPLAIN QUERY PLAN details of every SELECT run on the engine"""
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            plan_cursor = conn.connection.cursor()
+            plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append((statement, [row[3] for row in plan_cursor.fetchall()]))
+            plan_cursor.close()
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", explain)
+    try:
+        yield plans
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", explain)
+
+def assert_no_full_scan(async_engine, run):
+    async def call():
+        async with async_sessionmaker(async_engine, expire_on_commit=False)() as db:
+            return await run(db)
+
+    with query_plans(async_engine) as plans:
+        asyncio.run(call())
+    emails_plans = [(statement, details) for statement, details in plans if "FROM emails" in statement]
+    assert emails_plans, "no query on emails was executed"
+    for statement, details in emails_plans:
+        scans = [detail for detail in details if FULL_SCAN.search(detail) or PER_ROW_MATCH.search(detail)]
+        assert not scans, f"{scans} in plan of:\n{statement}"
+
+def list_params(**params):
+    defaults = {
+        "skip": 0,
+        "limit": 10,
+        "category": None,
+        "min_priority": None,
+        "search": None,
+        "sender": None,
+        "has_action_items": None,
+        "sort": None,
+        "pagination": "offset",
+        "cursor": None,
+        "include_total": False,
+    }
+    return {**defaults, **params}
+
+@pytest.mark.parametrize("params", [
+    list_params(),
+    list_params(pagination="cursor", include_total=True),
+    list_params(category="work"),
+    list_params(min_priority=4),
+    list_params(category="work", pagination="cursor"),
+    list_params(search="report budget"),
+], ids=["list", "keyset-total", "category", "min-priority", "category-keyset", "search"])
+def test_email_list_uses_indexes(database, params):
+    assert_no_full_scan(database, lambda db: list_emails(db=db, **params))
+
+def test_keyset_next_page_uses_indexes(database):
+    cursor = encode_cursor(datetime.utcnow() - timedelta(minutes=10), 10)
+    assert_no_full_scan(database, lambda db: list_emails(db=db, **list_params(cursor=cursor)))
+
+def test_dashboard_uses_indexes(database):
+    async def run(db):
+        user = await db.get(User, 1)
+        return await _build_dashboard_stats(db, user, 30, False)
+
+    assert_no_full_scan(database, run)
+
+def test_analyze_batch_uses_indexes(database):
+    assert_no_full_scan(database, lambda db: analyze_email_batch(db=db, limit=50, concurrency=None, packed=False))
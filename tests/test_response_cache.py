@@ -0,0 +1,42 @@
+"""ETags of cached responses follow the body, not just the cache key"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services import response_cache
+from app.services.response_cache import MemoryResponseCache, cached_json_response
+
+@pytest.fixture
+def client(monkeypatch):
+    cache = MemoryResponseCache(ttl=300, max_entries=10)
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    monkeypatch.setattr(response_cache.settings, "RESPONSE_CACHE_BACKEND", "memory")
+    data = {"total": 0}
+    app = FastAPI()
+
+    @app.get("/stats")
+    async def stats(request: Request):
+        async def compute():
+            return dict(data)
+        return await cached_json_response(request, 1, "stats", {}, compute)
+
+    return TestClient(app), cache, data
+
+def test_not_modified_while_body_is_unchanged(client):
+    http, cache, data = client
+    etag = http.get("/stats").headers["etag"]
+    assert http.get("/stats", headers={"If-None-Match": etag}).status_code == 304
+    # Invalidated but the body did not change: still not modified
+    cache.invalidate_user(1)
+    assert http.get("/stats", headers={"If-None-Match": etag}).status_code == 304
+
+def test_expired_entry_with_new_data_gets_new_etag(client):
+    http, cache, data = client
+    etag = http.get("/stats").headers["etag"]
+    # TTL expires and a row is written by a process that cannot invalidate this cache
+    cache._entries.clear()
+    data["total"] = 1
+    response = http.get("/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == {"total": 1}
+    assert response.headers["etag"] != etag
@@ -0,0 +1,58 @@
+"""Scheduler slices against the fake Gmail API and the per-user sync lease"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models import Email, User
+from app.services.jobs import user_sync_lease
+from app.services.scheduler import SyncScheduler, next_sync_mode
+
+def test_expired_history_is_continued_by_backfill_slices(gmail, session_factory):
+    db = session_factory()
+    user = db.get(User, 1)
+    user.gmail_history_id = "100"
+    db.commit()
+    for number in range(5):
+        gmail.add_message(f"m{number:04d}", record=False)
+    gmail.history_expired = True
+    scheduler = SyncScheduler(workers=1, slice_size=2, session_factory=session_factory)
+
+    result = scheduler.sync_user_slice(1)
+    assert result["success"] and result["emails_synced"] == 2
+    db.expire_all()
+    assert next_sync_mode(db.get(User, 1)) == "backfill"
+
+    modes = [scheduler.sync_user_slice(1)["mode"] for _ in range(2)]
+    assert modes == ["backfill", "backfill"]
+    db.expire_all()
+    user = db.get(User, 1)
+    assert db.query(Email).count() == 5
+    assert next_sync_mode(user) == "incremental"
+    assert user.gmail_history_id == str(gmail.history_id)
+    db.close()
+
+def test_slice_is_skipped_while_another_process_holds_the_lease(gmail, session_factory):
+    scheduler = SyncScheduler(workers=1, slice_size=2, session_factory=session_factory)
+    gmail.add_message("m0000")
+
+    with user_sync_lease(1, blocking=False, session_factory=session_factory) as acquired:
+        assert acquired
+        assert scheduler.sync_user_slice(1)["skipped"] == "sync already running"
+    assert scheduler.sync_user_slice(1)["emails_synced"] == 1
+
+    db = session_factory()
+    user = db.get(User, 1)
+    assert user.sync_lease_owner is None and user.sync_lease_until is None
+    db.close()
+
+def test_expired_lease_of_a_dead_holder_is_taken_over(session_factory):
+    db = session_factory()
+    db.execute(update(User.__table__).values(
+        sync_lease_owner="crashed-worker",
+        sync_lease_until=datetime.utcnow() - timedelta(seconds=1)
+    ))
+    db.commit()
+    db.close()
+
+    with user_sync_lease(1, blocking=False, session_factory=session_factory) as acquired:
+        assert acquired